@@ -0,0 +1,73 @@
+"""
+Averages over a synthetic per-run table: vectorized analytics vs the
+record-by-record MetricsCollector, plus the speed-bin and per-route views.
+
+    python -m benchmarks.bench_analytics --rows 10000 100000 1000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from src.metrics import analytics
+from src.metrics.metrics_collector import MetricsCollector
+from src.simulation.episode_record import EPISODE_DTYPE, EpisodeTable
+
+
+def synthetic_table(n_rows: int, agents: int = 2, seed: int = 0) -> EpisodeTable:
+    rng = np.random.default_rng(seed)
+    rows = np.zeros(n_rows, dtype=EPISODE_DTYPE)
+    rows['episode'] = np.arange(n_rows) // agents
+    rows['agent'] = np.array([f"{('safe', 'risky')[k % 2]}_{k // 2 + 1}"
+                              for k in range(agents)])[np.arange(n_rows) % agents]
+    rows['route'] = rng.integers(-1, 20, n_rows)
+    rows['end_step'] = np.where(rng.random(n_rows) < 0.8, rng.integers(100, 900, n_rows), -1)
+    rows['reached'] = rows['end_step'] >= 0
+    for field in ('total_distance', 'max_speed', 'max_decel', 'sum_decel', 'wait_time'):
+        rows[field] = rng.uniform(0, 100, n_rows)
+    for field in ('edges', 'tls', 'amber_encountered', 'red_encountered', 'green_encountered',
+                  'amber_run_count', 'red_run_count', 'green_run_count',
+                  'sudden_brake_count', 'lane_change_count', 'collision_count'):
+        rows[field] = rng.integers(0, 10, n_rows)
+    rows['speed_bin_counts'] = rng.integers(0, 500, (n_rows, 4))
+
+    table = EpisodeTable(capacity=n_rows)
+    table._rows[:] = rows
+    table._n, table.episodes = n_rows, int(rows['episode'][-1]) + 1
+    return table
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return time.perf_counter() - t0, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--agents", type=int, default=2)
+    parser.add_argument("--skip-collector-above", type=int, default=1_000_000,
+                        help="Don't time the collector on bigger tables")
+    args = parser.parse_args()
+
+    collector = MetricsCollector()
+    print(f"{'rows':>10}{'collector s':>13}{'averages s':>12}{'speedup':>9}"
+          f"{'speed bins s':>14}{'per route s':>13}{'same':>6}")
+    for n in args.rows:
+        table = synthetic_table(n, args.agents)
+        t_vec, vec_rows = timed(analytics.averages_rows, table)
+        t_bins, _ = timed(analytics.speed_bin_shares, table, ["safe_1", "risky_1"])
+        t_route, _ = timed(analytics.per_route, table)
+        if n <= args.skip_collector_above:
+            t_old, old_rows = timed(collector.compute_averages, table)
+            same = "yes" if old_rows == vec_rows else "NO"
+            old, speedup = f"{t_old:>13.3f}", f"{t_old / t_vec:>8.0f}x"
+        else:
+            old, speedup, same = f"{'-':>13}", f"{'-':>9}", "-"
+        print(f"{n:>10}{old}{t_vec:>12.3f}{speedup}{t_bins:>14.3f}{t_route:>13.3f}{same:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Steps per second of a full SimulationRunner episode on osm.sumocfg,
+once per TraCI backend (the surrogate runs its own synthetic grid).
+
+Each backend runs in its own child process (libsumo cannot be
+re-initialised next to a traci connection in one interpreter).
+
+    python -m benchmarks.bench_backends --steps 3000 --repeats 3
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from src.simulation.backend import BACKENDS
+
+
+def run_child(backend: str, steps: int, subscriptions: bool) -> dict:
+    """Runs one episode in this process and returns its timings"""
+    from src.simulation.backend import select_backend
+    from src.simulation.batch import SUMO_BINARY, SUMO_CONFIG
+    from src.simulation.simulation_runner import SimulationRunner
+    from src.agents.agent_manager import AgentManager
+
+    active = select_backend(backend)
+    runner = SimulationRunner(
+        SUMO_BINARY, SUMO_CONFIG, max_steps=steps, use_subscriptions=subscriptions
+    )
+    t0 = time.perf_counter()
+    runner.run(AgentManager())
+    elapsed = time.perf_counter() - t0
+    return {
+        "backend": active,
+        "steps": steps,
+        "seconds": round(elapsed, 3),
+        "steps_per_sec": round(steps / elapsed, 1),
+        "traci_calls": runner.call_stats.get("calls"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--steps", type=int, default=3000)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--subscriptions", action="store_true")
+    parser.add_argument("--child", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.steps, args.subscriptions)))
+        return
+
+    print(f"{'backend':<10}{'steps/s':>10}{'seconds':>10}")
+    for backend in BACKENDS:
+        for _ in range(args.repeats):
+            cmd = [sys.executable, "-m", "benchmarks.bench_backends",
+                   "--child", backend, "--steps", str(args.steps)]
+            if args.subscriptions:
+                cmd.append("--subscriptions")
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            if proc.returncode != 0:
+                err = proc.stderr.strip().splitlines()
+                print(f"{backend:<10} failed: {err[-1] if err else proc.returncode}")
+                break
+            res = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(f"{res['backend']:<10}{res['steps_per_sec']:>10}{res['seconds']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Per-step cost of fleet mode (AgentManager(n_agents=N)) as N grows,
+with agents on route-pool routes among the osm.sumocfg background traffic.
+
+Reports wall time per step, TraCI reads issued per step (subscription
+mode seeds them from the step response) and speed commands sent/skipped.
+
+    python -m benchmarks.bench_fleet --agents 2 10 50 100 250 500 --steps 300
+"""
+
+import argparse
+import logging
+import time
+
+from src.simulation.batch import SUMO_BINARY, SUMO_CONFIG
+from src.simulation.route_pool import RoutePool
+from src.simulation.simulation_runner import SimulationRunner
+from src.agents.agent_manager import AgentManager
+
+
+def run_one(n: int, steps: int, subscriptions: bool, pool: RoutePool) -> dict:
+    mgr = AgentManager(route_pool=pool, n_agents=n)
+    runner = SimulationRunner(SUMO_BINARY, SUMO_CONFIG, max_steps=steps,
+                              use_subscriptions=subscriptions)
+    t0 = time.perf_counter()
+    runner.run(mgr)
+    elapsed = time.perf_counter() - t0
+    commands = mgr.fleet.commands
+    return {
+        "agents": n,
+        "ms_per_step": 1000 * elapsed / steps,
+        "reads_per_step": runner.call_stats["calls"] / steps,
+        "sent_per_step": commands["sent"] / steps,
+        "skipped_per_step": commands["skipped"] / steps,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--agents", type=int, nargs="+", default=[2, 10, 50, 100, 250, 500])
+    parser.add_argument("--steps", type=int, default=300)
+    parser.add_argument("--no-subscriptions", action="store_true")
+    args = parser.parse_args()
+
+    # drivers log every speed bin at DEBUG
+    logging.getLogger().setLevel(logging.WARNING)
+    pool = RoutePool.load_or_build()
+
+    print(f"{'agents':>7}{'ms/step':>10}{'reads/step':>12}{'sent/step':>11}{'skipped/step':>14}")
+    for n in args.agents:
+        res = run_one(n, args.steps, not args.no_subscriptions, pool)
+        print(f"{res['agents']:>7}{res['ms_per_step']:>10.2f}{res['reads_per_step']:>12.1f}"
+              f"{res['sent_per_step']:>11.1f}{res['skipped_per_step']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Update throughput of the dict QTable against the numpy DenseQTable,
+on random transitions over the drivers' state space.
+
+    python -m benchmarks.bench_qtable --transitions 200000
+"""
+
+import argparse
+import itertools
+import random
+import time
+
+import numpy as np
+
+from src.agents.learning.q_table import QTable, DenseQTable, STATE_DIMS
+
+ACTIONS = ['STOP', 'SLOW', 'GO_COMPLIANT', 'GO_OVERSHOOT_S', 'GO_OVERSHOOT_L']
+
+
+def make_transitions(n: int, seed: int = 0) -> list[tuple]:
+    rng = random.Random(seed)
+    states = list(itertools.product(*STATE_DIMS))
+    return [
+        (rng.choice(states), rng.choice(ACTIONS), rng.uniform(-10, 10), rng.choice(states))
+        for _ in range(n)
+    ]
+
+
+def per_sec(fn, n: int, repeats: int) -> float:
+    best = min(_timed(fn) for _ in range(repeats))
+    return n / best
+
+
+def _timed(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--transitions", type=int, default=200_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    transitions = make_transitions(args.transitions)
+    n = len(transitions)
+
+    def updates(table):
+        def run():
+            for s, a, r, ns in transitions:
+                table.update(s, a, r, ns)
+        return run
+
+    def choices(table):
+        def run():
+            for s, _a, _r, _ns in transitions:
+                table.choose_action(s)
+        return run
+
+    dict_q, dense_q = QTable(ACTIONS, epsilon=0.1), DenseQTable(ACTIONS, epsilon=0.1)
+    rows = [
+        ("update", "QTable", per_sec(updates(dict_q), n, args.repeats)),
+        ("update", "DenseQTable", per_sec(updates(dense_q), n, args.repeats)),
+        ("choose_action", "QTable", per_sec(choices(dict_q), n, args.repeats)),
+        ("choose_action", "DenseQTable", per_sec(choices(dense_q), n, args.repeats)),
+    ]
+
+    # batched: encode once, then one vectorized update per chunk of 1024
+    s = np.array([dense_q.encode(t[0]) for t in transitions])
+    a = np.array([dense_q.action_index[t[1]] for t in transitions])
+    r = np.array([t[2] for t in transitions])
+    ns = np.array([dense_q.encode(t[3]) for t in transitions])
+
+    def batched():
+        for i in range(0, n, 1024):
+            dense_q.update_batch(s[i:i + 1024], a[i:i + 1024], r[i:i + 1024], ns[i:i + 1024])
+
+    rows.append(("update_batch", "DenseQTable", per_sec(batched, n, args.repeats)))
+
+    print(f"{'operation':<15}{'table':<13}{'per sec':>14}")
+    for op, table, rate in rows:
+        print(f"{op:<15}{table:<13}{rate:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Import time and peak RSS of the train and report stages, each measured
+in a fresh interpreter.
+
+    train import   src.simulation.batch (simulation + learning stack)
+    train episode  the same plus one surrogate SimulationRunner episode
+    report import  src.simulation.report (pandas, matplotlib, seaborn)
+    report run     the same plus every figure and CSV of a synthetic batch
+
+    python -m benchmarks.bench_startup --repeats 3
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+PRELUDE = """
+import json, resource, sys, time
+t0 = time.perf_counter()
+"""
+
+# imported module, then the work timed on top of it
+STAGES = {
+    "train import": ("import src.simulation.batch", ""),
+    "train episode": ("import src.simulation.batch", """
+from src.agents.agent_manager import AgentManager
+from src.simulation.backend import select_backend
+from src.simulation.simulation_runner import SimulationRunner
+select_backend("surrogate")
+SimulationRunner("sumo", "unused.sumocfg", max_steps={steps}).run(AgentManager(dense_q=True))
+"""),
+    "report import": ("import src.simulation.report", ""),
+    "report run": ("import src.simulation.report", """
+import os, tempfile
+from benchmarks.bench_analytics import synthetic_table
+from benchmarks.bench_qtable import ACTIONS, make_transitions
+from src.agents.learning.q_table import DenseQTable
+from src.simulation import report
+from src.simulation.batch import save_results
+with tempfile.TemporaryDirectory() as tmp:
+    table = synthetic_table(2 * {runs})
+    save_results(tmp, table, [1.0] * {runs}, [1.0] * {runs}, {{
+        "num_runs": {runs}, "successful": {runs}, "backend": "surrogate",
+        "workers": 1, "fleet": False, "agents": ["safe_1", "risky_1"],
+    }})
+    for name in ("safe", "risky"):
+        qtable = DenseQTable(ACTIONS)
+        for s, a, r, ns in make_transitions(5000):
+            qtable.update(s, a, r, ns)
+        qtable.save(os.path.join(tmp, name + "_driver_qtable.qtab"))
+    report.main(tmp, tmp)
+"""),
+}
+
+EPILOGUE = """
+t_import = time.perf_counter() - t0
+{work}
+print(json.dumps({{
+    "import_s": t_import,
+    "total_s": time.perf_counter() - t0,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+
+def run_stage(stage: str, steps: int, runs: int) -> dict:
+    module, work = STAGES[stage]
+    code = PRELUDE + module + EPILOGUE.format(work=work.format(steps=steps, runs=runs))
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if proc.returncode != 0:
+        err = proc.stderr.strip().splitlines()
+        raise RuntimeError(f"{stage}: {err[-1] if err else proc.returncode}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--steps", type=int, default=3000, help="Steps of the train episode")
+    parser.add_argument("--runs", type=int, default=1000, help="Runs of the synthetic report")
+    args = parser.parse_args()
+
+    print(f"{'stage':<16}{'import s':>10}{'total s':>10}{'peak RSS MB':>13}")
+    for stage in STAGES:
+        # best of repeats, the first run also pays for cold file caches
+        results = [run_stage(stage, args.steps, args.runs) for _ in range(args.repeats)]
+        best = min(results, key=lambda r: r["total_s"])
+        print(f"{stage:<16}{best['import_s']:>10.3f}{best['total_s']:>10.3f}"
+              f"{best['peak_rss_mb']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
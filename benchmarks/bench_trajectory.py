@@ -0,0 +1,57 @@
+"""
+Cost of trajectory recording (SimulationRunner(trajectory_dir=...)):
+the same seeded episodes with and without the recorder, on osm.sumocfg.
+
+    python -m benchmarks.bench_trajectory --agents 2 100 --steps 600
+"""
+
+import argparse
+import logging
+import random
+import tempfile
+import time
+
+from src.simulation.batch import SUMO_BINARY, SUMO_CONFIG
+from src.simulation.route_pool import RoutePool
+from src.simulation.simulation_runner import SimulationRunner
+from src.simulation.trajectory import TrajectoryReader
+from src.agents.agent_manager import AgentManager
+
+
+def run_one(n: int | None, steps: int, pool: RoutePool, trajectory_dir: str | None) -> float:
+    random.seed(0)
+    mgr = AgentManager(route_pool=pool, n_agents=n)
+    runner = SimulationRunner(SUMO_BINARY, SUMO_CONFIG, max_steps=steps,
+                              use_subscriptions=True, trajectory_dir=trajectory_dir)
+    t0 = time.perf_counter()
+    runner.run(mgr)
+    return 1000 * (time.perf_counter() - t0) / steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--agents", type=int, nargs="+", default=[2, 100])
+    parser.add_argument("--steps", type=int, default=600)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # drivers log every speed bin at DEBUG
+    logging.getLogger().setLevel(logging.WARNING)
+    pool = RoutePool.load_or_build()
+
+    print(f"{'agents':>7}{'off ms/step':>13}{'on ms/step':>12}{'overhead':>10}{'rows':>9}")
+    for n in args.agents:
+        # 2 agents: the classic safe/risky pair, otherwise fleet mode
+        fleet_n = None if n == 2 else n
+        off, on, rows = [], [], 0
+        for _ in range(args.repeat):
+            off.append(run_one(fleet_n, args.steps, pool, None))
+            with tempfile.TemporaryDirectory() as tmp:
+                on.append(run_one(fleet_n, args.steps, pool, tmp))
+                rows = len(TrajectoryReader(tmp))
+        off_ms, on_ms = min(off), min(on)
+        print(f"{n:>7}{off_ms:>13.2f}{on_ms:>12.2f}{100 * (on_ms / off_ms - 1):>9.1f}%{rows:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""
+Regression suite for the simulation and learning hot paths, no SUMO
+needed: the episode and driver updates run on the surrogate backend.
+
+Measures a full SimulationRunner episode, driver updates, QTable
+update/choose_action, the reward functions, aggregation of 10k runs
+and model save/load, and writes them to a JSON file. compare fails
+(exit 1) when a metric got worse than the baseline by more than the
+threshold.
+
+    python -m benchmarks.suite run --out benchmarks/results/latest.json
+    python -m benchmarks.suite compare benchmarks/results/baseline.json \\
+        benchmarks/results/latest.json --threshold 0.2
+    python -m benchmarks.suite run --quick --baseline benchmarks/results/baseline.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+from traci import constants as tc
+
+from benchmarks.bench_analytics import synthetic_table
+from benchmarks.bench_qtable import ACTIONS, make_transitions, per_sec
+from src.agents.agent_manager import AgentManager
+from src.agents.learning.q_table import QTable, DenseQTable
+from src.agents.learning.rewards import risky_reward, safe_reward
+from src.metrics import analytics
+from src.metrics.metrics_collector import MetricsCollector, StreamingAggregator
+from src.simulation import surrogate
+from src.simulation.backend import active_backend, select_backend, traci
+from src.simulation.simulation_runner import SimulationRunner
+from src.simulation.world_snapshot import WorldSnapshot
+
+# name -> (unit, higher_is_better)
+METRICS = {
+    "episode_steps_per_sec": ("steps/s", True),
+    "driver_updates_per_sec": ("updates/s", True),
+    "qtable_updates_per_sec": ("updates/s", True),
+    "qtable_choices_per_sec": ("choices/s", True),
+    "dense_qtable_updates_per_sec": ("updates/s", True),
+    "dense_qtable_choices_per_sec": ("choices/s", True),
+    "safe_reward_per_sec": ("calls/s", True),
+    "risky_reward_per_sec": ("calls/s", True),
+    "stream_aggregation_sec_per_10k_runs": ("s", False),
+    "collector_averages_sec_per_10k_runs": ("s", False),
+    "analytics_averages_sec_per_10k_runs": ("s", False),
+    "model_save_ms": ("ms", False),
+    "model_load_ms": ("ms", False),
+    "pickle_model_save_ms": ("ms", False),
+    "pickle_model_load_ms": ("ms", False),
+}
+
+# full sizes, --quick divides them by QUICK_FACTOR
+SIZES = {"steps": 3000, "updates": 20_000, "transitions": 100_000, "runs": 10_000}
+QUICK_FACTOR = 10
+# saves/loads per timing, one takes well under a millisecond
+MODEL_LOOPS = 50
+
+
+def best_time(fn, repeats: int) -> float:
+    """Fastest of repeats calls of fn, in seconds"""
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_episode(steps: int, repeats: int) -> dict:
+    """One SimulationRunner episode of steps steps, fresh tables every time"""
+    runner = SimulationRunner("sumo", "unused.sumocfg", max_steps=steps)
+    with tempfile.TemporaryDirectory() as model_dir:
+        def episode():
+            random.seed(0)
+            mgr = AgentManager(dense_q=True)
+            mgr.model_dir = model_dir
+            runner.run(mgr)
+        return {"episode_steps_per_sec": steps / best_time(episode, repeats)}
+
+
+def _seeded_worlds(vehicle_ids: list[str], n: int, seed: int = 0) -> list:
+    """Snapshots with every value the drivers read already cached"""
+    rng = random.Random(seed)
+    worlds = []
+    for k in range(n):
+        world = WorldSnapshot()
+        now = float(k)
+        world.seed(None, {tc.VAR_TIME: now})
+        for vid in vehicle_ids:
+            tls_id = f"tls_{vid}"
+            next_tls = [] if rng.random() < 0.1 else [
+                (tls_id, 0, rng.uniform(0, 80), "r")
+            ]
+            world.seed(vid, {
+                tc.VAR_SPEED: rng.choice([0.0, rng.uniform(0, 25)]),
+                tc.VAR_ALLOWED_SPEED: 13.89,
+                tc.VAR_NEXT_TLS: next_tls,
+            })
+            world.seed(tls_id, {
+                tc.TL_RED_YELLOW_GREEN_STATE: rng.choice(["GGrr", "yyrr", "rrrr"]),
+                tc.TL_NEXT_SWITCH: now + rng.uniform(0, 30),
+                tc.TL_PHASE_DURATION: 30.0,
+            })
+        worlds.append(world)
+    return worlds
+
+
+def bench_drivers(updates: int, repeats: int) -> dict:
+    """QLearningDriver.update of both drivers, the step served from cache"""
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as model_dir:
+        traci.start(["sumo"])
+        try:
+            mgr = AgentManager(dense_q=True)
+            mgr.model_dir = model_dir
+            mgr.inject_agents()
+            drivers = [mgr.safe_driver, mgr.risky_driver]
+            worlds = _seeded_worlds([d.vehicle_id for d in drivers], 256)
+
+            def run():
+                for k in range(updates // len(drivers)):
+                    world = worlds[k % len(worlds)]
+                    for driver in drivers:
+                        driver.update(world)
+            seconds = best_time(run, repeats)
+        finally:
+            traci.close()
+    return {"driver_updates_per_sec": updates // len(drivers) * len(drivers) / seconds}
+
+
+def bench_qtables(transitions: int, repeats: int) -> dict:
+    data = make_transitions(transitions)
+    out = {}
+    for prefix, table in (("qtable", QTable(ACTIONS)), ("dense_qtable", DenseQTable(ACTIONS))):
+        def updates():
+            for s, a, r, ns in data:
+                table.update(s, a, r, ns)
+
+        def choices():
+            for s, _a, _r, _ns in data:
+                table.choose_action(s)
+        out[f"{prefix}_updates_per_sec"] = per_sec(updates, transitions, repeats)
+        out[f"{prefix}_choices_per_sec"] = per_sec(choices, transitions, repeats)
+    return out
+
+
+def bench_rewards(transitions: int, repeats: int) -> dict:
+    data = make_transitions(transitions)
+
+    def safe():
+        for s, a, _r, ns in data:
+            safe_reward(s, a, ns, 1.5, 0.5)
+
+    def risky():
+        for s, a, _r, ns in data:
+            risky_reward(s, a, ns, s[1], 3)
+    return {
+        "safe_reward_per_sec": per_sec(safe, transitions, repeats),
+        "risky_reward_per_sec": per_sec(risky, transitions, repeats),
+    }
+
+
+def bench_aggregation(runs: int, repeats: int) -> dict:
+    """Averages over runs two-agent episodes, scaled to 10k runs"""
+    table = synthetic_table(2 * runs)
+    episodes = list(table)
+    collector = MetricsCollector()
+
+    def stream():
+        # what batch.main does as each run finishes
+        running = StreamingAggregator()
+        for rows in episodes:
+            running.add_run(rows)
+            collector.summarise_run(rows)
+        running.rows()
+    scale = 10_000 / runs
+    return {
+        "stream_aggregation_sec_per_10k_runs": scale * best_time(stream, repeats),
+        "collector_averages_sec_per_10k_runs":
+            scale * best_time(lambda: collector.compute_averages(table), repeats),
+        "analytics_averages_sec_per_10k_runs":
+            scale * best_time(lambda: analytics.averages_rows(table), repeats),
+    }
+
+
+def bench_models(transitions: int, repeats: int) -> dict:
+    """Save/load of a table trained on transitions, .qtab and legacy pickle"""
+    table = DenseQTable(ACTIONS)
+    for s, a, r, ns in make_transitions(transitions):
+        table.update(s, a, r, ns)
+    out = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for prefix, name in (("", "model.qtab"), ("pickle_", "model.pkl")):
+            path = os.path.join(tmp, name)
+
+            def save():
+                for _ in range(MODEL_LOOPS):
+                    table.save(path)
+
+            def load():
+                for _ in range(MODEL_LOOPS):
+                    DenseQTable(ACTIONS).load(path)
+            out[f"{prefix}model_save_ms"] = 1000 * best_time(save, repeats) / MODEL_LOOPS
+            out[f"{prefix}model_load_ms"] = 1000 * best_time(load, repeats) / MODEL_LOOPS
+    return out
+
+
+def run_suite(quick: bool = False, repeats: int = 3) -> dict:
+    """All metrics, with the surrogate as TraCI backend while they run"""
+    sizes = {k: v // QUICK_FACTOR if quick else v for k, v in SIZES.items()}
+    previous = active_backend()
+    select_backend("surrogate")
+    values = {}
+    try:
+        values.update(bench_episode(sizes["steps"], repeats))
+        values.update(bench_drivers(sizes["updates"], repeats))
+    finally:
+        surrogate.close()
+        select_backend(previous)
+    values.update(bench_qtables(sizes["transitions"], repeats))
+    values.update(bench_rewards(sizes["transitions"], repeats))
+    values.update(bench_aggregation(sizes["runs"], repeats))
+    values.update(bench_models(sizes["transitions"], repeats))
+
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "numpy": np.__version__,
+            "quick": quick,
+            "repeats": repeats,
+            "sizes": sizes,
+        },
+        "metrics": {
+            name: {"value": round(values[name], 6), "unit": unit,
+                   "higher_is_better": higher}
+            for name, (unit, higher) in METRICS.items()
+        },
+    }
+
+
+def compare(baseline: dict, results: dict, threshold: float = 0.2) -> tuple[list, list]:
+    """
+    (report lines, regressed metric names). A metric regresses when it is
+    worse than the baseline by more than threshold (0.2 = 20%); metrics
+    only in one of the files are listed but never fail
+    """
+    lines, regressed = [], []
+    base, new = baseline["metrics"], results["metrics"]
+    for name in list(base) + [n for n in new if n not in base]:
+        if name not in base or name not in new:
+            where = "baseline" if name in base else "results"
+            lines.append(f"{name:<40} only in {where}")
+            continue
+        old_value, value = base[name]["value"], new[name]["value"]
+        higher = new[name]["higher_is_better"]
+        change = (value - old_value) / old_value if old_value else 0.0
+        worse = -change if higher else change
+        status = "REGRESSED" if worse > threshold else "ok"
+        if worse > threshold:
+            regressed.append(name)
+        lines.append(f"{name:<40}{old_value:>14.4g}{value:>14.4g}{change:>+9.1%}  {status}")
+    return lines, regressed
+
+
+def _load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write(path: str, results: dict) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(results, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _report(baseline: dict, results: dict, threshold: float) -> int:
+    lines, regressed = compare(baseline, results, threshold)
+    print(f"{'metric':<40}{'baseline':>14}{'results':>14}{'change':>9}")
+    print("\n".join(lines))
+    if regressed:
+        print(f"{len(regressed)} metric(s) regressed by more than {threshold:.0%}: "
+              f"{', '.join(regressed)}")
+        return 1
+    print(f"no regression beyond {threshold:.0%}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="Measure and write the results JSON")
+    run.add_argument("--out", default=os.path.join("benchmarks", "results", "latest.json"))
+    run.add_argument("--repeats", type=int, default=3)
+    run.add_argument("--quick", action="store_true",
+                     help=f"Sizes divided by {QUICK_FACTOR}, rates stay comparable")
+    run.add_argument("--baseline", default=None, help="Compare against it afterwards")
+    run.add_argument("--threshold", type=float, default=0.2)
+    cmp_ = sub.add_parser("compare", help="Fail if results regressed against baseline")
+    cmp_.add_argument("baseline")
+    cmp_.add_argument("results")
+    cmp_.add_argument("--threshold", type=float, default=0.2,
+                      help="Allowed relative slowdown per metric (default: 0.2)")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        sys.exit(_report(_load(args.baseline), _load(args.results), args.threshold))
+
+    logging.getLogger().setLevel(logging.WARNING)
+    results = run_suite(args.quick, args.repeats)
+    _write(args.out, results)
+    for name, metric in results["metrics"].items():
+        print(f"{name:<40}{metric['value']:>14.4g} {metric['unit']}")
+    print(f"wrote {args.out}")
+    if args.baseline is not None:
+        sys.exit(_report(_load(args.baseline), results, args.threshold))
+
+
+if __name__ == "__main__":
+    main()
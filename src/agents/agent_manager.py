@@ -1,14 +1,19 @@
 import random
 import logging
-import traci
 import os
 
-from traci import TraCIException
+import numpy as np
 from traci import constants as tc
 
+from .fleet import AgentFleet, PolicyGroup
 from .safe_driver import SafeDriver
 from .risky_driver import RiskyDriver
+from .learning.replay import ReplayBuffer
+from src.simulation.backend import traci
+from src.simulation.net_index import NetIndex
+from src.simulation.route_pool import RoutePool
 from src.simulation.tls_recorder import TLSEventRecorder
+from src.simulation.world_snapshot import WorldSnapshot
 
 logger = logging.getLogger(__name__)
 
@@ -19,9 +24,27 @@ class AgentManager:
         - injection 
         - updating 
         - epsilon-decay
+
+    With a route_pool, routes come from the precomputed pool (no TraCI
+    routing), route_bins restricts the pool strata and stratified=True
+    samples strata uniformly. With a net_index, edge ids and speed
+    limits come from the cached network index instead of TraCI.
+    dense_q=True gives both drivers the numpy-backed DenseQTable.
+
+    n_agents switches to fleet mode: n_agents vehicles (safe_1..safe_k,
+    risky_1..risky_m, safe gets the odd one) on their own routes, each
+    policy's agents share its driver's Q-table and are stepped together
+    as one batch by AgentFleet
+
+    replay turns on experience replay for both drivers (implies dense_q):
+    capacity, prioritized and the enable_replay arguments batch_size,
+    every and between_episodes, e.g. {"capacity": 50000, "every": 4}
     """
 
-    def __init__(self):
+    def __init__(self, route_pool: RoutePool | None = None,
+                 route_bins: dict | None = None, stratified: bool = False,
+                 net_index: NetIndex | None = None, dense_q: bool = False,
+                 n_agents: int | None = None, replay: dict | None = None):
         self.agents = []
         self.safe_driver = None
         self.risky_driver = None
@@ -29,53 +52,51 @@ class AgentManager:
         self.chosen_route_index = None
         self.route_id = None
         self.destination_edge = None
+        self.route_pool = route_pool
+        self.route_bins = route_bins or {}
+        self.stratified = stratified
+        self.net_index = net_index
+        # fleet mode and replay need the array-backed tables
+        self.dense_q = dense_q or n_agents is not None or replay is not None
+        self.replay = replay
+        self.n_agents = n_agents
+        self.fleet: AgentFleet | None = None
+        self.destinations: dict = {}
 
     def validate_route_edges(self, from_edge: str, to_edge: str) -> None:
-        valid_edges = traci.edge.getIDList()
-        if from_edge not in valid_edges or to_edge not in valid_edges:
+        if self.net_index is not None:
+            valid = self.net_index.has_edge(from_edge) and self.net_index.has_edge(to_edge)
+        else:
+            valid_edges = traci.edge.getIDList()
+            valid = from_edge in valid_edges and to_edge in valid_edges
+        if not valid:
             raise ValueError(f"Invalid route edges: {from_edge} → {to_edge}")
         # logger.info("Route validation passed for %s → %s", from_edge, to_edge)
 
-    def inject_agents(self) -> None:
-        
-        # pick a valid random route through sumos router
-        edges = traci.edge.getIDList()
-        start_edge = end_edge = None
-        self.route_edges = []
-
-        for _ in range(100):
-            a, b = random.sample(edges, 2)
-            try:
-                candidate = traci.simulation.findRoute(a, b)
-            except TraCIException:
-                continue
-            if len(candidate.edges) > 1:
-                start_edge, end_edge = a, b
-                self.route_edges = candidate.edges
-                break
-
-        # error no route found
-        if not self.route_edges:
-            raise RuntimeError("Could not find any non-degenerate route in 100 attempts")
-
-        # register the successful route
-        self.route_id        = f"route_{start_edge}_to_{end_edge}"
-        self.destination_edge = self.route_edges[-1]
-        traci.route.add(self.route_id, self.route_edges)
+    def model_path(self, name: str) -> str:
+        """Binary .qtab model if present, else the legacy pickle"""
+        path = os.path.join(self.model_dir, name + ".qtab")
+        if os.path.exists(path):
+            return path
+        return os.path.join(self.model_dir, name + ".pkl")
 
+    def load_drivers(self) -> None:
+        """
+        Instantiate both drivers with their pretrained Q-tables,
+        or reset their episode state if they already exist
+        """
         safe_id, risky_id = "safe_1", "risky_1"
 
-        # --- instantiate or reset drivers
         # safe
         if self.safe_driver is None:
             recorder = TLSEventRecorder()
-            self.safe_driver = SafeDriver(safe_id, recorder)
+            self.safe_driver = SafeDriver(safe_id, recorder, dense=self.dense_q)
             self.agents.append(self.safe_driver)
 
             # load pretrained SafeDriver Q-table
-            safe_path = os.path.join(self.model_dir, "safe_driver_qtable.pkl")
-            self.safe_driver.qtable.load(safe_path)
+            self.safe_driver.qtable.load(self.model_path("safe_driver_qtable"))
             self.safe_driver.qtable.epsilon = 0.99 # epsilon not loaded = decays each batch
+            self._enable_replay(self.safe_driver)
         else:
             self.safe_driver.vehicle_id = safe_id
             self.safe_driver.prev_state = None
@@ -86,12 +107,12 @@ class AgentManager:
         # risky
         if self.risky_driver is None:
             recorder = TLSEventRecorder()
-            self.risky_driver = RiskyDriver(risky_id, self.route_id, recorder)
+            self.risky_driver = RiskyDriver(risky_id, self.route_id, recorder, dense=self.dense_q)
             self.agents.append(self.risky_driver)
             # load pretrained RiskyDriver Q-table
-            risky_path = os.path.join(self.model_dir, "risky_driver_qtable.pkl")
-            self.risky_driver.qtable.load(risky_path)
+            self.risky_driver.qtable.load(self.model_path("risky_driver_qtable"))
             self.risky_driver.qtable.epsilon = 0.99
+            self._enable_replay(self.risky_driver)
         else:
             self.risky_driver.vehicle_id      = risky_id
             self.risky_driver.prev_state      = None
@@ -99,6 +120,76 @@ class AgentManager:
             self.risky_driver.recorder        = TLSEventRecorder()
             self.risky_driver.last_tls_phase  = None
 
+    def _enable_replay(self, driver) -> None:
+        if self.replay is None:
+            return
+        opts = dict(self.replay)
+        buffer = ReplayBuffer(opts.pop("capacity", 50_000), opts.pop("prioritized", False),
+                              rng=np.random.default_rng(random.getrandbits(64)))
+        driver.enable_replay(buffer, **opts)
+
+    def replay_state(self) -> dict | None:
+        """Both drivers' replay buffers and replay counters, for checkpoints"""
+        if self.replay is None:
+            return None
+        return {
+            policy: {"buffer": driver.replay.state(), "since_replay": driver._since_replay}
+            for policy, driver in (("safe", self.safe_driver), ("risky", self.risky_driver))
+        }
+
+    def restore_replay(self, state: dict | None) -> None:
+        if self.replay is None or state is None:
+            return
+        for policy, driver in (("safe", self.safe_driver), ("risky", self.risky_driver)):
+            driver.replay.restore(state[policy]["buffer"])
+            driver._since_replay = state[policy]["since_replay"]
+
+    def replay_episode_end(self) -> None:
+        """Between-episode replay of both drivers (no-op without replay)"""
+        for driver in (self.safe_driver, self.risky_driver):
+            if driver is not None:
+                driver.replay_episode_end()
+
+    def _find_route(self) -> tuple[str, str]:
+        # pick a valid random route through sumos router
+        if self.net_index is not None:
+            edges = self.net_index.edge_list
+        else:
+            edges = traci.edge.getIDList()
+        start_edge = end_edge = None
+        self.route_edges = []
+
+        for _ in range(100):
+            a, b = random.sample(edges, 2)
+            try:
+                candidate = traci.simulation.findRoute(a, b)
+            except traci.TraCIException:
+                continue
+            if len(candidate.edges) > 1:
+                start_edge, end_edge = a, b
+                self.route_edges = candidate.edges
+                break
+
+        # error no route found
+        if not self.route_edges:
+            raise RuntimeError("Could not find any non-degenerate route in 100 attempts")
+        return start_edge, end_edge
+
+    def _pick_route(self) -> dict | None:
+        """Sets route_edges (and chosen_route_index), returns the pool route if any"""
+        if self.route_pool is not None:
+            # O(1) pick from the offline pool, already validated
+            self.chosen_route_index = self.route_pool.sample(
+                stratified=self.stratified, **self.route_bins
+            )
+            route = self.route_pool.routes[self.chosen_route_index]
+            self.route_edges = route["edges"]
+            return route
+        self._find_route()
+        return None
+
+    def _route_max_speed(self, route: dict | None) -> float:
+
         # --- get speed limit
         def edge_speed(edge_id: str) -> float:
             # edge parameter 
@@ -112,8 +203,30 @@ class AgentManager:
                 return traci.lane.getMaxSpeed(lane0)
             return 0.0
 
+        if route is not None:
+            return route["max_speed"]
+        if self.net_index is not None:
+            return max(self.net_index.edge_speed(e) for e in self.route_edges)
         route_edges = traci.route.getEdges(self.route_id)
-        route_max = max(edge_speed(e) for e in route_edges)
+        return max(edge_speed(e) for e in route_edges)
+
+    def inject_agents(self) -> None:
+        if self.n_agents is not None:
+            self._inject_fleet()
+            return
+
+        route = self._pick_route()
+        start_edge, end_edge = self.route_edges[0], self.route_edges[-1]
+
+        # register the successful route
+        self.route_id        = f"route_{start_edge}_to_{end_edge}"
+        self.destination_edge = self.route_edges[-1]
+        traci.route.add(self.route_id, self.route_edges)
+
+        safe_id, risky_id = "safe_1", "risky_1"
+        self.load_drivers()
+
+        route_max = self._route_max_speed(route)
         # logger.info("Route max speed limit across edges: %.2f", route_max)
 
         # colours, routing, lanes
@@ -156,17 +269,95 @@ class AgentManager:
         #     self.chosen_route_index,
         # )
 
-    # updates agents each step
-    def update_agents(self, step: int) -> None:
-        active = set(traci.vehicle.getIDList())
+    def _inject_fleet(self) -> None:
+        """n_agents vehicles, one random route each, stepped as one batch"""
+        self.load_drivers()
+        n_safe = (self.n_agents + 1) // 2
+        ids = {
+            "safe": [f"safe_{i}" for i in range(1, n_safe + 1)],
+            "risky": [f"risky_{i}" for i in range(1, self.n_agents - n_safe + 1)],
+        }
+        drivers = {"safe": self.safe_driver, "risky": self.risky_driver}
+        colors = {"safe": (0, 0, 255), "risky": (255, 0, 0)}
+
+        self.destinations = {}
+        first_route_index = None
+        for policy, vids in ids.items():
+            for vid in vids:
+                route = self._pick_route()
+                if first_route_index is None:
+                    first_route_index = self.chosen_route_index
+                self.route_id = f"route_{vid}"
+                traci.route.add(self.route_id, self.route_edges)
+                route_max = self._route_max_speed(route)
+
+                traci.vehicle.add(vid, routeID=self.route_id,
+                                  departSpeed="max", departLane="best")
+                traci.vehicle.setColor(vid, colors[policy])
+                traci.vehicle.setMaxSpeed(vid, route_max * drivers[policy].max_speed_excess)
+                traci.vehicle.setSpeedMode(vid, 0)
+                self.destinations[vid] = self.route_edges[-1]
+
+        # episode label = first agent's pool route, as in the two-agent mode
+        self.chosen_route_index = first_route_index
+        self.destination_edge = self.destinations[ids["safe"][0]]
+        self.fleet = AgentFleet({
+            policy: PolicyGroup(drivers[policy], vids, rng=np.random.default_rng(random.getrandbits(64)))
+            for policy, vids in ids.items() if vids
+        })
+        logger.info("Injected %r", self.fleet)
+
+    # updates agents each step, all reads go through one shared snapshot
+    def update_agents(self, step: int, world: WorldSnapshot | None = None) -> None:
+        world = world if world is not None else WorldSnapshot()
+        if self.fleet is not None:
+            self.fleet.step(world)
+            return
         for agent in self.agents:
             vid = getattr(agent, "vehicle_id", None)
-            if vid in active:
-                agent.update()
+            if world.is_active(vid):
+                agent.update(world)
+
+    def attach_experience(self, log) -> None:
+        """Log every Q-update of the injected agents to an ExperienceLog"""
+        drivers = {"safe": self.safe_driver, "risky": self.risky_driver}
+        for policy, driver in drivers.items():
+            writer = log.policy(policy, driver.qtable.actions)
+            driver.experience = writer
+            if self.fleet is not None and policy in self.fleet.groups:
+                self.fleet.groups[policy].experience = writer
 
     def get_destination_edge(self) -> str:
         return self.destination_edge
 
+    def agent_destinations(self) -> dict:
+        """vehicle id -> destination edge of every injected agent"""
+        if self.fleet is not None:
+            return dict(self.destinations)
+        return {
+            self.safe_driver.vehicle_id: self.destination_edge,
+            self.risky_driver.vehicle_id: self.destination_edge,
+        }
+
+    def speed_bin(self, vid: str, speed: float) -> int:
+        """Speed bin of an agent this step, as its policy encodes it"""
+        if self.fleet is not None:
+            return self.fleet.speed_bin(vid)
+        driver = self.safe_driver if vid == self.safe_driver.vehicle_id else self.risky_driver
+        return driver._speed_bin(speed)
+
+    def last_decision(self, vid: str) -> tuple[str | None, float | None]:
+        """Action in force for an agent and the reward of its latest update"""
+        if self.fleet is not None:
+            return self.fleet.decision(vid)
+        driver = self.safe_driver if vid == self.safe_driver.vehicle_id else self.risky_driver
+        return driver.last_action, driver.last_reward
+
+    @staticmethod
+    def policy_of(vid: str) -> str:
+        """safe_12 -> safe"""
+        return vid.rsplit("_", 1)[0]
+
     def get_route_label(self) -> int:
         return self.chosen_route_index
 
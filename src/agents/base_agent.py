@@ -3,6 +3,6 @@ class BaseAgent:
         self.vehicle_id = vehicle_id
         self.route = route
 
-    def update(self):
+    def update(self, world=None):
         """Update agent state, is overridden by subclasses."""
         pass
\ No newline at end of file
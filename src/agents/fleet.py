@@ -0,0 +1,233 @@
+"""
+Batched control of many learning agents
+    - agents of one policy share that policy's DenseQTable,
+    - each step encodes, rewards, updates and picks actions for all active
+      agents of a policy with array operations instead of agent.update(),
+    - rewards come from lookup tables built from the driver's reward(),
+    - TLS are read once per step however many agents approach them,
+    - setSpeed is only sent when an agent's target speed changes.
+"""
+
+import logging
+
+import numpy as np
+
+from src.agents.learning.q_learning_driver import QLearningDriver
+from src.agents.learning.q_table import DenseQTable
+from src.simulation.backend import traci
+from src.simulation.world_snapshot import WorldSnapshot
+
+logger = logging.getLogger(__name__)
+
+# encode_state bins, see SafeDriver/RiskyDriver.encode_state
+DIST_EDGES = np.array([10.0, 20.0, 40.0])
+N_BINS = 4
+
+
+def tls_phase(raw: str) -> str:
+    raw = raw.lower()
+    return 'GREEN' if 'g' in raw else ('AMBER' if 'y' in raw else 'RED')
+
+
+class PolicyGroup:
+    """
+    All agents driving one policy. driver is the policy template: its
+    qtable (shared), speed ratios, SLOW deceleration and reward()
+    """
+
+    def __init__(self, driver: QLearningDriver, vehicle_ids: list[str],
+                 rng: np.random.Generator | None = None):
+        if not isinstance(driver.qtable, DenseQTable):
+            raise TypeError("PolicyGroup needs a driver with a DenseQTable (dense=True)")
+        self.driver = driver
+        self.qtable: DenseQTable = driver.qtable
+        self.vehicle_ids = list(vehicle_ids)
+        self.slot = {vid: i for i, vid in enumerate(self.vehicle_ids)}
+        self.rng = rng or np.random.default_rng()
+
+        dims = self.qtable.state_dims
+        self._phase_index = {phase: i for i, phase in enumerate(dims[0])}
+        self._dims = tuple(len(d) for d in dims)
+
+        # GO_* speeds as a multiple of the allowed speed, STOP is 0
+        actions = self.qtable.actions
+        factors = {
+            'STOP': 0.0, 'GO_COMPLIANT': 1.0,
+            'GO_OVERSHOOT_S': driver.small_excess_ratio,
+            'GO_OVERSHOOT_L': driver.max_speed_excess,
+        }
+        self.speed_factor = np.array([factors.get(a, np.nan) for a in actions])
+        self.slow_action = actions.index('SLOW')
+
+        self._rewards = None
+        self._reward_epsilon = None
+        # experience.PolicyLog set by AgentManager.attach_experience
+        self.experience = None
+        self.commands = {"sent": 0, "skipped": 0}
+        self.reset()
+
+    def __repr__(self) -> str:
+        return f"PolicyGroup(agents={len(self.vehicle_ids)}, qtable={self.qtable!r})"
+
+    def reset(self) -> None:
+        n = len(self.vehicle_ids)
+        self.prev_state = np.full(n, -1, dtype=np.intp)
+        self.last_action = np.full(n, -1, dtype=np.intp)
+        self.prev_speed = np.zeros(n)
+        self.speed_bin = np.zeros(n, dtype=np.intp)
+        # reward of the latest update, nan = none yet (trajectory recording)
+        self.last_reward = np.full(n, np.nan)
+        # last setSpeed value per agent, nan = none in force
+        self.last_speed_cmd = np.full(n, np.nan)
+
+    # --- REWARDS
+
+    def reward_tables(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        R[prev_state, action, speed_bin, ttl_bin] at decel=0 and
+        D[prev_state, action], the reward per m/s of deceleration.
+        Assumes reward() reads only the speed and time-to-red bins of
+        new_state (true for both drivers). Rebuilt when epsilon changes
+        as SafeDriver's reward depends on it
+        """
+        if self._rewards is not None and self._reward_epsilon == self.qtable.epsilon:
+            return self._rewards
+
+        states, actions = self.qtable.states, self.qtable.actions
+        R = np.zeros((len(states), len(actions), N_BINS, N_BINS))
+        D = np.zeros((len(states), len(actions)))
+        reward = self.driver.reward
+        for s, prev in enumerate(states):
+            for a, action in enumerate(actions):
+                for speed_b in range(N_BINS):
+                    for ttl_b in range(N_BINS):
+                        R[s, a, speed_b, ttl_b] = reward(prev, action, ('GREEN', 3, speed_b, ttl_b), 0.0)
+                D[s, a] = reward(prev, action, ('GREEN', 3, 0, 0), 1.0) - R[s, a, 0, 0]
+
+        self._rewards = (R, D)
+        self._reward_epsilon = self.qtable.epsilon
+        return self._rewards
+
+    # --- STEP
+
+    def encode(self, world: WorldSnapshot, vids: list[str]):
+        """Encoded states, speeds and allowed speeds of vids"""
+        n = len(vids)
+        speed = np.fromiter((world.speed(v) for v in vids), float, n)
+        allowed = np.fromiter((world.allowed_speed(v) for v in vids), float, n)
+
+        # free road = treat like green/farthest tls
+        phase = np.full(n, self._phase_index['GREEN'], dtype=np.intp)
+        dist = np.full(n, np.inf)
+        ttl = np.full(n, N_BINS - 1, dtype=np.intp)
+
+        tls_cache: dict = {}
+        now = world.time()
+        for k, vid in enumerate(vids):
+            next_tls = world.next_tls(vid)
+            if not next_tls:
+                continue
+            tls_id, _, d, _ = next_tls[0]
+            if tls_id not in tls_cache:
+                frac = max(0.0, (world.next_switch(tls_id) - now) / world.phase_duration(tls_id))
+                tls_cache[tls_id] = (
+                    self._phase_index[tls_phase(world.tls_state(tls_id))],
+                    min(N_BINS - 1, int(frac * N_BINS)),
+                )
+            phase[k], ttl[k] = tls_cache[tls_id]
+            dist[k] = d
+
+        dist_b = np.searchsorted(DIST_EDGES, dist, side='left')
+        speed_b = np.where(
+            speed == 0, 0,
+            np.where(speed <= allowed, 1,
+                     np.where(speed <= allowed * self.driver.small_excess_ratio, 2, 3)),
+        )
+        states = np.ravel_multi_index((phase, dist_b, speed_b, ttl), self._dims)
+        return states, speed_b, ttl, speed, allowed
+
+    def step(self, world: WorldSnapshot) -> None:
+        vids = [vid for vid in self.vehicle_ids if world.is_active(vid)]
+        if not vids:
+            return
+        idx = np.fromiter((self.slot[v] for v in vids), np.intp, len(vids))
+        states, speed_b, ttl_b, speed, allowed = self.encode(world, vids)
+
+        # q-update for agents that acted last step
+        learn = self.prev_state[idx] >= 0
+        if learn.any():
+            R, D = self.reward_tables()
+            prev = self.prev_state[idx][learn]
+            act = self.last_action[idx][learn]
+            decel = np.maximum(0.0, self.prev_speed[idx][learn] - speed[learn])
+            rewards = R[prev, act, speed_b[learn], ttl_b[learn]] + D[prev, act] * decel
+            self.qtable.update_batch(prev, act, rewards, states[learn])
+            self.last_reward[idx[learn]] = rewards
+            if self.experience is not None:
+                self.experience.add_batch(prev, act, rewards, states[learn], self.qtable.epsilon)
+            if self.driver.replay is not None:
+                self.driver.remember(prev, act, rewards, states[learn])
+
+        actions = self.qtable.choose_batch(states, self.rng)
+        self._apply(vids, idx, actions, allowed)
+
+        self.prev_state[idx] = states
+        self.last_action[idx] = actions
+        self.prev_speed[idx] = speed
+        self.speed_bin[idx] = speed_b
+
+    def _apply(self, vids, idx, actions, allowed) -> None:
+        targets = allowed * self.speed_factor[actions]
+        last = self.last_speed_cmd[idx]
+        for k, vid in enumerate(vids):
+            if actions[k] == self.slow_action:
+                traci.vehicle.slowDown(vid, 0.0, self.driver.slow_decel)
+                last[k] = np.nan
+            elif targets[k] != last[k]:
+                traci.vehicle.setSpeed(vid, targets[k])
+                last[k] = targets[k]
+            else:
+                self.commands["skipped"] += 1
+                continue
+            self.commands["sent"] += 1
+        self.last_speed_cmd[idx] = last
+
+
+class AgentFleet:
+    """One PolicyGroup per policy, stepped together by AgentManager"""
+
+    def __init__(self, groups: dict[str, PolicyGroup]):
+        self.groups = groups
+        self._group_of = {vid: g for g in groups.values() for vid in g.vehicle_ids}
+
+    def __repr__(self) -> str:
+        sizes = {name: len(g.vehicle_ids) for name, g in self.groups.items()}
+        return f"AgentFleet({sizes})"
+
+    def vehicle_ids(self) -> list[str]:
+        return list(self._group_of)
+
+    def step(self, world: WorldSnapshot) -> None:
+        for group in self.groups.values():
+            group.step(world)
+
+    def speed_bin(self, vid: str) -> int:
+        group = self._group_of[vid]
+        return int(group.speed_bin[group.slot[vid]])
+
+    def decision(self, vid: str) -> tuple[str | None, float | None]:
+        """Latest action and reward of vid, None where there is none yet"""
+        group = self._group_of[vid]
+        k = group.slot[vid]
+        action, reward = group.last_action[k], group.last_reward[k]
+        return (
+            group.qtable.actions[action] if action >= 0 else None,
+            None if np.isnan(reward) else float(reward),
+        )
+
+    @property
+    def commands(self) -> dict:
+        return {
+            key: sum(g.commands[key] for g in self.groups.values())
+            for key in ("sent", "skipped")
+        }
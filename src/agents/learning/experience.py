@@ -0,0 +1,259 @@
+"""
+Recorded Q-learning transitions for offline training
+    - ExperienceLog: every update an agent makes (policy, state, action,
+      reward, next_state, epsilon) as one fixed-size row, buffered and
+      appended to experience.bin, with meta.json (policies, their actions,
+      the state binning, episodes) rewritten atomically after each episode,
+    - states are row ids of the DenseQTable state space, actions column ids
+      of the policy's action list, so rows replay straight into update_batch,
+    - ExperienceReader: np.memmap view of the rows, per-policy transitions.
+
+    python -m src.agents.learning.experience info DIR
+"""
+
+import argparse
+import itertools
+import json
+import os
+
+import numpy as np
+
+from src.agents.learning.q_table import STATE_DIMS
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+DATA_FILE = "experience.bin"
+CHUNK_ROWS = 65536
+EXPERIENCE_DIR = os.path.join(os.path.dirname(__file__), "experience_logs")
+
+# 18 bytes a transition, little-endian so files read the same on any machine
+EXPERIENCE_DTYPE = np.dtype([
+    ('episode', '<i4'),
+    ('policy', 'u1'),       # index into meta["policies"]
+    ('action', 'u1'),       # index into that policy's actions
+    ('state', '<u2'),
+    ('next_state', '<u2'),
+    ('reward', '<f4'),
+    ('epsilon', '<f4'),
+])
+
+
+def _read_meta(out_dir: str) -> dict | None:
+    path = os.path.join(out_dir, META_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        meta = json.load(f)
+    if meta.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported experience version {meta.get('version')}")
+    return meta
+
+
+class PolicyLog:
+    """Writes one policy's transitions into an ExperienceLog"""
+
+    def __init__(self, log: "ExperienceLog", code: int, actions: list[str]):
+        self.log = log
+        self.code = code
+        self.action_index = {action: i for i, action in enumerate(actions)}
+
+    def __repr__(self) -> str:
+        return f"PolicyLog({self.log.policies[self.code]!r})"
+
+    def add(self, state, action: str, reward: float, next_state, epsilon: float) -> None:
+        """One transition as QLearningDriver.update sees it (state tuples, action name)"""
+        index = self.log.state_index
+        self.log.append(self.code, index[state], self.action_index[action],
+                        reward, index[next_state], epsilon)
+
+    def add_batch(self, states, actions, rewards, next_states, epsilon: float) -> None:
+        """Encoded transitions as PolicyGroup.step hands them to update_batch"""
+        self.log.append_batch(self.code, states, actions, rewards, next_states, epsilon)
+
+
+class ExperienceLog:
+    """
+    Appends to the experience log in out_dir, continuing an existing one
+    (rows beyond its meta.json, e.g. from a crash, are cut off)
+    """
+
+    def __init__(self, out_dir: str = EXPERIENCE_DIR, chunk_rows: int = CHUNK_ROWS,
+                 state_dims: tuple = STATE_DIMS):
+        self.out_dir = out_dir
+        self.state_dims = tuple(tuple(dim) for dim in state_dims)
+        self.state_index = {s: i for i, s in enumerate(itertools.product(*self.state_dims))}
+        self.policies: list[str] = []
+        self.actions: dict[str, list[str]] = {}
+        self.episodes: list[dict] = []
+        self.rows = 0
+        self._buf = np.empty(chunk_rows, dtype=EXPERIENCE_DTYPE)
+        self._n = 0
+        self._start = None
+        self._route = None
+
+        os.makedirs(out_dir, exist_ok=True)
+        meta = _read_meta(out_dir)
+        if meta is not None:
+            if [list(dim) for dim in self.state_dims] != meta["state_dims"]:
+                raise ValueError(f"{out_dir}: logged with a different state space")
+            self.policies = meta["policies"]
+            self.actions = meta["actions"]
+            self.episodes = meta["episodes"]
+            self.rows = meta["rows"]
+        with open(self._data_path, "ab") as f:
+            f.truncate(self.rows * EXPERIENCE_DTYPE.itemsize)
+
+    def __repr__(self) -> str:
+        return (
+            f"ExperienceLog({self.out_dir!r}, episodes={len(self.episodes)}, "
+            f"rows={self.rows + self._n})"
+        )
+
+    @property
+    def _data_path(self) -> str:
+        return os.path.join(self.out_dir, DATA_FILE)
+
+    def policy(self, name: str, actions: list[str]) -> PolicyLog:
+        """Writer for policy name, registered on first use"""
+        if name not in self.actions:
+            self.policies.append(name)
+            self.actions[name] = list(actions)
+        elif self.actions[name] != list(actions):
+            raise ValueError(f"{name}: actions {actions} differ from the logged {self.actions[name]}")
+        return PolicyLog(self, self.policies.index(name), actions)
+
+    # --- RECORDING
+
+    def begin_episode(self, route_idx: int | None = None) -> None:
+        self._start = self.rows + self._n
+        self._route = route_idx
+
+    def append(self, policy: int, state: int, action: int, reward: float,
+               next_state: int, epsilon: float) -> None:
+        self._buf[self._n] = (len(self.episodes), policy, action, state, next_state,
+                              reward, epsilon)
+        self._n += 1
+        if self._n == len(self._buf):
+            self.flush()
+
+    def append_batch(self, policy: int, states, actions, rewards, next_states,
+                     epsilon: float) -> None:
+        n = len(states)
+        while self._n + n > len(self._buf):
+            # fill the buffer, flush, carry on with the rest
+            k = len(self._buf) - self._n
+            self.append_batch(policy, states[:k], actions[:k], rewards[:k],
+                              next_states[:k], epsilon)
+            states, actions, rewards, next_states = (
+                states[k:], actions[k:], rewards[k:], next_states[k:]
+            )
+            n -= k
+        rows = self._buf[self._n:self._n + n]
+        rows['episode'] = len(self.episodes)
+        rows['policy'] = policy
+        rows['action'] = actions
+        rows['state'] = states
+        rows['next_state'] = next_states
+        rows['reward'] = rewards
+        rows['epsilon'] = epsilon
+        self._n += n
+        if self._n == len(self._buf):
+            self.flush()
+
+    def flush(self) -> None:
+        """Append the buffered rows to experience.bin"""
+        if not self._n:
+            return
+        with open(self._data_path, "ab") as f:
+            f.write(self._buf[:self._n].tobytes())
+        self.rows += self._n
+        self._n = 0
+
+    def end_episode(self) -> None:
+        """Flush and publish the episode in meta.json"""
+        if self._start is None:
+            return
+        self.flush()
+        self.episodes.append({"start": self._start, "stop": self.rows, "route": self._route})
+        self._start = None
+        self._write_meta()
+
+    def close(self) -> None:
+        self.end_episode()
+
+    def _write_meta(self) -> None:
+        meta = {
+            "format": "experience",
+            "version": FORMAT_VERSION,
+            "rows": self.rows,
+            "dtype": EXPERIENCE_DTYPE.descr,
+            "state_dims": [list(dim) for dim in self.state_dims],
+            "policies": self.policies,
+            "actions": self.actions,
+            "episodes": self.episodes,
+        }
+        path = os.path.join(self.out_dir, META_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+
+class ExperienceReader:
+    """Read-only memory-mapped rows of a recorded experience log"""
+
+    def __init__(self, out_dir: str = EXPERIENCE_DIR):
+        meta = _read_meta(out_dir)
+        if meta is None:
+            raise FileNotFoundError(f"no {META_FILE} in {out_dir}")
+        self.out_dir = out_dir
+        self.meta = meta
+        self.policies: list[str] = meta["policies"]
+        self.actions: dict[str, list[str]] = meta["actions"]
+        self.state_dims = tuple(tuple(dim) for dim in meta["state_dims"])
+        self.episodes: list[dict] = meta["episodes"]
+        self.rows: int = meta["rows"]
+        self.data = (
+            np.memmap(os.path.join(out_dir, DATA_FILE), dtype=EXPERIENCE_DTYPE,
+                      mode="r", shape=(self.rows,))
+            if self.rows else np.empty(0, dtype=EXPERIENCE_DTYPE)
+        )
+
+    def __repr__(self) -> str:
+        return f"ExperienceReader({self.out_dir!r}, episodes={len(self.episodes)}, rows={self.rows})"
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def transitions(self, policy: str, episodes: slice | None = None) -> np.ndarray:
+        """policy's rows in the order they were learned, optionally some episodes only"""
+        rows = self.data
+        if episodes is not None:
+            eps = self.episodes[episodes]
+            if not eps:
+                return rows[:0]
+            rows = rows[eps[0]["start"]:eps[-1]["stop"]]
+        if policy not in self.policies:
+            return rows[:0]
+        return rows[rows['policy'] == self.policies.index(policy)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a recorded experience log")
+    parser.add_argument("command", choices=["info"])
+    parser.add_argument("path", nargs="?", default=EXPERIENCE_DIR)
+    args = parser.parse_args()
+
+    reader = ExperienceReader(args.path)
+    print(f"{args.path}: {len(reader.episodes)} episodes, {reader.rows} transitions "
+          f"({reader.rows * EXPERIENCE_DTYPE.itemsize / 1e6:.1f} MB)")
+    for policy in reader.policies:
+        rows = reader.transitions(policy)
+        if not len(rows):
+            continue
+        print(f"  {policy}: {len(rows)} transitions, reward mean {rows['reward'].mean():.3f}, "
+              f"epsilon {float(rows['epsilon'][0]):.3f} -> {float(rows['epsilon'][-1]):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Binary Q-table model format (.qtab)
+
+    b"QTAB" | uint32 header length | JSON header | pad to 64 bytes
+    float64 q-values, C order (states x actions) | uint8 visited flags
+
+The JSON header holds the format version, action list, binning spec
+(state_dims), epsilon/alpha/gamma, array offsets and free-form training
+metadata, so a model can be inspected with any JSON reader. The arrays
+are contiguous and can be memory-mapped read-only by many processes.
+
+    python -m src.agents.learning.model_format migrate            # models/*.pkl -> .qtab
+    python -m src.agents.learning.model_format info MODEL.qtab
+"""
+
+import argparse
+import datetime
+import glob
+import json
+import os
+import pickle
+import struct
+
+import numpy as np
+
+from src.agents.learning.q_table import QTable, DenseQTable
+
+MAGIC = b"QTAB"
+FORMAT_VERSION = 1
+MODEL_SUFFIX = ".qtab"
+ALIGN = 64
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), "models")
+
+
+def _as_dense(table: QTable) -> DenseQTable:
+    if isinstance(table, DenseQTable):
+        return table
+    dense = DenseQTable(table.actions, table.alpha, table.gamma, table.epsilon)
+    dense.from_dict(table.to_dict())
+    return dense
+
+
+def save_model(path: str, table: QTable, metadata: dict | None = None) -> None:
+    """Write table as a .qtab model (atomically, via a temp file)"""
+    dense = _as_dense(table)
+    q = np.ascontiguousarray(dense.q, dtype="<f8")
+    visited = np.ascontiguousarray(dense.visited, dtype=np.uint8)
+
+    header = {
+        "format": "qtab",
+        "version": FORMAT_VERSION,
+        "actions": list(dense.actions),
+        "state_dims": [list(dim) for dim in dense.state_dims],
+        "epsilon": dense.epsilon,
+        "alpha": dense.alpha,
+        "gamma": dense.gamma,
+        "dtype": "<f8",
+        "shape": list(q.shape),
+        "metadata": {
+            "saved_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            **(metadata or {}),
+        },
+    }
+    # offsets depend on the header length, which depends on the offsets
+    header["data_offset"] = header["visited_offset"] = 0
+    while True:
+        raw = json.dumps(header).encode("utf-8")
+        data_offset = -(-(len(MAGIC) + 4 + len(raw)) // ALIGN) * ALIGN
+        if header["data_offset"] == data_offset:
+            break
+        header["data_offset"] = data_offset
+        header["visited_offset"] = data_offset + q.nbytes
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = str(path) + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(raw)))
+        f.write(raw)
+        f.write(b"\0" * (data_offset - f.tell()))
+        f.write(q.tobytes())
+        f.write(visited.tobytes())
+    os.replace(tmp, path)
+
+
+def read_header(path: str) -> dict:
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a .qtab model")
+        (length,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(length).decode("utf-8"))
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model version {header.get('version')!r} in {path}")
+    return header
+
+
+def load_model(path: str, mmap: bool = False) -> DenseQTable:
+    """
+    DenseQTable from a .qtab model. mmap=True maps the q-values read-only
+    instead of copying them (choose_action works, update does not)
+    """
+    header = read_header(path)
+    table = DenseQTable(
+        header["actions"], header["alpha"], header["gamma"], header["epsilon"],
+        state_dims=header["state_dims"],
+    )
+    shape = tuple(header["shape"])
+    if shape != table.q.shape:
+        raise ValueError(f"Model shape {shape} does not match its state_dims in {path}")
+
+    if mmap:
+        q = np.memmap(path, dtype=header["dtype"], mode="r",
+                      offset=header["data_offset"], shape=shape)
+        visited = np.memmap(path, dtype=np.bool_, mode="r",
+                            offset=header["visited_offset"], shape=(shape[0],))
+    else:
+        with open(path, "rb") as f:
+            f.seek(header["data_offset"])
+            q = np.fromfile(f, dtype=header["dtype"], count=shape[0] * shape[1]).reshape(shape)
+            visited = np.fromfile(f, dtype=np.uint8, count=shape[0]).astype(bool)
+        q = q.astype(np.float64, copy=False)
+    table._bind(q, visited)
+    table.metadata = header["metadata"]
+    return table
+
+
+def migrate(pkl_path: str, actions: list[str], out_path: str | None = None) -> str:
+    """Convert a legacy pickled Q-table ({"Q": ..., "epsilon": ...}) to .qtab"""
+    out_path = out_path or os.path.splitext(pkl_path)[0] + MODEL_SUFFIX
+    with open(pkl_path, "rb") as f:
+        data = pickle.load(f)
+    table = QTable(actions, epsilon=data.get("epsilon", 1.0))
+    table.from_dict(data["Q"])
+    save_model(out_path, table, {"migrated_from": os.path.basename(pkl_path)})
+    return out_path
+
+
+def main():
+    from src.agents.safe_driver import SafeDriver
+
+    parser = argparse.ArgumentParser(description="Q-table model files")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_migrate = sub.add_parser("migrate", help="convert pickled Q-tables to .qtab")
+    p_migrate.add_argument("paths", nargs="*",
+                           default=sorted(glob.glob(os.path.join(MODEL_DIR, "*.pkl"))))
+    p_info = sub.add_parser("info", help="print a model header")
+    p_info.add_argument("path")
+    args = parser.parse_args()
+
+    if args.cmd == "info":
+        print(json.dumps(read_header(args.path), indent=2))
+        return
+
+    # both drivers share one action list
+    actions = SafeDriver("migrate", None).qtable.actions
+    for path in args.paths:
+        out = migrate(path, actions)
+        model = load_model(out, mmap=True)
+        print(f"{path} -> {out} ({int(model.visited.sum())} states, epsilon={model.epsilon})")
+
+
+if __name__ == "__main__":
+    main()
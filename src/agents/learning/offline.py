@@ -0,0 +1,148 @@
+"""
+Offline Q-learning over recorded experience (see experience.py)
+    - replays a policy's logged transitions through DenseQTable.update_batch
+      in sweeps of batch_size rows, for as many epochs as asked,
+    - batch_size=1 repeats the online updates one by one (up to the float32
+      rewards of the log), larger batches trade that for numpy speed: each
+      batch bootstraps from the table as it was before it,
+    - alpha/gamma are free, so learning parameters can be tuned against
+      one recording instead of re-simulating.
+
+    python -m src.agents.learning.offline DIR [DIR ...] --policy safe \\
+        --alpha 0.05 0.1 0.2 --gamma 0.9 0.99 --epochs 5 --out-dir tuned/
+"""
+
+import argparse
+import itertools
+import os
+import time
+
+import numpy as np
+
+from src.agents.learning.experience import EXPERIENCE_DIR, ExperienceReader
+from src.agents.learning.q_table import DenseQTable
+
+
+def load_transitions(paths: list[str], policy: str) -> tuple[np.ndarray, list[str], tuple]:
+    """policy's transitions from one or more logs (e.g. one per worker), in log order"""
+    readers = [ExperienceReader(path) for path in paths]
+    actions, state_dims = None, None
+    for reader in readers:
+        if policy not in reader.actions:
+            continue
+        if actions is None:
+            actions, state_dims = reader.actions[policy], reader.state_dims
+        elif (reader.actions[policy], reader.state_dims) != (actions, state_dims):
+            raise ValueError(f"{reader.out_dir}: {policy} was logged with other actions or states")
+    if actions is None:
+        raise ValueError(f"no {policy} transitions in {', '.join(paths)}")
+    rows = np.concatenate([reader.transitions(policy) for reader in readers])
+    return rows, actions, state_dims
+
+
+def replay(table: DenseQTable, rows: np.ndarray, epochs: int = 1, batch_size: int = 4096,
+           rng: np.random.Generator | None = None) -> list[float]:
+    """
+    Sweep rows through table epochs times, returns the mean absolute TD
+    error of each epoch. With rng the row order is shuffled every epoch
+    """
+    states = rows['state'].astype(np.intp)
+    actions = rows['action'].astype(np.intp)
+    rewards = rows['reward'].astype(np.float64)
+    next_states = rows['next_state'].astype(np.intp)
+
+    history = []
+    for _ in range(epochs):
+        order = rng.permutation(len(rows)) if rng is not None else None
+        if batch_size == 1:
+            history.append(_sweep_one_by_one(table, states, actions, rewards, next_states, order))
+            continue
+        total = 0.0
+        for start in range(0, len(rows), batch_size):
+            batch = slice(start, start + batch_size)
+            if order is not None:
+                batch = order[batch]
+            td = table.update_batch(states[batch], actions[batch], rewards[batch], next_states[batch])
+            total += np.abs(td).sum()
+        history.append(total / max(1, len(rows)))
+    return history
+
+
+def _sweep_one_by_one(table, states, actions, rewards, next_states, order) -> float:
+    """batch_size=1 in plain python, update_batch costs more than it saves per row"""
+    if order is not None:
+        states, actions, rewards, next_states = (
+            states[order], actions[order], rewards[order], next_states[order]
+        )
+    n = len(table.actions)
+    flat, total = table._flat, 0.0
+    for s, a, r, ns in zip(states.tolist(), actions.tolist(), rewards.tolist(), next_states.tolist()):
+        k = s * n + a
+        old_value = flat[k]
+        td_error = r + table.gamma * max(flat[ns * n:(ns + 1) * n].tolist()) - old_value
+        flat[k] = old_value + table.alpha * td_error
+        total += abs(td_error)
+    table.visited[states] = True
+    table.visited[next_states] = True
+    return total / max(1, len(states))
+
+
+def train(rows: np.ndarray, actions: list[str], state_dims: tuple, alpha: float, gamma: float,
+          epochs: int = 1, batch_size: int = 4096, init: str | None = None,
+          seed: int | None = None) -> tuple[DenseQTable, list[float]]:
+    """
+    Fresh (or init model's) table trained on rows, epsilon set to the
+    last logged one
+    """
+    table = DenseQTable(actions, alpha, gamma, state_dims=state_dims)
+    if init is not None:
+        table.load(init)
+        table.alpha, table.gamma = alpha, gamma
+    if len(rows):
+        table.epsilon = float(rows['epsilon'][-1])
+    rng = np.random.default_rng(seed) if seed is not None else None
+    return table, replay(table, rows, epochs, batch_size, rng)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a Q-table on recorded experience")
+    parser.add_argument("paths", nargs="*", default=[EXPERIENCE_DIR], metavar="DIR")
+    parser.add_argument("--policy", default="safe", help="safe or risky")
+    parser.add_argument("--alpha", type=float, nargs="+", default=[0.1])
+    parser.add_argument("--gamma", type=float, nargs="+", default=[0.9])
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--shuffle-seed", type=int, default=None,
+                        help="Shuffle the rows every epoch (default: log order)")
+    parser.add_argument("--init", default=None, metavar="MODEL",
+                        help="Start from this model instead of an empty table")
+    parser.add_argument("--out-dir", default=None,
+                        help="Save each trained table there as .qtab")
+    args = parser.parse_args()
+    if args.epochs < 1:
+        parser.error("--epochs must be at least 1")
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+
+    rows, actions, state_dims = load_transitions(args.paths, args.policy)
+    print(f"{args.policy}: {len(rows)} transitions, {args.epochs} epoch(s), "
+          f"batch {args.batch_size}")
+    print(f"{'alpha':>7}{'gamma':>7}{'|td| first':>12}{'|td| last':>11}"
+          f"{'states':>8}{'secs':>7}")
+    for alpha, gamma in itertools.product(args.alpha, args.gamma):
+        t0 = time.perf_counter()
+        table, history = train(rows, actions, state_dims, alpha, gamma, args.epochs,
+                               args.batch_size, args.init, args.shuffle_seed)
+        secs = time.perf_counter() - t0
+        print(f"{alpha:>7g}{gamma:>7g}{history[0]:>12.4f}{history[-1]:>11.4f}"
+              f"{int(table.visited.sum()):>8}{secs:>7.2f}")
+        if args.out_dir is not None:
+            path = os.path.join(args.out_dir, f"{args.policy}_a{alpha:g}_g{gamma:g}.qtab")
+            table.save(path, {
+                "offline": {"logs": args.paths, "transitions": len(rows), "epochs": args.epochs,
+                            "batch_size": args.batch_size, "td_error": history},
+            })
+
+
+if __name__ == "__main__":
+    main()
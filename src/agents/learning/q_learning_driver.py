@@ -1,18 +1,31 @@
-import traci
 from abc import ABC, abstractmethod
-from src.agents.learning.q_table import QTable
+from src.agents.learning.q_table import QTable, DenseQTable
+from src.agents.learning.replay import ReplayBuffer
+from src.simulation.world_snapshot import WorldSnapshot
 import logging
 
 logger = logging.getLogger(__name__)
 
 class QLearningDriver(ABC):
-    def __init__(self, vehicle_id, recorder, actions, alpha, gamma, epsilon):
+    def __init__(self, vehicle_id, recorder, actions, alpha, gamma, epsilon, dense=False):
         self.vehicle_id = vehicle_id
         self.recorder = recorder
-        self.qtable = QTable(actions, alpha, gamma, epsilon)
+        # dense=True: numpy-backed table over the fixed state space
+        self.qtable = (DenseQTable if dense else QTable)(actions, alpha, gamma, epsilon)
         self.prev_state = None
         self.last_action = None
+        self.last_reward = None
         self.prev_speed = None
+        # per-step snapshot handed in by AgentManager, read by encode/apply
+        self.world: WorldSnapshot | None = None
+        # experience.PolicyLog set by AgentManager.attach_experience
+        self.experience = None
+        # replay mode, see enable_replay
+        self.replay: ReplayBuffer | None = None
+        self.replay_batch = 64
+        self.replay_every = 4
+        self.replay_between = 0
+        self._since_replay = 0
 
     @abstractmethod
     def encode_state(self):
@@ -29,21 +42,67 @@ class QLearningDriver(ABC):
         """Execute chosen action in simulator"""
         ...
 
-    def update(self):
+    def enable_replay(self, buffer: ReplayBuffer, batch_size: int = 64, every: int = 4,
+                      between_episodes: int = 0) -> None:
         """
+        Keep every transition in buffer and, on top of the online update,
+        apply one minibatch of batch_size replayed transitions every
+        `every` new ones, plus between_episodes minibatches after each
+        episode. Needs the DenseQTable (update_batch)
+        """
+        if not isinstance(self.qtable, DenseQTable):
+            raise TypeError("Replay needs a driver with a DenseQTable (dense=True)")
+        self.replay = buffer
+        self.replay_batch = batch_size
+        self.replay_every = every
+        self.replay_between = between_episodes
+
+    def remember(self, states, actions, rewards, next_states) -> None:
+        """Buffer encoded transitions, replaying the minibatches now due"""
+        self.replay.add_batch(states, actions, rewards, next_states)
+        self._replay_due(len(states))
+
+    def _replay_due(self, added: int) -> None:
+        """Count added transitions, one minibatch per replay_every of them"""
+        self._since_replay += added
+        while self._since_replay >= self.replay_every:
+            self._since_replay -= self.replay_every
+            self.replay.replay(self.qtable, self.replay_batch)
+
+    def replay_episode_end(self) -> None:
+        """The between-episodes minibatches, if replay is on"""
+        if self.replay is None:
+            return
+        for _ in range(self.replay_between):
+            self.replay.replay(self.qtable, self.replay_batch)
+
+    def update(self, world: WorldSnapshot | None = None):
+        """
+        Read the step from world (fresh snapshot if not given)
         Compute decel = max(prev_speed - curr_speed, 0)
         Call compute_reward(prev_state, last_action, state, decel)
         Q-table update
         Choose & apply next action
         """
+        self.world = world if world is not None else WorldSnapshot()
         state = self.encode_state()
-        curr_speed = traci.vehicle.getSpeed(self.vehicle_id)
+        curr_speed = self.world.speed(self.vehicle_id)
 
         # q-update
+        self.last_reward = None
         if self.prev_state is not None:
             decel = max(0.0, (self.prev_speed or 0.0) - curr_speed)
             r = self.compute_reward(self.prev_state, self.last_action, state, decel)
             self.qtable.update(self.prev_state, self.last_action, r, state)
+            self.last_reward = r
+            if self.experience is not None:
+                self.experience.add(self.prev_state, self.last_action, r, state,
+                                    self.qtable.epsilon)
+            if self.replay is not None:
+                self.replay.add(self.qtable.encode(self.prev_state),
+                                self.qtable.action_index[self.last_action],
+                                r, self.qtable.encode(state))
+                self._replay_due(1)
 
         # select n execute action
         action = self.qtable.choose_action(state)
@@ -1,9 +1,12 @@
 from collections import defaultdict
+import itertools
 import random
 import logging
 import os
 import pickle
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 class QTable:
@@ -27,7 +30,7 @@ class QTable:
 
     def __repr__(self) -> str:
         return (
-            f"QTable(actions={self.actions}, alpha={self.alpha}, "
+            f"{type(self).__name__}(actions={self.actions}, alpha={self.alpha}, "
             f"gamma={self.gamma}, epsilon={self.epsilon}, "
             f"entries={len(self.Q)})"
         )
@@ -71,8 +74,23 @@ class QTable:
         self.epsilon = max(min_epsilon, self.epsilon * decay_rate)
         # logger.info("Epsilon decayed: %.4f → %.4f", old_eps, self.epsilon)
 
-    def save(self, filepath: str) -> None:
-        """Persist Q-table"""
+    def to_dict(self) -> dict:
+        """Plain state -> q-values copy, safe to pickle or send to workers"""
+        return {state: list(q_vals) for state, q_vals in self.Q.items()}
+
+    def from_dict(self, Q: dict) -> None:
+        """Replace all q-values with a plain state -> q-values mapping"""
+        self.Q = defaultdict(
+            lambda: [0.0]*len(self.actions),
+            {state: list(q_vals) for state, q_vals in Q.items()}
+        )
+
+    def save(self, filepath: str, metadata: dict | None = None) -> None:
+        """Persist Q-table, .qtab binary model or legacy pickle otherwise"""
+        if str(filepath).endswith(".qtab"):
+            from src.agents.learning.model_format import save_model
+            save_model(filepath, self, metadata)
+            return
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
         with open(filepath, "wb") as f:
             pickle.dump({
@@ -82,10 +100,162 @@ class QTable:
 
     def load(self, filepath: str) -> None:
         """Load Q-table if exists"""
-        if os.path.exists(filepath):
+        if os.path.exists(filepath) and str(filepath).endswith(".qtab"):
+            from src.agents.learning.model_format import load_model
+            model = load_model(filepath)
+            self.from_dict(model.to_dict())
+            self.epsilon = model.epsilon
+        elif os.path.exists(filepath):
             with open(filepath, "rb") as f:
                 data = pickle.load(f)
             # rewrap into defaultdict
-            self.Q = defaultdict(lambda: [0.0]*len(self.actions), data["Q"])
+            self.from_dict(data["Q"])
             # gets overwritten
-            self.epsilon = data.get("epsilon", self.epsilon)
\ No newline at end of file
+            self.epsilon = data.get("epsilon", self.epsilon)
+
+
+# fixed state space of both drivers: (phase, dist_bin, speed_bin, ttl_bin)
+PHASES = ("GREEN", "AMBER", "RED")
+STATE_DIMS = (PHASES, range(4), range(4), range(4))
+
+
+class DenseQTable(QTable):
+    """
+    QTable over a fixed, enumerable state space, backed by one numpy array
+        - states map to row ids through a precomputed encoding,
+        - actions map to column ids,
+        - same choose_action/update/save/load behaviour (and random draws)
+          as QTable, pickles are interchangeable,
+        - update_batch/greedy_actions work on many states at once
+          (single transitions stay in plain python, numpy only pays
+          off over many rows)
+    """
+
+    def __init__(
+        self,
+        actions: list[str],
+        alpha: float = 0.1,
+        gamma: float = 0.9,
+        epsilon: float = 1.0,
+        state_dims: tuple = STATE_DIMS,
+    ):
+        self.actions = actions
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epsilon = epsilon
+
+        self.states = list(itertools.product(*state_dims))
+        self.state_index = {state: i for i, state in enumerate(self.states)}
+        self.action_index = {action: i for i, action in enumerate(actions)}
+
+        self.state_dims = tuple(tuple(dim) for dim in state_dims)
+        self._bind(
+            np.zeros((len(self.states), len(actions)), dtype=np.float64),
+            # rows QTable would hold a key for (updated or bootstrapped from)
+            np.zeros(len(self.states), dtype=bool),
+        )
+
+    def _bind(self, q: np.ndarray, visited: np.ndarray) -> None:
+        """Use q/visited as storage, e.g. read-only memmaps of a model file"""
+        self.q = q
+        self.visited = visited
+        # scalar reads/writes through a flat memoryview avoid numpy scalar boxing
+        self._flat = memoryview(q.reshape(-1))
+        self._seen = memoryview(visited)
+
+    @property
+    def Q(self) -> dict:
+        """Read-only state -> q-values view, like QTable.Q"""
+        return self.to_dict()
+
+    def encode(self, state) -> int:
+        try:
+            return self.state_index[state]
+        except KeyError:
+            raise ValueError(f"State {state!r} is outside the table's state space") from None
+
+    def choose_action(self, state):
+        """Epsilon-greedy selection: random with prob epsilon or best-known action"""
+        s = self.encode(state)
+        if random.random() < self.epsilon or not self._seen[s]:
+            return random.choice(self.actions)
+
+        # numpy calls cost more than they save on one row of len(actions)
+        n = len(self.actions)
+        row = self._flat[s * n:(s + 1) * n].tolist()
+        max_q = max(row)
+        best = [a for a, q in enumerate(row) if q == max_q]
+        return self.actions[best[random.randrange(len(best))]]
+
+    def update(self, state, action, reward, next_state):
+        """Perform the Q-learning update for a single transition"""
+        s, ns = self.encode(state), self.encode(next_state)
+        self._seen[s] = self._seen[ns] = True
+
+        n = len(self.actions)
+        k = s * n + self.action_index[action]
+        old_value = self._flat[k]
+        future_estimate = max(self._flat[ns * n:(ns + 1) * n].tolist())
+        td_target = reward + self.gamma * future_estimate
+        self._flat[k] = old_value + self.alpha * (td_target - old_value)
+
+    def update_batch(self, states, actions, rewards, next_states) -> np.ndarray:
+        """
+        Vectorized Q-learning update for encoded transitions (int arrays).
+        All targets use the table as it was before the batch and a
+        (state, action) pair seen several times moves by the mean of its
+        TD errors, so many agents sharing a table in one step take one
+        alpha-sized step rather than len(states) of them. Returns the
+        TD errors
+        """
+        states = np.asarray(states, dtype=np.intp)
+        actions = np.asarray(actions, dtype=np.intp)
+        next_states = np.asarray(next_states, dtype=np.intp)
+        td_target = np.asarray(rewards, dtype=np.float64) + self.gamma * self.q[next_states].max(axis=1)
+        td_error = td_target - self.q[states, actions]
+
+        flat = states * len(self.actions) + actions
+        size = self.q.size
+        counts = np.bincount(flat, minlength=size)
+        sums = np.bincount(flat, weights=td_error, minlength=size)
+        hit = counts > 0
+        self.q.reshape(-1)[hit] += self.alpha * sums[hit] / counts[hit]
+        self.visited[states] = True
+        self.visited[next_states] = True
+        return td_error
+
+    def _greedy(self, q: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        best = q == q.max(axis=1, keepdims=True)
+        # random score per action, masked to the tied maxima
+        return np.where(best, rng.random(q.shape), -1.0).argmax(axis=1)
+
+    def greedy_actions(self, rng: np.random.Generator | None = None) -> np.ndarray:
+        """Best action id of every state, ties broken uniformly at random"""
+        return self._greedy(self.q, rng or np.random.default_rng())
+
+    def choose_batch(self, states, rng: np.random.Generator | None = None) -> np.ndarray:
+        """
+        Epsilon-greedy action ids for many encoded states at once,
+        unseen states explore like choose_action
+        """
+        rng = rng or np.random.default_rng()
+        states = np.asarray(states, dtype=np.intp)
+        explore = (rng.random(len(states)) < self.epsilon) | ~self.visited[states]
+        return np.where(
+            explore,
+            rng.integers(len(self.actions), size=len(states)),
+            self._greedy(self.q[states], rng),
+        )
+
+    def to_dict(self) -> dict:
+        """Plain state -> q-values copy, safe to pickle or send to workers"""
+        return {self.states[i]: self.q[i].tolist() for i in np.flatnonzero(self.visited)}
+
+    def from_dict(self, Q: dict) -> None:
+        """Replace all q-values with a plain state -> q-values mapping"""
+        self.q[:] = 0.0
+        self.visited[:] = False
+        for state, q_vals in Q.items():
+            s = self.encode(state)
+            self.q[s] = q_vals
+            self.visited[s] = True
@@ -0,0 +1,112 @@
+"""
+Experience replay for the Q-learning drivers
+    - ReplayBuffer: preallocated numpy ring of a driver's encoded
+      transitions, the oldest overwritten once capacity is reached,
+    - uniform sampling, or prioritized by |TD error| ** priority_exponent
+      (new transitions get the current maximum so each is replayed soon),
+    - a sampled minibatch is one DenseQTable.update_batch, so repeated
+      pairs move by their mean TD error; prioritized sampling applies no
+      importance weights.
+"""
+
+import numpy as np
+
+from src.agents.learning.q_table import DenseQTable
+
+PRIORITY_FLOOR = 1e-3
+
+
+class ReplayBuffer:
+    """Ring buffer of (state, action, reward, next_state) ids for one Q-table"""
+
+    def __init__(self, capacity: int = 50_000, prioritized: bool = False,
+                 priority_exponent: float = 0.6, rng: np.random.Generator | None = None):
+        self.capacity = capacity
+        self.prioritized = prioritized
+        self.priority_exponent = priority_exponent
+        self.rng = rng or np.random.default_rng()
+        self.states = np.zeros(capacity, dtype=np.intp)
+        self.actions = np.zeros(capacity, dtype=np.intp)
+        self.rewards = np.zeros(capacity, dtype=np.float64)
+        self.next_states = np.zeros(capacity, dtype=np.intp)
+        self.priorities = np.zeros(capacity, dtype=np.float64)
+        self.size = 0
+        self.added = 0
+        self._next = 0
+        self._max_priority = 1.0
+
+    def __repr__(self) -> str:
+        kind = "prioritized" if self.prioritized else "uniform"
+        return f"ReplayBuffer({self.size}/{self.capacity}, {kind}, added={self.added})"
+
+    def __len__(self) -> int:
+        return self.size
+
+    def state(self) -> dict:
+        """Contents, counters and sampling RNG, for checkpoints"""
+        n = self.size
+        return {
+            "states": self.states[:n].copy(), "actions": self.actions[:n].copy(),
+            "rewards": self.rewards[:n].copy(), "next_states": self.next_states[:n].copy(),
+            "priorities": self.priorities[:n].copy(),
+            "size": n, "added": self.added, "next": self._next,
+            "max_priority": self._max_priority,
+            "rng": self.rng.bit_generator.state,
+        }
+
+    def restore(self, state: dict) -> None:
+        n = state["size"]
+        if n > self.capacity:
+            raise ValueError(f"Replay state of {n} transitions exceeds capacity {self.capacity}")
+        for name in ("states", "actions", "rewards", "next_states", "priorities"):
+            getattr(self, name)[:n] = state[name]
+        self.size, self.added, self._next = n, state["added"], state["next"]
+        self._max_priority = state["max_priority"]
+        self.rng.bit_generator.state = state["rng"]
+
+    def add(self, state: int, action: int, reward: float, next_state: int) -> None:
+        i = self._next
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.priorities[i] = self._max_priority
+        self._next = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.added += 1
+
+    def add_batch(self, states, actions, rewards, next_states) -> None:
+        n = len(states)
+        keep = slice(max(0, n - self.capacity), n)
+        idx = (self._next + np.arange(n)[keep]) % self.capacity
+        self.states[idx] = np.asarray(states)[keep]
+        self.actions[idx] = np.asarray(actions)[keep]
+        self.rewards[idx] = np.asarray(rewards)[keep]
+        self.next_states[idx] = np.asarray(next_states)[keep]
+        self.priorities[idx] = self._max_priority
+        self._next = (self._next + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+        self.added += n
+
+    def sample(self, batch_size: int) -> np.ndarray:
+        """Slots of batch_size transitions, drawn with replacement"""
+        if not self.prioritized:
+            return self.rng.integers(self.size, size=batch_size)
+        p = self.priorities[:self.size] ** self.priority_exponent
+        return self.rng.choice(self.size, size=batch_size, p=p / p.sum())
+
+    def update_priorities(self, idx: np.ndarray, td_error: np.ndarray) -> None:
+        priority = np.abs(td_error) + PRIORITY_FLOOR
+        self.priorities[idx] = priority
+        self._max_priority = max(self._max_priority, float(priority.max()))
+
+    def replay(self, qtable: DenseQTable, batch_size: int) -> np.ndarray:
+        """One minibatch Q-update from the buffer, returns its TD errors"""
+        if not self.size:
+            return np.empty(0)
+        idx = self.sample(batch_size)
+        td = qtable.update_batch(self.states[idx], self.actions[idx],
+                                 self.rewards[idx], self.next_states[idx])
+        if self.prioritized:
+            self.update_priorities(idx, td)
+        return td
@@ -1,6 +1,6 @@
 import logging
 import random
-import traci
+from src.simulation.backend import traci
 from src.simulation.tls_recorder import TLSEventRecorder
 from .learning.q_learning_driver import QLearningDriver
 from .learning.rewards import risky_reward
@@ -20,7 +20,8 @@ class RiskyDriver(QLearningDriver):
         self,
         vehicle_id: str,
         route: str,
-        recorder: TLSEventRecorder
+        recorder: TLSEventRecorder,
+        dense: bool = False,
     ):
         super().__init__(
             vehicle_id=vehicle_id,
@@ -32,6 +33,7 @@ class RiskyDriver(QLearningDriver):
             alpha=0.1,
             gamma=0.9,
             epsilon=1.0,
+            dense=dense,
         )
 
         self.route = route
@@ -44,20 +46,21 @@ class RiskyDriver(QLearningDriver):
         
         self.max_speed_excess: float = 2.0 # allowed to explore double the speed limit
         self.small_excess_ratio: float = 1.2 # small overshoot
+        self.slow_decel: float = self.a_c # used by SLOW
 
     def encode_state(self) -> tuple[str,int,int,int]:
         """
         Returns (phase, dist_bin, speed_bin, ttl_bin)
         Logs first-seen amber/red to recorder
         """
-        next_tls = traci.vehicle.getNextTLS(self.vehicle_id)
+        next_tls = self.world.next_tls(self.vehicle_id)
         if not next_tls:
-            speed = traci.vehicle.getSpeed(self.vehicle_id)
+            speed = self.world.speed(self.vehicle_id)
             return 'GREEN', 3, self._speed_bin(speed), N_TTL_BINS-1
 
         tls_id, _, dist, _ = next_tls[0]
 
-        raw   = traci.trafficlight.getRedYellowGreenState(tls_id).lower()
+        raw   = self.world.tls_state(tls_id).lower()
         phase = 'GREEN' if 'g' in raw else ('AMBER' if 'y' in raw else 'RED')
         self.last_tls_phase = phase
 
@@ -67,7 +70,7 @@ class RiskyDriver(QLearningDriver):
         elif dist <= 40: dist_b = 2
         else: dist_b = 3
 
-        speed = traci.vehicle.getSpeed(self.vehicle_id)
+        speed = self.world.speed(self.vehicle_id)
         speed_b = self._speed_bin(speed)
         ttl_b   = self._time_to_red_bin(tls_id)
 
@@ -82,7 +85,7 @@ class RiskyDriver(QLearningDriver):
         """
         if v == 0:
             return 0
-        allowed = traci.vehicle.getAllowedSpeed(self.vehicle_id)  # ← new
+        allowed = self.world.allowed_speed(self.vehicle_id)
         if v <= allowed:
             return 1
         elif v <= allowed * self.small_excess_ratio:
@@ -93,25 +96,43 @@ class RiskyDriver(QLearningDriver):
     # mimic human drivers who make informed guesses on time of light state
     def _time_to_red_bin(self, tls_id: str) -> int:
 
-        switch_time = traci.trafficlight.getNextSwitch(tls_id)
-        now = traci.simulation.getTime()
-        total_dur = traci.trafficlight.getPhaseDuration(tls_id)
+        switch_time = self.world.next_switch(tls_id)
+        now = self.world.time()
+        total_dur = self.world.phase_duration(tls_id)
         ttl_frac = max(0.0, (switch_time - now) / total_dur)
         return min(N_TTL_BINS-1, int(ttl_frac * N_TTL_BINS))
 
-    def compute_reward(
+    def reward(
         self,
         prev_state: tuple[str,int,int,int],
         action: str,
         new_state: tuple[str,int,int,int],
         decel: float
     ) -> float:
-        
+        """compute_reward without recorder side effects"""
         # extract dist_bin from prev state
         dist_bin = prev_state[1]
         max_dist_bin = 3
         r = risky_reward(prev_state, action, new_state, dist_bin, max_dist_bin)
 
+        # reward/penalise based on overshoot for speed
+        _, _, speed_b, _ = new_state
+        if speed_b == 2:
+            r += 0.2     # small bonus for slight speeding
+        elif speed_b == 3:
+            r -= 0.5     # penalty for too much
+        return r
+
+    def compute_reward(
+        self,
+        prev_state: tuple[str,int,int,int],
+        action: str,
+        new_state: tuple[str,int,int,int],
+        decel: float
+    ) -> float:
+        
+        r = self.reward(prev_state, action, new_state, decel)
+
         phase = prev_state[0]
         if phase == "AMBER" and action == "GO":
             self.recorder.ran_amber()
@@ -120,13 +141,6 @@ class RiskyDriver(QLearningDriver):
         if phase == "GREEN" and action == "GO":
             self.recorder.ran_green()
 
-        # reward/penalise based on overshoot for speed
-        _, _, speed_b, _ = new_state
-        if speed_b == 2:
-            r += 0.2     # small bonus for slight speeding
-        elif speed_b == 3:
-            r -= 0.5     # penalty for too much
-
         # logger.debug(
         #     "RiskyDriver %s: %s --%s--> %s = %.3f",
         #     self.vehicle_id, prev_state, action, new_state, r
@@ -135,7 +149,7 @@ class RiskyDriver(QLearningDriver):
         return r
 
     def apply_action(self, action: str) -> None:
-        allowed = traci.vehicle.getAllowedSpeed(self.vehicle_id)
+        allowed = self.world.allowed_speed(self.vehicle_id)
         if action == 'STOP':
             traci.vehicle.setSpeed(self.vehicle_id, 0.0)
         elif action == 'SLOW':
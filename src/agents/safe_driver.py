@@ -1,20 +1,11 @@
 import logging
-import traci
 
+from src.simulation import telemetry
+from src.simulation.backend import traci
 from src.simulation.tls_recorder import TLSEventRecorder
 from .learning.q_learning_driver import QLearningDriver
 from .learning.rewards import safe_reward
 
-# debug config
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-)
-
-# ignore noisy libs
-logging.getLogger("PIL").setLevel(logging.WARNING)
-logging.getLogger("matplotlib").setLevel(logging.INFO)
-
 logger = logging.getLogger(__name__)
 
 # how many bins for time-to-red
@@ -33,7 +24,7 @@ class SafeDriver(QLearningDriver):
     STOP_MARGIN = 0.5  
     SPEED_PENALTY = 1.0
 
-    def __init__(self, vehicle_id: str, recorder: TLSEventRecorder):
+    def __init__(self, vehicle_id: str, recorder: TLSEventRecorder, dense: bool = False):
         super().__init__(
             vehicle_id=vehicle_id,
             recorder=recorder,
@@ -44,6 +35,7 @@ class SafeDriver(QLearningDriver):
             alpha=0.1,
             gamma=0.9,
             epsilon=1.0,
+            dense=dense,
         )
         self.state = 'approach'
 
@@ -51,6 +43,7 @@ class SafeDriver(QLearningDriver):
 
         self.max_speed_excess: float = 2.0 # allow exploration of double the speed limit
         self.small_excess_ratio: float = 1.2 # differentiate overshooting 
+        self.slow_decel: float = SafeDriver.DECEL_AMBER # used by SLOW
 
 
     def encode_state(self) -> tuple[str,int,int,int]:
@@ -58,16 +51,16 @@ class SafeDriver(QLearningDriver):
         Returns (phase, dist_bin, speed_bin, ttl_bin)
         """
 
-        next_tls = traci.vehicle.getNextTLS(self.vehicle_id)
+        next_tls = self.world.next_tls(self.vehicle_id)
 
         if not next_tls:
             # free road = treat like green/farthest tls
-            speed = traci.vehicle.getSpeed(self.vehicle_id)
+            speed = self.world.speed(self.vehicle_id)
             return 'GREEN', 3, self._speed_bin(speed), N_TTL_BINS-1
 
         tls_id, _, dist, _ = next_tls[0]
 
-        raw   = traci.trafficlight.getRedYellowGreenState(tls_id).lower()
+        raw   = self.world.tls_state(tls_id).lower()
         phase = 'GREEN' if 'g' in raw else ('AMBER' if 'y' in raw else 'RED')
         self.last_tls_phase = phase
 
@@ -77,7 +70,7 @@ class SafeDriver(QLearningDriver):
         elif dist <= 40: dist_b = 2
         else: dist_b = 3
 
-        speed = traci.vehicle.getSpeed(self.vehicle_id)
+        speed = self.world.speed(self.vehicle_id)
         speed_b = self._speed_bin(speed)
         ttl_b = self._time_to_red_bin(tls_id)
 
@@ -92,43 +85,58 @@ class SafeDriver(QLearningDriver):
         """
         if speed == 0:
             return 0
-        allowed = traci.vehicle.getAllowedSpeed(self.vehicle_id)
+        allowed = self.world.allowed_speed(self.vehicle_id)
         if speed <= allowed:
             speed_b = 1
         elif speed <= allowed * self.small_excess_ratio:
             speed_b = 2
         else:
             speed_b = 3
-        logger.debug(
-            "SafeDriver %s: speed=%.2f, allowed=%.2f -> speed_bin=%d",
-            self.vehicle_id, speed, allowed, speed_b
-        )
+        if telemetry.TRACE:
+            logger.debug(
+                "SafeDriver %s: speed=%.2f, allowed=%.2f -> speed_bin=%d",
+                self.vehicle_id, speed, allowed, speed_b
+            )
         return speed_b
 
     def _time_to_red_bin(self, tls_id: str) -> int:
         """
         Represent time until next switch to mimic human drivers
         """
-        switch_time = traci.trafficlight.getNextSwitch(tls_id)
-        now = traci.simulation.getTime()
-        total_dur = traci.trafficlight.getPhaseDuration(tls_id)
+        switch_time = self.world.next_switch(tls_id)
+        now = self.world.time()
+        total_dur = self.world.phase_duration(tls_id)
         ttl_frac = max(0.0, (switch_time - now) / total_dur)
         return min(N_TTL_BINS-1, int(ttl_frac * N_TTL_BINS))
 
-    def compute_reward(
+    def reward(
         self,
         prev_state: tuple[str,int,int,int],
         action: str,
         new_state: tuple[str,int,int,int],
         decel: float
     ) -> float:
-        
+        """compute_reward without logging/recorder side effects"""
         r = safe_reward(prev_state, action, new_state, decel, self.qtable.epsilon)
 
         # penalty for > speed limit
         _, _, speed_b, _ = new_state
         if speed_b == 2:
             r -= SafeDriver.SPEED_PENALTY
+        return r
+
+    def compute_reward(
+        self,
+        prev_state: tuple[str,int,int,int],
+        action: str,
+        new_state: tuple[str,int,int,int],
+        decel: float
+    ) -> float:
+        
+        r = self.reward(prev_state, action, new_state, decel)
+
+        _, _, speed_b, _ = new_state
+        if speed_b == 2 and telemetry.TRACE:
             logger.debug(
                 "SafeDriver %s: overspeed detected (bin=2), applying penalty=%.2f",
                 self.vehicle_id, SafeDriver.SPEED_PENALTY
@@ -150,7 +158,7 @@ class SafeDriver(QLearningDriver):
         return r
 
     def apply_action(self, action: str) -> None:
-        allowed = traci.vehicle.getAllowedSpeed(self.vehicle_id)
+        allowed = self.world.allowed_speed(self.vehicle_id)
         if action == 'STOP':
             traci.vehicle.setSpeed(self.vehicle_id, 0.0)
         elif action == 'SLOW':
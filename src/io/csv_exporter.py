@@ -1,6 +1,16 @@
 import csv
+import io
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
+
 class CsvExporter:
     """
     Exports csvs to csv_results/
@@ -10,4 +20,146 @@ class CsvExporter:
         with open(path, 'w', newline='') as f:
             writer = csv.writer(f)
             writer.writerow(headers)
-            writer.writerows(rows)
\ No newline at end of file
+            writer.writerows(rows)
+
+    def stream(self, path: str, headers: list[str], resume: bool = False,
+               progress: dict | None = None) -> "CsvStream":
+        """Incremental export of path, one run's rows at a time"""
+        return CsvStream(path, headers, resume, progress)
+
+
+class CsvStream:
+    """
+    Crash-safe incremental csv
+        - rows go to PATH.part, appended and fsynced per run by a background
+          thread, so the batch never waits on the disk,
+        - PATH.progress.json (replaced atomically after each run) records
+          the last complete run and where its rows end in the .part file,
+        - close() renames the .part file onto PATH.
+
+    resume=True continues an interrupted export: rows past the last
+    complete run are cut off and last_completed says where to pick up,
+    progress (from sync()) rolls back to an earlier point instead of the
+    sidecar's. Otherwise any leftover .part file is started over
+    """
+
+    def __init__(self, path: str, headers: list[str], resume: bool = False,
+                 progress: dict | None = None):
+        self.path = path
+        self.part_path = path + ".part"
+        self.progress_path = path + ".progress.json"
+        self.last_completed: int | None = None
+        self.rows = 0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        progress = progress or self._read_progress()
+        if resume and progress is not None and not os.path.exists(self.part_path) \
+                and os.path.exists(path):
+            # the export was already published, continue from a copy of it
+            shutil.copyfile(path, self.part_path)
+        if progress is not None and not os.path.exists(self.part_path):
+            progress = None
+        if progress is not None and resume:
+            self.last_completed = progress["run"]
+            self.rows = progress["rows"]
+            self._file = open(self.part_path, "r+b")
+            self._file.truncate(progress["offset"])
+            self._file.seek(progress["offset"])
+            logger.info("Resuming %s after run %s (%d rows)",
+                        path, self.last_completed, self.rows)
+        else:
+            if progress is not None:
+                logger.warning("Discarding partial export %s (up to run %s)",
+                               self.part_path, progress["run"])
+            self._file = open(self.part_path, "wb")
+            self._file.write(self._encode([headers]))
+            self._commit(None)
+
+        self._queue: queue.Queue = queue.Queue()
+        self._error: BaseException | None = None
+        self._thread = threading.Thread(target=self._drain, name="csv-stream", daemon=True)
+        self._thread.start()
+
+    def __repr__(self) -> str:
+        return f"CsvStream({self.path!r}, last_completed={self.last_completed}, rows={self.rows})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close(publish=exc[0] is None)
+
+    # --- WRITING
+
+    def write_run(self, run_index: int, rows: list[list]) -> None:
+        """Queue one run's rows, written and made durable in the background"""
+        self._raise_pending()
+        self._queue.put((run_index, rows))
+
+    def sync(self) -> dict:
+        """Wait until every queued run is durable, return the progress record"""
+        self._queue.join()
+        self._raise_pending()
+        return self._read_progress()
+
+    def close(self, publish: bool = True) -> None:
+        """
+        Wait for queued runs; with publish, replace PATH with the
+        finished file, else keep the .part file resumable
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._file.close()
+        self._raise_pending()
+        if publish:
+            os.replace(self.part_path, self.path)
+            os.remove(self.progress_path)
+
+    def _drain(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if self._error is not None:
+                    continue
+                run_index, rows = item
+                self._file.write(self._encode(rows))
+                self.rows += len(rows)
+                self._commit(run_index)
+            except BaseException as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_pending(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    # --- PROGRESS
+
+    @staticmethod
+    def _encode(rows: list[list]) -> bytes:
+        buf = io.StringIO(newline='')
+        csv.writer(buf).writerows(rows)
+        return buf.getvalue().encode()
+
+    def _commit(self, run_index: int | None) -> None:
+        """Make the .part file durable, then record how far it goes"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        if run_index is not None:
+            self.last_completed = run_index
+        progress = {"run": self.last_completed, "offset": self._file.tell(), "rows": self.rows}
+        tmp = self.progress_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(progress, f)
+        os.replace(tmp, self.progress_path)
+
+    def _read_progress(self) -> dict | None:
+        try:
+            with open(self.progress_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
@@ -3,7 +3,12 @@ Entry-point to run the batch simulation
 """
 
 import argparse
+from src.simulation.backend import BACKENDS
 from src.simulation.batch import main as run_batch
+from src.agents.learning.experience import EXPERIENCE_DIR
+from src.simulation.profiler import PROFILE_DIR
+from src.simulation.telemetry import TELEMETRY_DIR, configure_logging
+from src.simulation.trajectory import TRAJECTORY_DIR
 
 def parse_args():
     parser = argparse.ArgumentParser(
@@ -15,11 +20,251 @@ def parse_args():
         default=100,
         help="Number of simulation runs (default: 100)"
     )
+    parser.add_argument(
+        "--subscriptions",
+        action="store_true",
+        help="Collect per-step telemetry via TraCI subscriptions"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="traci",
+        help="traci (SUMO over a socket, default), libsumo (in-process) or "
+             "surrogate (built-in pure-python grid simulator, no SUMO needed)"
+    )
+    parser.add_argument(
+        "--persistent",
+        action="store_true",
+        help="Keep one SUMO process alive and reset it between episodes"
+    )
+    parser.add_argument(
+        "--warm-start",
+        type=int,
+        default=0,
+        metavar="STEPS",
+        help="Start episodes from a saved state after STEPS of background traffic"
+    )
+    parser.add_argument(
+        "--warm-states",
+        type=int,
+        default=1,
+        help="Number of warm-up states (different seeds) to pick from (default: 1)"
+    )
+    parser.add_argument(
+        "--route-pool",
+        action="store_true",
+        help="Draw agent routes from the precomputed route pool (built on first use)"
+    )
+    parser.add_argument(
+        "--route-bin",
+        action="append",
+        default=[],
+        metavar="ATTR=BIN",
+        help="Restrict pool routes, ATTR in length/tls/max_speed, BIN in low/mid/high"
+    )
+    parser.add_argument(
+        "--stratified",
+        action="store_true",
+        help="Sample route-pool strata uniformly instead of routes"
+    )
+    parser.add_argument(
+        "--net-index",
+        action="store_true",
+        help="Look up edges and speed limits in the cached network index instead of TraCI"
+    )
+    parser.add_argument(
+        "--dense-q",
+        action="store_true",
+        help="Use the numpy-backed Q-table (same results, same model files)"
+    )
+    parser.add_argument(
+        "--agents",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Fleet mode: N learning agents (half safe, half risky) with shared "
+             "per-policy Q-tables, stepped as one batch"
+    )
+    parser.add_argument(
+        "--replay",
+        type=int,
+        nargs="?",
+        const=50_000,
+        default=None,
+        metavar="CAPACITY",
+        help="Experience replay: keep the last CAPACITY transitions per driver "
+             "(default 50000) and replay minibatches of them (implies --dense-q)"
+    )
+    parser.add_argument(
+        "--replay-batch",
+        type=int,
+        default=64,
+        help="Transitions per replayed minibatch (default: 64)"
+    )
+    parser.add_argument(
+        "--replay-every",
+        type=int,
+        default=4,
+        metavar="K",
+        help="Replay one minibatch every K new transitions (default: 4)"
+    )
+    parser.add_argument(
+        "--replay-between",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Replay N more minibatches after each episode (default: 0)"
+    )
+    parser.add_argument(
+        "--prioritized",
+        action="store_true",
+        help="Sample replayed transitions by TD error instead of uniformly"
+    )
+    parser.add_argument(
+        "--trajectory",
+        nargs="?",
+        const=TRAJECTORY_DIR,
+        default=None,
+        metavar="DIR",
+        help="Record every agent's per-step trajectory to DIR "
+             "(default: src/simulation/trajectories)"
+    )
+    parser.add_argument(
+        "--experience",
+        nargs="?",
+        const=EXPERIENCE_DIR,
+        default=None,
+        metavar="DIR",
+        help="Log every Q-learning transition to DIR for offline training "
+             "(default: src/agents/learning/experience_logs)"
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=PROFILE_DIR,
+        default=None,
+        metavar="DIR",
+        help="Time every episode's phases and TraCI calls, reports in DIR "
+             "(default: src/simulation/profiles)"
+    )
+    parser.add_argument(
+        "--profile-episode",
+        type=int,
+        nargs="+",
+        default=[],
+        metavar="N",
+        help="Also run episode N under cProfile (implies --profile)"
+    )
+    parser.add_argument(
+        "--telemetry",
+        nargs="?",
+        const=TELEMETRY_DIR,
+        default=None,
+        metavar="DIR",
+        help="Sample per-step agent events into DIR, written in the background "
+             "(default: src/simulation/telemetry)"
+    )
+    parser.add_argument(
+        "--telemetry-every",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Keep every Nth step in the telemetry (default: 1)"
+    )
+    parser.add_argument(
+        "--telemetry-near-tls",
+        type=float,
+        default=None,
+        metavar="M",
+        help="Keep only steps with a traffic light within M metres"
+    )
+    parser.add_argument(
+        "--train-only",
+        action="store_true",
+        help="Skip the report stage (figures, averages and per-route CSVs); "
+             "build it later with python -m src.simulation.report"
+    )
+    parser.add_argument(
+        "--background-report",
+        action="store_true",
+        help="Run the report stage in a detached process (log in csv_results/report.log) "
+             "so the batch exits while figures render"
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        default="INFO",
+        help="Root log level (default: INFO)"
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Per-step debug records from the runner and drivers (slow)"
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=0,
+        metavar="K",
+        help="Checkpoint Q-tables, epsilons, RNG state and metrics every K runs "
+             "(default: off)"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue from the last checkpoint instead of starting over"
+    )
+    parser.add_argument(
+        "-w", "--workers",
+        type=int,
+        default=1,
+        help="Episodes run in parallel, one SUMO per worker (default: 1)"
+    )
+    parser.add_argument(
+        "--merge-every",
+        type=int,
+        default=1,
+        help="Episodes each worker runs before Q-tables are merged (default: 1)"
+    )
     return parser.parse_args()
 
 def main():
     args = parse_args()
-    run_batch(args.num_runs)
+    configure_logging(args.log_level, args.trace)
+    run_batch(
+        args.num_runs,
+        subscriptions=args.subscriptions,
+        backend=args.backend,
+        workers=args.workers,
+        merge_every=args.merge_every,
+        persistent=args.persistent,
+        warm_start_steps=args.warm_start,
+        warm_states=args.warm_states,
+        route_pool=args.route_pool,
+        route_bins=dict(b.split("=", 1) for b in args.route_bin),
+        stratified=args.stratified,
+        net_index=args.net_index,
+        dense_q=args.dense_q,
+        n_agents=args.agents,
+        replay=None if args.replay is None else {
+            "capacity": args.replay,
+            "prioritized": args.prioritized,
+            "batch_size": args.replay_batch,
+            "every": args.replay_every,
+            "between_episodes": args.replay_between,
+        },
+        trajectory_dir=args.trajectory,
+        experience_dir=args.experience,
+        profile_dir=args.profile or (PROFILE_DIR if args.profile_episode else None),
+        profile_episodes=args.profile_episode,
+        telemetry_dir=args.telemetry,
+        telemetry_every=args.telemetry_every,
+        telemetry_near_tls=args.telemetry_near_tls,
+        checkpoint_every=args.checkpoint_every,
+        resume=args.resume,
+        report=not args.train_only,
+        report_background=args.background_report,
+    )
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,147 @@
+"""
+Vectorized analytics over the frozen per-run table (EPISODE_DTYPE rows,
+e.g. EpisodeTable.rows)
+    - averages: the simulation_averages.csv aggregates per agent/group
+      with bincount group-bys instead of a loop over records,
+    - speed_bin_shares: first vs last pct of episodes speed-bin fractions,
+    - per_route: per agent/group and route breakdown.
+
+Keys keep their order of first appearance, as in MetricsCollector.
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.metrics.metrics_collector import AVERAGES_HEADERS, RUN_METRICS
+from src.simulation.episode_record import EpisodeTable
+
+SPEED_BIN_LABELS = ("Stopped", "Compliant", "Small overshoot", "Large overshoot")
+
+
+def _rows(table) -> np.ndarray:
+    return table.rows if isinstance(table, EpisodeTable) else table
+
+
+def group_codes(rows: np.ndarray, group_by=None) -> tuple[list, np.ndarray]:
+    """Group keys in order of appearance and each row's key index"""
+    agents, first, inverse = np.unique(rows['agent'], return_index=True, return_inverse=True)
+    order = np.argsort(first, kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    names = [str(a) for a in agents[order]]
+    if group_by is None:
+        return names, rank[inverse]
+
+    keys: dict = {}
+    agent_key = np.array([keys.setdefault(group_by(a), len(keys)) for a in names], dtype=np.intp)
+    return list(keys), agent_key[rank[inverse]]
+
+
+def metric_columns(rows: np.ndarray) -> dict[str, np.ndarray]:
+    """RUN_METRICS per row (meaningful where end_step >= 0)"""
+    t = rows['end_step']
+    brakes = rows['sudden_brake_count']
+    dist = rows['total_distance']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        speed = np.where(t > 0, dist / t, 0.0)
+        avg_decel = np.where(brakes > 0, rows['sum_decel'] / brakes, 0.0)
+    return {
+        'time': t, 'distance': dist, 'speed': speed, 'max_speed': rows['max_speed'],
+        'edges': rows['edges'], 'tls': rows['tls'],
+        'amber_enc': rows['amber_encountered'], 'red_enc': rows['red_encountered'],
+        'green_enc': rows['green_encountered'], 'amber_runs': rows['amber_run_count'],
+        'red_runs': rows['red_run_count'], 'green_runs': rows['green_run_count'],
+        'sudden_brakes': brakes, 'max_decel': rows['max_decel'], 'avg_decel': avg_decel,
+        'lane_changes': rows['lane_change_count'], 'collisions': rows['collision_count'],
+        'wait_time': rows['wait_time'],
+    }
+
+
+def _round2(values: np.ndarray) -> list[float]:
+    # python round per group, as the collector does (np.round can differ at .xx5)
+    return [round(v, 2) for v in values.tolist()]
+
+
+def _group_sums(codes: np.ndarray, n: int, reached: np.ndarray, cols: dict):
+    counts = np.bincount(codes[reached], minlength=n)
+    sums = {
+        m: np.bincount(codes[reached], weights=cols[m][reached], minlength=n)
+        for m in RUN_METRICS
+    }
+    return counts, sums
+
+
+def averages(table, group_by=None) -> pd.DataFrame:
+    """simulation_averages.csv as a frame, one row per agent/group key"""
+    rows = _rows(table)
+    keys, codes = group_codes(rows, group_by)
+    reached = rows['end_step'] >= 0
+    counts, sums = _group_sums(codes, len(keys), reached, metric_columns(rows))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = {m: _round2(sums[m] / counts) for m in RUN_METRICS}
+    frame = pd.DataFrame({
+        "Agent": keys,
+        **{h: means[m] for h, m in zip(AVERAGES_HEADERS[1:6], RUN_METRICS[:5])},
+        "NumRuns": counts,
+        **{h: means[m] for h, m in zip(AVERAGES_HEADERS[7:20], RUN_METRICS[5:])},
+        **{h: sums[m].astype(np.int64) for h, m in zip(
+            AVERAGES_HEADERS[20:], ('tls', 'amber_enc', 'red_enc', 'green_enc'))},
+    })
+    return frame
+
+
+def averages_rows(table, group_by=None) -> list[list]:
+    """averages() as CSV rows, "N/A" for keys that never reached"""
+    out = []
+    for row in averages(table, group_by).to_dict('split')['data']:
+        out.append(row if row[6] > 0 else [row[0]] + ["N/A"] * 21)
+    return out
+
+
+def speed_bin_shares(table: EpisodeTable, agents: list[str], pct: float = 0.10) -> dict:
+    """
+    agent -> frame of speed-bin fractions over the first and last pct of
+    episodes (at least one each), as plotted by batch.main
+    """
+    group_size = max(1, int(table.episodes * pct))
+    groups = {
+        f"Avg of First {int(pct*100)}%  Runs": table.episode_rows(0, group_size),
+        f"Avg of Last {int(pct*100)}% Runs": table.episode_rows(-group_size),
+    }
+    shares = {}
+    for agent in agents:
+        fractions = []
+        for rows in groups.values():
+            counts = rows['speed_bin_counts'][rows['agent'] == agent].sum(axis=0)
+            fractions.append(counts / (counts.sum() or 1))
+        shares[agent] = pd.DataFrame(
+            np.array(fractions), index=pd.Index(list(groups), name="Group"),
+            columns=list(SPEED_BIN_LABELS),
+        )
+    return shares
+
+
+def per_route(table, group_by=None) -> pd.DataFrame:
+    """Runs, arrival rate and mean journey metrics per agent/group and route"""
+    rows = _rows(table)
+    keys, codes = group_codes(rows, group_by)
+    routes, route_codes = np.unique(rows['route'], return_inverse=True)
+    cell = codes * len(routes) + route_codes
+    n = len(keys) * len(routes)
+
+    runs = np.bincount(cell, minlength=n)
+    reached = rows['end_step'] >= 0
+    counts, sums = _group_sums(cell, n, reached, metric_columns(rows))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        frame = pd.DataFrame({
+            "Agent": np.repeat(keys, len(routes)),
+            "Route": np.tile(routes, len(keys)),   # -1: no route label
+            "Runs": runs,
+            "Reached": counts,
+            "ReachedRate": np.round(counts / runs, 3),
+            **{f"Avg_{m}": _round2(sums[m] / counts) for m in (
+                'time', 'speed', 'red_runs', 'amber_runs', 'sudden_brakes',
+                'collisions', 'wait_time')},
+        })
+    return frame[frame["Runs"] > 0].reset_index(drop=True)
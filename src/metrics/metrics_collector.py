@@ -1,3 +1,171 @@
+import numpy as np
+
+from src.metrics.running_stats import RunningStat
+from src.simulation.episode_record import freeze_run
+
+
+def _records(rows: np.ndarray):
+    """Frozen rows as (agent, field dict) with plain python values"""
+    names = rows.dtype.names
+    for values in rows.tolist():
+        rec = dict(zip(names, values))
+        if rec['end_step'] < 0:
+            rec['end_step'] = None
+        if rec['route'] < 0:
+            rec['route'] = None
+        yield rec['agent'], rec
+
+
+PER_RUN_HEADERS = [
+    "Agent", "Route", "Time(steps)", "Distance(m)", "Speed(m/s)",
+    "MaxSpeed(m/s)", "Edges", "TLS_enc", "Amber_enc", "Red_enc", "Green_enc",
+    "Amber_runs", "Red_runs", "Green_runs", "Sudden_brakes", "MaxDecel(m/s^2)",
+    "AvgDecel(m/s^2)", "Lane_changes", "Collisions", "WaitTime(s)"
+]
+AVERAGES_HEADERS = [
+    "Agent", "AvgTime(steps)", "AvgDistance(m)", "AvgSpeed(m/s)",
+    "AvgMaxSpeed(m/s)", "AvgEdges", "NumRuns", "AvgTLS_enc",
+    "AvgAmber_enc", "AvgRed_enc", "AvgGreen_enc", "AvgAmber_runs", "AvgRed_runs",
+    "AvgGreen_runs", "AvgSudden_brakes", "AvgMaxDecel(m/s^2)", "AvgAvgDecel(m/s^2)",
+    "AvgLane_changes", "AvgCollisions", "AvgWaitTime(s)",
+    "TotalTLS_enc", "TotalAmber_enc", "TotalRed_enc", "TotalGreen_enc"
+]
+
+# per-run metrics averaged per agent, in averages-CSV column order
+RUN_METRICS = (
+    'time', 'distance', 'speed', 'max_speed', 'edges', 'tls',
+    'amber_enc', 'red_enc', 'green_enc', 'amber_runs', 'red_runs', 'green_runs',
+    'sudden_brakes', 'max_decel', 'avg_decel', 'lane_changes', 'collisions', 'wait_time',
+)
+
+
+def _run_metrics(rec: dict) -> tuple:
+    """RUN_METRICS of one reached vehicle record"""
+    t = rec['end_step']
+    avg_decel = (
+        rec['sum_decel'] / rec['sudden_brake_count']
+        if rec['sudden_brake_count'] > 0 else 0.0
+    )
+    return (
+        t,
+        rec['total_distance'],
+        rec['total_distance'] / t if t > 0 else 0.0,
+        rec['max_speed'],
+        rec['edges'],
+        rec['tls'],
+        rec['amber_encountered'],
+        rec['red_encountered'],
+        rec['green_encountered'],
+        rec['amber_run_count'],
+        rec['red_run_count'],
+        rec['green_run_count'],
+        rec['sudden_brake_count'],
+        rec['max_decel'],
+        avg_decel,
+        rec['lane_change_count'],
+        rec['collision_count'],
+        rec['wait_time'],
+    )
+
+
+class StreamingAggregator:
+    """
+    Averages built one run at a time: a RunningStat per agent (or
+    group_by(vid) key) and metric, nothing kept per run. rows() gives
+    the averages-CSV rows, snapshot() means, spread and CIs at any point
+    """
+
+    def __init__(self, group_by=None):
+        self.group_by = group_by or (lambda vid: vid)
+        self.runs = 0
+        # key -> {metric: RunningStat}, in order of appearance
+        self._stats: dict = {}
+
+    def __repr__(self) -> str:
+        return f"StreamingAggregator(runs={self.runs}, groups={list(self._stats)})"
+
+    def add_run(self, run_data, route_index: int | None = None) -> None:
+        """One episode, frozen rows or a vid -> record mapping"""
+        if not isinstance(run_data, np.ndarray):
+            run_data = freeze_run(run_data, route_index)
+        for vid, rec in _records(run_data):
+            key = self.group_by(vid)
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = {m: RunningStat() for m in RUN_METRICS}
+            # unfinished journeys only register the agent
+            if rec['end_step'] is None:
+                continue
+            for metric, value in zip(RUN_METRICS, _run_metrics(rec)):
+                stats[metric].add(value)
+        self.runs += 1
+
+    def state(self) -> dict:
+        """Everything but group_by, for checkpoints"""
+        return {'runs': self.runs, 'stats': self._stats}
+
+    def restore(self, state: dict) -> None:
+        self.runs = state['runs']
+        self._stats = state['stats']
+
+    def snapshot(self) -> dict:
+        """key -> {'count': reached runs, metric: RunningStat.summary()}"""
+        return {
+            key: {'count': stats['time'].count,
+                  **{m: stat.summary() for m, stat in stats.items()}}
+            for key, stats in self._stats.items()
+        }
+
+    def report(self, metrics=('time', 'speed', 'red_runs', 'wait_time')) -> str:
+        """One line per group: mean ± 95% CI of a few metrics"""
+        lines = [f">>> Running averages after {self.runs} runs"]
+        for key, stats in self._stats.items():
+            n = stats['time'].count
+            parts = [
+                f"{m} {stats[m].mean:.2f}" + (f"±{stats[m].ci95:.2f}" if n > 1 else "")
+                for m in metrics
+            ]
+            lines.append(f"    {key}: reached {n}" + (", " + ", ".join(parts) if n else ""))
+        return "\n".join(lines)
+
+    def rows(self) -> list[list]:
+        """Averages CSV rows, from exact totals as compute_averages always did"""
+        rows = []
+        for key, stats in self._stats.items():
+            c = stats['time'].count
+            if c > 0:
+                avg = {m: round(stat.total / c, 2) for m, stat in stats.items()}
+                rows.append([
+                    key,
+                    avg['time'],
+                    avg['distance'],
+                    avg['speed'],
+                    avg['max_speed'],
+                    avg['edges'],
+                    c,
+                    avg['tls'],
+                    avg['amber_enc'],
+                    avg['red_enc'],
+                    avg['green_enc'],
+                    avg['amber_runs'],
+                    avg['red_runs'],
+                    avg['green_runs'],
+                    avg['sudden_brakes'],
+                    avg['max_decel'],
+                    avg['avg_decel'],
+                    avg['lane_changes'],
+                    avg['collisions'],
+                    avg['wait_time'],
+                    stats['tls'].total,
+                    stats['amber_enc'].total,
+                    stats['red_enc'].total,
+                    stats['green_enc'].total
+                ])
+            else:
+                rows.append([key] + ["N/A"] * 21)
+        return rows
+
+
 class MetricsCollector:
     """
     Compute per-run summaries and aggregated averages for: 
@@ -10,9 +178,16 @@ class MetricsCollector:
         - total wait time
     """
 
-    def summarise_run(self, run_data: dict, route_index: int) -> list[list]:
+    def summarise_run(self, run_data, route_index: int | None = None) -> list[list]:
+        """
+        Rows of one episode, from its frozen rows (route taken from the
+        rows) or a vid -> record mapping
+        """
+        if not isinstance(run_data, np.ndarray):
+            run_data = freeze_run(run_data, route_index)
         rows = []
-        for vid, rec in run_data.items():
+        for vid, rec in _records(run_data):
+            route_index = rec['route']
             if rec['end_step'] is not None:
                 t = rec['end_step']
                 avg_sp = rec['total_distance'] / t if t > 0 else 0.0
@@ -28,8 +203,8 @@ class MetricsCollector:
                     round(rec['total_distance'], 2),
                     round(avg_sp, 2),
                     round(rec['max_speed'], 2),
-                    len(rec['edges_visited']),
-                    len(rec['tls_encountered']),  
+                    rec['edges'],
+                    rec['tls'],
                     rec['amber_encountered'],
                     rec['red_encountered'],
                     rec['green_encountered'],
@@ -40,90 +215,27 @@ class MetricsCollector:
                     round(rec['max_decel'], 2),
                     round(avg_decel, 2),
                     rec['lane_change_count'],
-                    rec.get('collision_count', 0),
-                    round(rec.get('wait_time', 0.0), 2)
+                    rec['collision_count'],
+                    round(rec['wait_time'], 2)
                 ])
             else:
                 # placeholders for 18 columns
                 rows.append([vid, route_index] + ["-"] * 17)
         return rows
 
-    def compute_averages(self, all_runs: list[tuple[dict, int]]) -> list[list]:
-
-        # init accumulators for metrics
-        agg = {
-            vid: {
-                'sum_time': 0, 'sum_dist': 0.0, 'sum_sp': 0.0, 'sum_max_sp': 0.0,
-                'sum_edges': 0, 'sum_tls': 0, 'sum_amb_enc': 0, 'sum_red_enc': 0, 'sum_green_enc': 0,
-                'sum_amb_runs': 0, 'sum_red_runs': 0, 'sum_green_runs':0, 'sum_sud_brakes': 0, 'sum_max_decel': 0.0, 
-                'sum_avg_decel': 0.0, 'sum_lane_changes': 0, 'sum_collisions': 0, 'sum_wait_time': 0.0, 'count': 0
-            }
-            for vid in ["safe_1", "risky_1"]
-        }
-
-        # acc all successful runs
-        for run_data, _ in all_runs:
-            for vid, rec in run_data.items():
-                if rec.get('end_step') is None:
-                    continue
-                s = agg[vid]
-                t = rec['end_step']
-                avg_decel = (
-                    rec['sum_decel'] / rec['sudden_brake_count']
-                    if rec['sudden_brake_count'] > 0 else 0.0
-                )
-
-                s['sum_time'] += t
-                s['sum_dist'] += rec['total_distance']
-                s['sum_sp'] += (rec['total_distance'] / t if t > 0 else 0.0)
-                s['sum_max_sp'] += rec.get('max_speed', 0.0)
-                s['sum_edges'] += len(rec['edges_visited'])
-                s['sum_tls'] += len(rec['tls_encountered'])
-                s['sum_amb_enc'] += rec['amber_encountered']
-                s['sum_red_enc'] += rec['red_encountered']
-                s['sum_green_enc'] += rec['green_encountered']
-                s['sum_amb_runs'] += rec['amber_run_count']
-                s['sum_red_runs'] += rec['red_run_count']
-                s['sum_green_runs'] += rec['green_run_count']
-                s['sum_sud_brakes'] += rec['sudden_brake_count']
-                s['sum_max_decel'] += rec['max_decel']
-                s['sum_avg_decel'] += avg_decel
-                s['sum_lane_changes'] += rec['lane_change_count']
-                s['sum_collisions'] += rec.get('collision_count', 0)
-                s['sum_wait_time'] += rec.get('wait_time', 0.0)
-                s['count'] += 1
-
-        # compute averages
-        rows = []
-        for vid, s in agg.items():
-            c = s['count']
-            if c > 0:
-                rows.append([
-                    vid,
-                    round(s['sum_time'] / c, 2),
-                    round(s['sum_dist'] / c, 2),
-                    round(s['sum_sp'] / c, 2),
-                    round(s['sum_max_sp'] / c, 2),
-                    round(s['sum_edges'] / c, 2),
-                    c,
-                    round(s['sum_tls'] / c, 2),
-                    round(s['sum_amb_enc'] / c, 2),
-                    round(s['sum_red_enc'] / c, 2),
-                    round(s['sum_green_enc'] /c, 2),
-                    round(s['sum_amb_runs'] / c, 2),
-                    round(s['sum_red_runs'] / c, 2),
-                    round(s['sum_green_runs'] / c, 2),
-                    round(s['sum_sud_brakes'] / c, 2),
-                    round(s['sum_max_decel'] / c, 2),
-                    round(s['sum_avg_decel'] / c, 2),
-                    round(s['sum_lane_changes'] / c, 2),
-                    round(s['sum_collisions'] / c, 2),
-                    round(s['sum_wait_time'] / c, 2),
-                    s['sum_tls'],
-                    s['sum_amb_enc'],
-                    s['sum_red_enc'],
-                    s['sum_green_enc']
-                ])
+    def compute_averages(self, all_runs, group_by=None) -> list[list]:
+        """
+        One row per vehicle id in order of appearance, or per
+        group_by(vid) key, e.g. per policy with many agents.
+        all_runs is an EpisodeTable, frozen rows or (run_data, route_idx)
+        pairs; batch.main feeds a StreamingAggregator as runs finish instead
+        """
+        agg = StreamingAggregator(group_by)
+        if isinstance(all_runs, np.ndarray):
+            all_runs = [all_runs]
+        for run in all_runs:
+            if isinstance(run, tuple):
+                agg.add_run(*run)
             else:
-                rows.append([vid] + ["N/A"] * 21)
-        return rows
+                agg.add_run(run)
+        return agg.rows()
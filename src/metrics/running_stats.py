@@ -0,0 +1,116 @@
+"""
+Constant-memory statistics of a stream of values
+    - P2Quantile: P-square quantile estimate (Jain & Chlamtac, 1985),
+      five markers whatever the stream length,
+    - RunningStat: exact total, Welford mean/variance, min/max,
+      95% confidence interval and median/p90 estimates.
+"""
+
+import math
+from bisect import bisect_right, insort
+
+
+class P2Quantile:
+    """Estimate of the p-quantile, exact while fewer than 5 values were seen"""
+
+    __slots__ = ('p', 'q', 'n', 'want', 'dn')
+
+    def __init__(self, p: float):
+        self.p = p
+        self.q: list[float] = []                 # marker heights
+        self.n = [0, 1, 2, 3, 4]                 # marker positions
+        self.want = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+        self.dn = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+    def add(self, x: float) -> None:
+        q, n = self.q, self.n
+        if len(q) < 5:
+            insort(q, x)
+            return
+
+        if x < q[0]:
+            q[0], k = x, 0
+        elif x >= q[4]:
+            q[4], k = x, 3
+        else:
+            k = min(3, bisect_right(q, x) - 1)
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.want[i] += self.dn[i]
+
+        # nudge the middle markers towards their desired positions
+        for i in (1, 2, 3):
+            d = self.want[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                parabolic = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if q[i - 1] < parabolic < q[i + 1]:
+                    q[i] = parabolic
+                else:
+                    q[i] += d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                n[i] += d
+
+    def value(self) -> float:
+        q = self.q
+        if not q:
+            return math.nan
+        if len(q) < 5:
+            return q[round(self.p * (len(q) - 1))]
+        return q[2]
+
+
+class RunningStat:
+    """Summary of the values added so far, O(1) memory"""
+
+    __slots__ = ('count', 'total', 'mean', '_m2', 'min', 'max', 'p50', 'p90')
+
+    def __init__(self):
+        self.count = 0
+        # exact running sum (int while only ints are added), for averages
+        # that must match summing every value at the end
+        self.total = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.p50 = P2Quantile(0.5)
+        self.p90 = P2Quantile(0.9)
+
+    def __repr__(self) -> str:
+        return f"RunningStat(count={self.count}, mean={self.mean:.3f}, std={self.std:.3f})"
+
+    def add(self, x) -> None:
+        self.count += 1
+        self.total += x
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        self.p50.add(x)
+        self.p90.add(x)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance, nan below two values"""
+        return self._m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance) if self.count > 1 else math.nan
+
+    @property
+    def ci95(self) -> float:
+        """Half-width of the normal-approximation 95% CI of the mean"""
+        return 1.96 * self.std / math.sqrt(self.count) if self.count > 1 else math.nan
+
+    def summary(self) -> dict:
+        return {
+            'count': self.count, 'mean': self.mean, 'std': self.std,
+            'ci95': self.ci95, 'min': self.min, 'max': self.max,
+            'p50': self.p50.value(), 'p90': self.p90.value(),
+        }
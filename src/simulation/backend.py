@@ -0,0 +1,82 @@
+"""
+Pluggable TraCI backend
+    - traci: socket client talking to a separate SUMO process (default)
+    - libsumo: SUMO loaded in-process, same API without socket serialisation
+    - surrogate: pure-python grid simulator (src/simulation/surrogate.py),
+      no SUMO needed, for tests, CI and prototyping
+
+Modules import the `traci` proxy from here instead of the traci package,
+so the backend is chosen once at startup and every call follows it
+"""
+
+import importlib
+import logging
+from contextlib import contextmanager
+
+import traci as _traci
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("traci", "libsumo", "surrogate")
+
+_active = _traci
+
+
+class _BackendProxy:
+    """Forwards attribute access (and monkeypatching) to the active backend"""
+
+    def __getattr__(self, name):
+        return getattr(_active, name)
+
+    def __setattr__(self, name, value):
+        setattr(_active, name, value)
+
+    def __delattr__(self, name):
+        delattr(_active, name)
+
+    def __repr__(self) -> str:
+        return f"<traci backend proxy -> {_active.__name__}>"
+
+
+traci = _BackendProxy()
+
+
+def select_backend(name: str = "traci") -> str:
+    """
+    Switch the backend used by the proxy, returns the one actually active.
+    libsumo falls back to traci if it cannot be imported
+    """
+    global _active
+    if name == "traci":
+        _active = _traci
+    elif name == "libsumo":
+        try:
+            _active = importlib.import_module("libsumo")
+        except ImportError as e:
+            logger.warning("libsumo unavailable (%s), falling back to traci", e)
+            _active = _traci
+    elif name == "surrogate":
+        from src.simulation import surrogate
+        _active = surrogate
+    else:
+        raise ValueError(f"Unknown backend {name!r}, expected one of {BACKENDS}")
+    return active_backend()
+
+
+def active_backend() -> str:
+    return _active.__name__.rsplit(".", 1)[-1]
+
+
+@contextmanager
+def wrapped(wrap):
+    """
+    Calls go through wrap(active backend) inside the block, e.g. to time
+    them (src/simulation/profiler.py); the backend itself is restored after
+    """
+    global _active
+    inner = _active
+    _active = wrap(inner)
+    try:
+        yield _active
+    finally:
+        _active = inner
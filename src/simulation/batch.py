@@ -1,14 +1,26 @@
+import json
 import os
 import time
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+
+import numpy as np
 
 from pathlib import Path
 
+from src.simulation.backend import select_backend
+from src.simulation.checkpoint import (
+    CHECKPOINT_NAME, load_checkpoint, restore_rng, rng_state, save_checkpoint,
+)
+from src.simulation.episode_record import EpisodeTable
+from src.simulation.net_index import NetIndex
+from src.simulation.parallel import run_episodes_parallel
+from src.simulation.profiler import load_summary, report as profile_report
+from src.simulation.route_pool import RoutePool
 from src.simulation.simulation_runner import SimulationRunner
+from src.simulation.warm_start import WarmStartPool
 from src.agents.agent_manager import AgentManager
-from src.metrics.metrics_collector import MetricsCollector
+from src.metrics.metrics_collector import (
+    PER_RUN_HEADERS, MetricsCollector, StreamingAggregator,
+)
 from src.io.csv_exporter import CsvExporter
 
 # if want gui then "sumo-gui", using headless to reduce overhead when running large num
@@ -21,258 +33,275 @@ SUMO_CONFIG = os.path.join(
 )
 
 CSV_DIR = os.path.join(os.path.dirname(__file__), "csv_results")
+RESULTS_FILE = "batch_results.npz"
+# SimulationRunner options that write per-runner output
+OUTPUT_KWARGS = (
+    "trajectory_dir", "experience_dir", "profile_dir", "profile_episodes",
+    "telemetry_dir", "telemetry_every", "telemetry_near_tls",
+)
 
 
-def main(num_runs: int = 100):
+def main(num_runs: int = 100, subscriptions: bool = False, backend: str = "traci",
+         workers: int = 1, merge_every: int = 1, persistent: bool = False,
+         warm_start_steps: int = 0, warm_states: int = 1,
+         route_pool: bool = False, route_bins: dict | None = None,
+         stratified: bool = False, net_index: bool = False,
+         dense_q: bool = False, n_agents: int | None = None,
+         replay: dict | None = None,
+         trajectory_dir: str | None = None, experience_dir: str | None = None,
+         profile_dir: str | None = None, profile_episodes=(),
+         telemetry_dir: str | None = None, telemetry_every: int = 1,
+         telemetry_near_tls: float | None = None,
+         checkpoint_every: int = 0, resume: bool = False, report: bool = True,
+         report_background: bool = False):
 
+    if backend == "surrogate" and (route_pool or net_index or warm_start_steps > 0):
+        # those are built from the OSM network, the surrogate runs its own grid
+        raise ValueError("--route-pool, --net-index and --warm-start need SUMO, "
+                         "not the surrogate backend")
     os.makedirs(CSV_DIR, exist_ok=True)
+    print(f">>> TraCI backend: {select_backend(backend)}")
 
-    runner = SimulationRunner(SUMO_BINARY, SUMO_CONFIG)
+    started = time.time()
+    runner_kwargs = {"use_subscriptions": subscriptions, "persistent": persistent}
+    if warm_start_steps > 0:
+        runner_kwargs["warm_start"] = WarmStartPool(warm_start_steps, warm_states)
+    if trajectory_dir is not None:
+        runner_kwargs["trajectory_dir"] = trajectory_dir
+    if experience_dir is not None:
+        runner_kwargs["experience_dir"] = experience_dir
+    if profile_dir is not None:
+        runner_kwargs["profile_dir"] = profile_dir
+        runner_kwargs["profile_episodes"] = tuple(profile_episodes)
+    if telemetry_dir is not None:
+        runner_kwargs["telemetry_dir"] = telemetry_dir
+        runner_kwargs["telemetry_every"] = telemetry_every
+        runner_kwargs["telemetry_near_tls"] = telemetry_near_tls
+    if workers > 1:
+        # the parent plays no episode, recorders and logs live in the workers
+        runner = SimulationRunner(SUMO_BINARY, SUMO_CONFIG, **{
+            key: value for key, value in runner_kwargs.items() if key not in OUTPUT_KWARGS
+        })
+    else:
+        runner = SimulationRunner(SUMO_BINARY, SUMO_CONFIG, **runner_kwargs)
+    manager_kwargs = {}
+    if route_pool:
+        manager_kwargs = {
+            "route_pool": RoutePool.load_or_build(),
+            "route_bins": route_bins,
+            "stratified": stratified,
+        }
+    if net_index:
+        manager_kwargs["net_index"] = NetIndex.load_or_build()
+    if dense_q:
+        manager_kwargs["dense_q"] = True
+    if n_agents is not None:
+        manager_kwargs["n_agents"] = n_agents
+    if replay is not None:
+        manager_kwargs["replay"] = replay
     collector = MetricsCollector()
     exporter = CsvExporter()
-    mgr = AgentManager()
+    mgr = AgentManager(**manager_kwargs)
     
     eps_history_safe = []
     eps_history_risky = []
-    all_runs = []
+    # finished episodes frozen to compact rows, not kept as records
+    episodes_table = EpisodeTable()
+    # many agents: one average row per policy rather than per vehicle
+    running = StreamingAggregator(
+        group_by=AgentManager.policy_of if n_agents is not None else None
+    )
+    report_every = max(1, num_runs // 10)
     successful = 0
+    first_run = 1
 
-    for i in range(1, num_runs + 1):
-        print(f"\n>>> Starting simulation run {i}/{num_runs}")
-        try:
-            run_data, route_idx = runner.run(mgr)
-            all_runs.append((run_data, route_idx))
-            successful += 1
+    # pick up where an interrupted batch last checkpointed
+    checkpoint_path = os.path.join(mgr.model_dir, CHECKPOINT_NAME)
+    ckpt = load_checkpoint(checkpoint_path) if resume else None
+    if resume and ckpt is None:
+        print(f">>> No checkpoint at {checkpoint_path}, starting from run 1")
+    if ckpt is not None:
+        mgr.load_drivers()
+        mgr.safe_driver.qtable.from_dict(ckpt["q_safe"])
+        mgr.risky_driver.qtable.from_dict(ckpt["q_risky"])
+        mgr.safe_driver.qtable.epsilon, mgr.risky_driver.qtable.epsilon = ckpt["epsilon"]
+        eps_history_safe = list(ckpt["eps_history_safe"])
+        eps_history_risky = list(ckpt["eps_history_risky"])
+        episodes_table = EpisodeTable.from_rows(ckpt["episodes"])
+        running.restore(ckpt["metrics"])
+        mgr.restore_replay(ckpt.get("replay"))
+        successful = ckpt["successful"]
+        restore_rng(ckpt["rng"])
+        first_run = ckpt["episode"] + 1
+        print(f">>> Resuming after run {ckpt['episode']} ({successful} successful)")
 
-            # agent-specific decay
-            mgr.decay_exploration()
-            eps_history_safe.append(mgr.safe_driver.qtable.epsilon)
-            eps_history_risky.append(mgr.risky_driver.qtable.epsilon)
+    # per-run rows reach disk as each run finishes, published at the end
+    per_run_csv = exporter.stream(
+        os.path.join(CSV_DIR, "simulation_per_run.csv"), PER_RUN_HEADERS,
+        resume=ckpt is not None, progress=ckpt["per_run_csv"] if ckpt else None
+    )
 
-            time.sleep(0.5)
-        except Exception as e:
-            print(f"[Run {i}] Error: {e}")
-            continue
+    def record_episode(i, run_data, route_idx):
+        nonlocal successful
+        episodes_table.add(run_data, route_idx)
+        rows = episodes_table.episode_rows(-1)
+        running.add_run(rows)
+        per_run_csv.write_run(i, collector.summarise_run(rows))
+        successful += 1
+        if successful % report_every == 0:
+            print(running.report())
 
-    print(f"\n>>> Completed {successful}/{num_runs} runs.")
+    def write_checkpoint(i, epsilon=None):
+        """epsilon: both drivers' epsilon after run i, the manager's current one if None"""
+        t0 = time.perf_counter()
+        save_checkpoint(checkpoint_path, {
+            "episode": i,
+            "successful": successful,
+            "q_safe": mgr.safe_driver.qtable.to_dict(),
+            "q_risky": mgr.risky_driver.qtable.to_dict(),
+            # epsilon after episode i (failed or not), the decay schedule continues from it
+            "epsilon": epsilon or (mgr.safe_driver.qtable.epsilon, mgr.risky_driver.qtable.epsilon),
+            "eps_history_safe": eps_history_safe,
+            "eps_history_risky": eps_history_risky,
+            # fleet and replay generators are seeded from random, so a resume
+            # restores the fleet's exploration too
+            "rng": rng_state(),
+            "replay": mgr.replay_state(),
+            "metrics": running.state(),
+            "episodes": episodes_table.rows,
+            "per_run_csv": per_run_csv.sync(),
+        })
+        print(f"[Checkpoint] run {i} saved to {checkpoint_path} "
+              f"({1000 * (time.perf_counter() - t0):.0f} ms)")
 
-    # --- FIGURE: epsilon-decay over runs for both drivers
-    plt.figure()
-    runs = list(range(1, len(eps_history_safe) + 1))
-    plt.plot(runs, eps_history_safe,  marker="o", label="SafeDriver")
-    plt.plot(runs, eps_history_risky, marker="x", label="RiskyDriver")
-    plt.title("Exploration Rate Decay over Runs")
-    plt.xlabel("Simulation Run")
-    plt.ylabel("ε (epsilon)")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    eps_path = os.path.join(CSV_DIR, "epsilon_decay.png")
-    plt.savefig(eps_path)
-    print(f"[Plot] epsilon-decay saved to {eps_path}")
+    if workers > 1:
+        # warm-up states are built once here rather than raced by workers
+        if runner.warm_start is not None:
+            runner.warm_start.ensure(runner.cmd)
 
-    # --- FIGURE: heatmaps for q values per agent 
-    # dataframe of q values for heatmap
-    def build_q_df(qtable):
-        records = []
-        for (phase, dist_b, speed_b, _ttl_b), qvals in qtable.Q.items():
-            for action, q in zip(qtable.actions, qvals):
-                records.append({
-                    "phase":    phase,
-                    "dist_bin": dist_b,
-                    "speed_bin": speed_b,
-                    "action":   action,
-                    "Q_value":  q
-                })
+        # one SUMO per worker, results arrive out of order and are
+        # recorded in episode order as soon as all earlier ones are in
+        finished = {}
+        # checkpoints hold the last merged tables, i.e. without the
+        # current round's episodes, so a resume never learns twice
+        next_run = first_run
+        episodes = run_episodes_parallel(
+            mgr, num_runs, workers, merge_every,
+            (SUMO_BINARY, SUMO_CONFIG), runner_kwargs, backend, manager_kwargs,
+            first_episode=first_run
+        )
+        for i, result, error, eps_after in episodes:
+            if error is not None:
+                print(f"[Run {i}] Error: {error}")
+                result = None
+            else:
+                print(f"\n>>> Finished simulation run {i}/{num_runs}")
+            # the manager has already decayed past the dealt-out episodes
+            finished[i] = (result, eps_after)
 
-        df = pd.DataFrame(records)
-        df = df.groupby(
-            ["phase", "dist_bin", "speed_bin", "action"],
-            as_index=False
-        )["Q_value"].mean()
+            while next_run in finished:
+                result, (eps_safe, eps_risky) = finished.pop(next_run)
+                if result is not None:
+                    record_episode(next_run, *result)
+                    eps_history_safe.append(eps_safe)
+                    eps_history_risky.append(eps_risky)
+                if checkpoint_every and next_run % checkpoint_every == 0:
+                    write_checkpoint(next_run, (eps_safe, eps_risky))
+                next_run += 1
+    else:
+        for i in range(first_run, num_runs + 1):
+            print(f"\n>>> Starting simulation run {i}/{num_runs}")
+            try:
+                run_data, route_idx = runner.run(mgr, episode=i)
+            except Exception as e:
+                print(f"[Run {i}] Error: {e}")
+                run_data = None
+            else:
+                mgr.replay_episode_end()
+                record_episode(i, run_data, route_idx)
 
-        return df
+            # agent-specific decay, failed runs included: the schedule
+            # run_episodes_parallel deals out
+            mgr.decay_exploration()
+            if run_data is not None:
+                eps_history_safe.append(mgr.safe_driver.qtable.epsilon)
+                eps_history_risky.append(mgr.risky_driver.qtable.epsilon)
+            # due whether run i succeeded or not, as in parallel mode
+            if checkpoint_every and i % checkpoint_every == 0:
+                write_checkpoint(i)
 
-    qt_safe = mgr.safe_driver.qtable
-    df_q_safe = build_q_df(qt_safe)
+            # persistent session is reset in-place, no process to wind down
+            if not persistent:
+                time.sleep(0.5)
+        runner.close()
+    if runner.telemetry is not None:
+        # with workers, their buffers are drained when their processes exit
+        runner.telemetry.close()
 
-    qt_risky = mgr.risky_driver.qtable
-    df_q_risky = build_q_df(qt_risky)
+    print(f"\n>>> Completed {successful}/{num_runs} runs.")
+    if profile_dir is not None:
+        # workers profile into subdirectories, summed up here
+        print(profile_report(load_summary(profile_dir, since=started)))
+    if checkpoint_every and first_run <= num_runs and num_runs % checkpoint_every:
+        # a later --resume with a larger -n extends this batch
+        write_checkpoint(num_runs)
+    per_run_csv.close()
 
     # persist learned Q-values
-    model_dir = Path("src/agents/learning/models")
-    safe_path = model_dir / "safe_driver_qtable.pkl"
-    risky_path = model_dir / "risky_driver_qtable.pkl"
-    mgr.safe_driver.qtable.save(safe_path)
-    mgr.risky_driver.qtable.save(risky_path)
+    model_dir = Path(mgr.model_dir)
+    safe_path = model_dir / "safe_driver_qtable.qtab"
+    risky_path = model_dir / "risky_driver_qtable.qtab"
+    train_meta = {"episodes": successful, "backend": backend, "workers": workers}
+    mgr.safe_driver.qtable.save(safe_path, train_meta)
+    mgr.risky_driver.qtable.save(risky_path, train_meta)
     print(f"[Save] Q-tables saved to {model_dir}")
 
-    phases = ["GREEN", "AMBER", "RED"]
-    speed_bins = [0, 1, 2]
-    dist_labels = ["0-10", "10-20", "20-40", ">40"]
-    speed_labels = {
-        0: "Stopped (0 m/s)",
-        1: "Slow (0-5 m/s)",
-        2: "Cruise (>5 m/s)"
-    }
-
-    # --- FIGURE: heatmaps
-    def plot_q_heatmap(df_q, qtable, title, out_filename):
-        fig, axes = plt.subplots(
-            len(phases),
-            len(speed_bins),
-            figsize=(12, 9),
-            sharex=True,
-            sharey=True
-        )
-        for i_phase, phase in enumerate(phases):
-            for j_speed, speed in enumerate(speed_bins):
-                ax = axes[i_phase, j_speed]
-                sub = df_q[
-                    (df_q.phase == phase) &
-                    (df_q.speed_bin == speed)
-                ]
-                if sub.empty:
-                    ax.axis("off")
-                    continue
-                pivot = sub.pivot(
-                    index="dist_bin",
-                    columns="action",
-                    values="Q_value"
-                )
-                pivot = pivot[qtable.actions]
-                sns.heatmap(
-                    pivot,
-                    annot=True,
-                    fmt=".2f",
-                    cbar=(j_speed == len(speed_bins) - 1),
-                    xticklabels=qtable.actions,
-                    yticklabels=dist_labels,
-                    ax=ax,
-                    cmap="viridis"
-                )
-                if i_phase == 0:
-                    ax.set_title(speed_labels[speed])
-                if j_speed == 0:
-                    ax.set_ylabel(phase)
-                else:
-                    ax.set_ylabel("")
-        fig.suptitle( #TODO: change this to be better names?
-            f"{title}\n"
-            "(rows = TLS phase, columns = speed bin,\n"
-            " y-axis = distance bin, x-axis = action)",
-            y=0.92
-        )
-        for ax in axes.flat:
-            ax.set_xlabel("")
-            ax.set_xticklabels(ax.get_xticklabels(), rotation=45)
-        plt.tight_layout(rect=[0, 0, 1, 0.90])
-        out_path = os.path.join(CSV_DIR, out_filename)
-        plt.savefig(out_path)
-        print(f"[Plot] {title} saved to {out_path}")
+    # raw results, the report stage builds figures and summary CSVs from them
+    save_results(CSV_DIR, episodes_table, eps_history_safe, eps_history_risky, {
+        "num_runs": num_runs,
+        "successful": successful,
+        "backend": backend,
+        "workers": workers,
+        "fleet": n_agents is not None,
+        "agents": [mgr.safe_driver.vehicle_id, mgr.risky_driver.vehicle_id],
+    })
+    if report:
+        # pandas/matplotlib/seaborn are only imported here
+        from src.simulation import report as report_stage
+        if report_background:
+            proc = report_stage.start_background(CSV_DIR, mgr.model_dir)
+            print(f">>> Report stage rendering in the background (pid {proc.pid}), "
+                  f"log in {os.path.join(CSV_DIR, report_stage.REPORT_LOG)}")
+        else:
+            report_stage.main(CSV_DIR, mgr.model_dir)
 
-    plot_q_heatmap(
-        df_q_safe, qt_safe,
-        title="SafeDriver Q-Values Heatmap",
-        out_filename="Q_heatmap_grid_safe.png"
-    )
-    plot_q_heatmap(
-        df_q_risky, qt_risky,
-        title="RiskyDriver Q-Values Heatmap",
-        out_filename="Q_heatmap_grid_risky.png"
-    )
-
-    # --- DATA: export csvs
-    per_rows = []
-    for data, ridx in all_runs:
-        per_rows += collector.summarise_run(data, ridx)
-    exporter.to_file(
-        os.path.join(CSV_DIR, "simulation_per_run.csv"),
-        headers=[
-            "Agent", "Route", "Time(steps)", "Distance(m)", "Speed(m/s)",
-            "MaxSpeed(m/s)", "Edges", "TLS_enc", "Amber_enc", "Red_enc", "Green_enc",
-            "Amber_runs", "Red_runs", "Green_runs", "Sudden_brakes", "MaxDecel(m/s^2)",
-            "AvgDecel(m/s^2)", "Lane_changes", "Collisions", "WaitTime(s)"
-        ],
-        rows=per_rows
-    )
-    avg_rows = collector.compute_averages(all_runs)
-    exporter.to_file(
-        os.path.join(CSV_DIR, "simulation_averages.csv"),
-        headers=[
-            "Agent", "AvgTime(steps)", "AvgDistance(m)", "AvgSpeed(m/s)",
-            "AvgMaxSpeed(m/s)", "AvgEdges", "NumRuns", "AvgTLS_enc",
-            "AvgAmber_enc", "AvgRed_enc", "AvgGreen_enc", "AvgAmber_runs", "AvgRed_runs",
-            "AvgGreen_runs", "AvgSudden_brakes", "AvgMaxDecel(m/s^2)", "AvgAvgDecel(m/s^2)",
-            "AvgLane_changes", "AvgCollisions", "AvgWaitTime(s)",
-            "TotalTLS_enc", "TotalAmber_enc", "TotalRed_enc", "TotalGreen_enc"
-        ],
-        rows=avg_rows
-    )
 
-    # --- FIGURE: stacked bar charts for speed dist
-    pct = 0.10
-    group_size = max(1, int(successful * pct))
-    first_group = all_runs[:group_size]
-    last_group  = all_runs[-group_size:]
-
-    agents = [
-        mgr.safe_driver.vehicle_id,
-        mgr.risky_driver.vehicle_id
-    ]
-    bin_labels = {
-        0: "Stopped",
-        1: "Compliant",
-        2: "Small overshoot",
-        3: "Large overshoot"
-    }
-
-    for agent_id in agents:
-        # aggregate counts over first and last groups
-        agg_first = {
-            b: sum(run_data[agent_id]['speed_bin_counts'][b] for run_data, _ in first_group)
-            for b in bin_labels
-        }
-        agg_last = {
-            b: sum(run_data[agent_id]['speed_bin_counts'][b] for run_data, _ in last_group)
-            for b in bin_labels
-        }
-        tot_first = sum(agg_first.values()) or 1
-        tot_last  = sum(agg_last.values())  or 1
+def save_results(out_dir: str, episodes_table: EpisodeTable, eps_history_safe: list,
+                 eps_history_risky: list, meta: dict) -> str:
+    """Per-run table, epsilon histories and run metadata as one .npz, atomically"""
+    path = os.path.join(out_dir, RESULTS_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(
+            f, episodes=episodes_table.rows,
+            eps_safe=np.asarray(eps_history_safe, dtype=np.float64),
+            eps_risky=np.asarray(eps_history_risky, dtype=np.float64),
+            meta=np.array(json.dumps(meta)),
+        )
+    os.replace(tmp, path)
+    return path
 
-        # build df of fractions
-        df_cmp = pd.DataFrame({
-            "Group": [f"Avg of First {int(pct*100)}%  Runs", f"Avg of Last {int(pct*100)}% Runs"],
-            **{
-                bin_labels[b]: [
-                    agg_first[b] / tot_first,
-                    agg_last[b]  / tot_last
-                ] for b in sorted(bin_labels)
-            }
-        }).set_index("Group")
 
-        # plot it
-        fig, ax = plt.subplots(figsize=(8, 4))
-        df_cmp.plot(
-            kind="bar",
-            stacked=True,
-            ax=ax,
-            legend=True
-        )
-        fig.suptitle(
-            f"{agent_id}: Avg Speed-Bin Distribution\n",
-            y=0.95
+def load_results(out_dir: str) -> tuple[EpisodeTable, list, list, dict]:
+    """(episodes table, safe and risky epsilon histories, metadata) of save_results"""
+    with np.load(os.path.join(out_dir, RESULTS_FILE)) as data:
+        return (
+            EpisodeTable.from_rows(data["episodes"]),
+            data["eps_safe"].tolist(),
+            data["eps_risky"].tolist(),
+            json.loads(str(data["meta"])),
         )
-        ax.set_ylabel("Fraction of Timesteps")
-        ax.set_ylim(0, 1)
-        plt.xticks(rotation=0)
-        plt.tight_layout()
-        fig.subplots_adjust(top=0.88)
 
-        out_fname = f"speed_bins_compare_{agent_id}.png"
-        out_path  = os.path.join(CSV_DIR, out_fname)
-        plt.savefig(out_path)
-        print(f"[Plot] avg speed-bin comparison ({group_size}) for {agent_id} saved to {out_path}")
 
 if __name__ == "__main__":
     main(300)
\ No newline at end of file
@@ -1,5 +1,6 @@
 import os
-from sumolib import net
+
+from src.simulation.net_index import NetIndex
 
 #NOTE: used to verify prev fixed 10 routes, not currently used (code setup for experiment 3)
 
@@ -7,11 +8,10 @@ net_file = os.path.abspath(
     os.path.join(os.path.dirname(__file__), "..", "osm_data", "osm.net.xml.gz")
 )
 
-# load network and build set of valid ids
-print(f"Loading network from {net_file}…")
-net = net.readNet(net_file)
-valid_edge_ids = {edge.getID() for edge in net.getEdges()}
-print(f"Network contains {len(valid_edge_ids)} edges.\n")
+# load cached network index (parsed from the net file once)
+print(f"Loading network index for {net_file}…")
+index = NetIndex.load_or_build(net_file)
+print(f"Network contains {len(index.edge_list)} edges.\n")
 
 # same routes from agent_manager.py
 valid_routes = [
@@ -30,8 +30,8 @@ valid_routes = [
 # check pairs
 all_good = True
 for start, end in valid_routes:
-    ok_start = start in valid_edge_ids
-    ok_end   = end   in valid_edge_ids
+    ok_start = index.has_edge(start)
+    ok_end   = index.has_edge(end)
 
     if ok_start and ok_end:
         print(f"OK:   {start} → {end}")
@@ -0,0 +1,48 @@
+"""
+Training checkpoints for batch.main
+    - one pickle per batch in the model directory, replaced atomically,
+    - holds what a resumed batch needs to carry on as if never stopped:
+      Q-tables and epsilons, epsilon histories, RNG states, replay
+      buffers, the episode counter, aggregated metrics, the frozen
+      per-run table and how far the streamed per-run CSV had got.
+"""
+
+import logging
+import os
+import pickle
+import random
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+CHECKPOINT_NAME = "checkpoint.pkl"
+
+
+def rng_state() -> dict:
+    return {"random": random.getstate(), "numpy": np.random.get_state()}
+
+
+def restore_rng(state: dict) -> None:
+    random.setstate(state["random"])
+    np.random.set_state(state["numpy"])
+
+
+def save_checkpoint(path: str, state: dict) -> None:
+    """Write state next to path and swap it in, a crash leaves the old one"""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump({"version": FORMAT_VERSION, **state}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path: str) -> dict | None:
+    """The checkpoint at path, None if there is none"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        state = pickle.load(f)
+    if state.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported checkpoint version {state.get('version')}")
+    return state
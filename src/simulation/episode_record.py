@@ -0,0 +1,218 @@
+"""
+Compact per-vehicle episode records
+    - VehicleRecord: __slots__ record filled by SimulationRunner each step,
+      edges/TLS held as interned integer ids, TLS colours as small codes,
+    - EPISODE_DTYPE: one fixed-width numpy row per vehicle and episode,
+    - EpisodeTable: growable structured array of frozen rows, what
+      batch.main keeps for the whole batch and MetricsCollector reads.
+"""
+
+import numpy as np
+
+# tls colour codes, same precedence as the raw-state checks ('y', 'r', 'g')
+NO_COLOUR, AMBER, RED, GREEN = 0, 1, 2, 3
+
+
+def colour_code(raw_state: str) -> int:
+    if 'y' in raw_state:
+        return AMBER
+    if 'r' in raw_state:
+        return RED
+    if 'g' in raw_state:
+        return GREEN
+    return NO_COLOUR
+
+
+class Interner:
+    """String -> small int id, stable for the interner's lifetime"""
+
+    def __init__(self):
+        self._ids: dict = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self):
+        """names in id order"""
+        return iter(self._ids)
+
+    def __call__(self, name: str) -> int:
+        return self._ids.setdefault(name, len(self._ids))
+
+
+class VehicleRecord:
+    """
+    One vehicle's running episode record. Item access (rec['reached'])
+    is kept for code written against the old dict records
+    """
+
+    __slots__ = (
+        'reached', 'end_step', 'total_distance', 'edges_visited',
+        'tls_encountered', 'tls_stop_count',
+        'amber_encountered', 'red_encountered', 'green_encountered',
+        'amber_run_count', 'red_run_count', 'green_run_count',
+        'tls_last_state', 'max_speed', 'sudden_brake_count', 'max_decel',
+        'sum_decel', 'lane_change_count', 'prev_speed', 'prev_lane',
+        'collision_count', 'wait_time', 'speed_bin_counts',
+    )
+
+    def __init__(self):
+        self.reached = False
+        self.end_step = None
+        self.total_distance = 0.0
+        self.edges_visited: set = set()     # interned edge ids
+        self.tls_encountered: set = set()   # interned tls ids
+        self.tls_stop_count = 0
+        self.amber_encountered = 0
+        self.red_encountered = 0
+        self.green_encountered = 0
+        self.amber_run_count = 0
+        self.red_run_count = 0
+        self.green_run_count = 0
+        self.tls_last_state: dict = {}      # tls id -> colour code
+        self.max_speed = 0.0
+        self.sudden_brake_count = 0
+        self.max_decel = 0.0
+        self.sum_decel = 0.0
+        self.lane_change_count = 0
+        self.prev_speed = None
+        self.prev_lane = None
+        self.collision_count = 0
+        self.wait_time = 0.0
+        self.speed_bin_counts = [0, 0, 0, 0] # for stacked plot
+
+    def __getitem__(self, key: str):
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value) -> None:
+        setattr(self, key, value)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, VehicleRecord):
+            return NotImplemented
+        return all(getattr(self, k) == getattr(other, k) for k in self.__slots__)
+
+    def __repr__(self) -> str:
+        return (
+            f"VehicleRecord(reached={self.reached}, end_step={self.end_step}, "
+            f"distance={self.total_distance:.1f})"
+        )
+
+
+EPISODE_DTYPE = np.dtype([
+    ('episode', np.int32),
+    ('agent', 'U24'),
+    ('route', np.int32),            # -1: no route label
+    ('reached', np.bool_),
+    ('end_step', np.int32),         # -1: did not arrive
+    ('total_distance', np.float64),
+    ('max_speed', np.float64),
+    ('edges', np.int32),
+    ('tls', np.int32),
+    ('amber_encountered', np.int32),
+    ('red_encountered', np.int32),
+    ('green_encountered', np.int32),
+    ('amber_run_count', np.int32),
+    ('red_run_count', np.int32),
+    ('green_run_count', np.int32),
+    ('sudden_brake_count', np.int32),
+    ('max_decel', np.float64),
+    ('sum_decel', np.float64),
+    ('lane_change_count', np.int32),
+    ('collision_count', np.int32),
+    ('wait_time', np.float64),
+    ('speed_bin_counts', np.int32, (4,)),
+])
+
+
+def freeze_run(run_data: dict, route_idx: int | None, episode: int = 0) -> np.ndarray:
+    """
+    Structured rows (EPISODE_DTYPE) for one episode's vid -> record
+    mapping. Accepts VehicleRecords or the old dict records
+    """
+    rows = np.zeros(len(run_data), dtype=EPISODE_DTYPE)
+    for row, (vid, rec) in zip(rows, run_data.items()):
+        end_step = rec.get('end_step')
+        row['episode'] = episode
+        row['agent'] = vid
+        row['route'] = -1 if route_idx is None else route_idx
+        row['reached'] = rec.get('reached', end_step is not None)
+        row['end_step'] = -1 if end_step is None else end_step
+        row['edges'] = len(rec.get('edges_visited', ()))
+        row['tls'] = len(rec.get('tls_encountered', ()))
+        for field in (
+            'total_distance', 'max_speed', 'amber_encountered', 'red_encountered',
+            'green_encountered', 'amber_run_count', 'red_run_count', 'green_run_count',
+            'sudden_brake_count', 'max_decel', 'sum_decel', 'lane_change_count',
+            'collision_count', 'wait_time',
+        ):
+            row[field] = rec.get(field, 0)
+        counts = rec.get('speed_bin_counts')
+        if counts is not None:
+            row['speed_bin_counts'] = [counts[b] for b in range(4)]
+    return rows
+
+
+class EpisodeTable:
+    """
+    Frozen rows of every finished episode in one preallocated structured
+    array (doubling when full), a few hundred bytes per vehicle-episode
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._rows = np.zeros(capacity, dtype=EPISODE_DTYPE)
+        self._n = 0
+        self.episodes = 0
+
+    def __len__(self) -> int:
+        return self.episodes
+
+    def __repr__(self) -> str:
+        return f"EpisodeTable(episodes={self.episodes}, rows={self._n})"
+
+    @property
+    def rows(self) -> np.ndarray:
+        return self._rows[:self._n]
+
+    @classmethod
+    def from_rows(cls, rows: np.ndarray) -> "EpisodeTable":
+        """Table continuing from saved rows (e.g. a checkpoint)"""
+        table = cls(max(1024, 2 * len(rows)))
+        table._rows[:len(rows)] = rows
+        table._n = len(rows)
+        table.episodes = int(rows['episode'].max()) + 1 if len(rows) else 0
+        return table
+
+    def add(self, run_data: dict, route_idx: int | None) -> None:
+        """Freeze one finished episode and append it"""
+        self.extend(freeze_run(run_data, route_idx, self.episodes))
+
+    def extend(self, rows: np.ndarray) -> None:
+        """Append already frozen rows as the next episode"""
+        rows = rows.copy()
+        rows['episode'] = self.episodes
+        end = self._n + len(rows)
+        if end > len(self._rows):
+            grown = np.zeros(max(end, 2 * len(self._rows)), dtype=EPISODE_DTYPE)
+            grown[:self._n] = self._rows[:self._n]
+            self._rows = grown
+        self._rows[self._n:end] = rows
+        self._n = end
+        self.episodes += 1
+
+    def episode_rows(self, start: int = 0, stop: int | None = None) -> np.ndarray:
+        """Rows of episodes start..stop-1 (negative start counts from the end)"""
+        stop = self.episodes if stop is None else stop
+        if start < 0:
+            start = max(0, self.episodes + start)
+        ep = self.rows['episode']
+        return self.rows[(ep >= start) & (ep < stop)]
+
+    def __iter__(self):
+        """One structured array per episode, in order"""
+        rows = self.rows
+        bounds = np.flatnonzero(np.diff(rows['episode'])) + 1
+        yield from np.split(rows, bounds) if len(rows) else ()
@@ -0,0 +1,178 @@
+"""
+Compiled network index for fast lookups without TraCI or a full sumolib parse
+    - built once from osm.net.xml.gz, cached as .npz keyed by the net file hash,
+    - edge and lane ids map to dense integer ids,
+    - per edge: lane count, speed limits, length and controlling TLS,
+    - per TLS: junction position.
+
+    python -m src.simulation.net_index
+"""
+
+import hashlib
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+NET_FILE = os.path.join(os.path.dirname(__file__), "..", "osm_data", "osm.net.xml.gz")
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "osm_data", "cache")
+
+FORMAT_VERSION = 1
+
+
+def net_hash(net_file: str) -> str:
+    h = hashlib.sha1()
+    with open(net_file, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+class NetIndex:
+    """Read-only arrays over the network, indexed by integer edge/lane/TLS id"""
+
+    def __init__(self, arrays: dict):
+        self.edge_ids = arrays["edge_ids"]
+        self.edge_lanes = arrays["edge_lanes"]
+        self.edge_speed_limit = arrays["edge_speed_limit"]
+        self.edge_max_speed = arrays["edge_max_speed"]
+        self.edge_length = arrays["edge_length"]
+        self.edge_tls = arrays["edge_tls"]
+        self.lane_ids = arrays["lane_ids"]
+        self.lane_edge = arrays["lane_edge"]
+        self.lane_speed = arrays["lane_speed"]
+        self.tls_ids = arrays["tls_ids"]
+        self.tls_xy = arrays["tls_xy"]
+
+        # python-side lookups, rebuilt on load (cheap next to parsing the XML)
+        self.edge_list = self.edge_ids.tolist()
+        self._edge = {e: i for i, e in enumerate(self.edge_list)}
+        self._lane = {l: i for i, l in enumerate(self.lane_ids.tolist())}
+        self._tls = {t: i for i, t in enumerate(self.tls_ids.tolist())}
+
+    def __repr__(self) -> str:
+        return (
+            f"NetIndex(edges={len(self.edge_ids)}, lanes={len(self.lane_ids)}, "
+            f"tls={len(self.tls_ids)})"
+        )
+
+    # --- LOOKUPS
+
+    def has_edge(self, edge_id: str) -> bool:
+        return edge_id in self._edge
+
+    def edge_index(self, edge_id: str) -> int:
+        return self._edge[edge_id]
+
+    def lane_index(self, lane_id: str) -> int:
+        return self._lane[lane_id]
+
+    def edge_speed(self, edge_id: str) -> float:
+        """Speed limit of the edge's first lane (what inject_agents used)"""
+        return float(self.edge_speed_limit[self._edge[edge_id]])
+
+    def lane_count(self, edge_id: str) -> int:
+        return int(self.edge_lanes[self._edge[edge_id]])
+
+    def length(self, edge_id: str) -> float:
+        return float(self.edge_length[self._edge[edge_id]])
+
+    def lane_max_speed(self, lane_id: str) -> float:
+        return float(self.lane_speed[self._lane[lane_id]])
+
+    def tls_of(self, edge_id: str) -> str | None:
+        """TLS controlling the end of an edge, None if unsignalised"""
+        t = self.edge_tls[self._edge[edge_id]]
+        return None if t < 0 else str(self.tls_ids[t])
+
+    def tls_position(self, tls_id: str) -> tuple[float, float]:
+        x, y = self.tls_xy[self._tls[tls_id]]
+        return float(x), float(y)
+
+    # --- BUILD / CACHE
+
+    @classmethod
+    def build(cls, net_file: str = NET_FILE) -> "NetIndex":
+        import sumolib
+
+        net = sumolib.net.readNet(net_file)
+        edges = [e for e in net.getEdges() if e.getFunction() != "internal"]
+        tls = net.getTrafficLights()
+        tls_pos = {t.getID(): i for i, t in enumerate(tls)}
+
+        lane_ids, lane_edge, lane_speed = [], [], []
+        for i, e in enumerate(edges):
+            for lane in e.getLanes():
+                lane_ids.append(lane.getID())
+                lane_edge.append(i)
+                lane_speed.append(lane.getSpeed())
+
+        tls_xy = np.zeros((len(tls), 2), dtype=np.float32)
+        for i, t in enumerate(tls):
+            coords = [e.getToNode().getCoord() for e in t.getEdges()]
+            if coords:
+                tls_xy[i] = np.mean(coords, axis=0)
+
+        def first_lane_speed(e):
+            lanes = e.getLanes()
+            return lanes[0].getSpeed() if lanes else 0.0
+
+        return cls({
+            "edge_ids": np.array([e.getID() for e in edges]),
+            "edge_lanes": np.array([e.getLaneNumber() for e in edges], dtype=np.int16),
+            "edge_speed_limit": np.array([first_lane_speed(e) for e in edges], dtype=np.float32),
+            "edge_max_speed": np.array(
+                [max((l.getSpeed() for l in e.getLanes()), default=0.0) for e in edges],
+                dtype=np.float32),
+            "edge_length": np.array([e.getLength() for e in edges], dtype=np.float32),
+            "edge_tls": np.array(
+                [tls_pos[e.getTLS().getID()] if e.getTLS() is not None else -1 for e in edges],
+                dtype=np.int32),
+            "lane_ids": np.array(lane_ids),
+            "lane_edge": np.array(lane_edge, dtype=np.int32),
+            "lane_speed": np.array(lane_speed, dtype=np.float32),
+            "tls_ids": np.array([t.getID() for t in tls]),
+            "tls_xy": tls_xy,
+        })
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez(
+            tmp,
+            version=np.int32(FORMAT_VERSION),
+            edge_ids=self.edge_ids, edge_lanes=self.edge_lanes,
+            edge_speed_limit=self.edge_speed_limit, edge_max_speed=self.edge_max_speed,
+            edge_length=self.edge_length, edge_tls=self.edge_tls,
+            lane_ids=self.lane_ids, lane_edge=self.lane_edge, lane_speed=self.lane_speed,
+            tls_ids=self.tls_ids, tls_xy=self.tls_xy,
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "NetIndex":
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["version"]) != FORMAT_VERSION:
+                raise ValueError(f"Unsupported net index version {int(data['version'])}")
+            return cls({k: data[k] for k in data.files if k != "version"})
+
+    @classmethod
+    def load_or_build(cls, net_file: str = NET_FILE, cache_dir: str = CACHE_DIR) -> "NetIndex":
+        """Cached index for this exact net file, rebuilt when the net changes"""
+        path = os.path.join(cache_dir, f"net_index_{net_hash(net_file)}.npz")
+        if os.path.exists(path):
+            return cls.load(path)
+        logger.info("Building network index for %s", net_file)
+        index = cls.build(net_file)
+        index.save(path)
+        return index
+
+
+if __name__ == "__main__":
+    import time
+
+    t0 = time.perf_counter()
+    idx = NetIndex.load_or_build()
+    print(f"{idx} ready in {(time.perf_counter() - t0) * 1000:.1f} ms")
@@ -0,0 +1,152 @@
+"""
+Parallel episode execution for batch.main
+    - one SUMO instance per pool worker, each on its own TraCI label/port,
+    - per-episode run data streams back to the parent through a queue,
+    - the parent owns both Q-tables and the epsilon schedule.
+"""
+
+import multiprocessing as mp
+import queue
+
+from concurrent.futures import ProcessPoolExecutor
+
+from src.agents.agent_manager import AgentManager
+from src.simulation.backend import select_backend
+from src.simulation.simulation_runner import SimulationRunner
+
+# per-process state, filled in by _init_worker
+_worker: dict = {}
+
+
+def _init_worker(runner_args, runner_kwargs, manager_kwargs, backend, results, counter):
+    select_backend(backend)
+    # stable worker_<n> labels, so every batch writes to the same subdirectories
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    _worker["runner"] = SimulationRunner(
+        *runner_args, label=f"worker_{index}", **runner_kwargs
+    )
+    _worker["mgr"] = AgentManager(**manager_kwargs)
+    _worker["results"] = results
+
+
+def _run_chunk(first_episode: int, epsilons: list, q_safe: dict, q_risky: dict):
+    """
+    Run consecutive episodes starting from the parent's Q-tables,
+    putting each episode on the results queue as soon as it ends.
+    Returns the worker's final Q-tables for merging
+    """
+    runner, mgr, results = _worker["runner"], _worker["mgr"], _worker["results"]
+    mgr.load_drivers()
+    mgr.safe_driver.qtable.from_dict(q_safe)
+    mgr.risky_driver.qtable.from_dict(q_risky)
+
+    for offset, (eps_safe, eps_risky) in enumerate(epsilons):
+        episode = first_episode + offset
+        mgr.safe_driver.qtable.epsilon = eps_safe
+        mgr.risky_driver.qtable.epsilon = eps_risky
+        try:
+            result = runner.run(mgr, episode=episode)
+            mgr.replay_episode_end()
+            results.put((episode, result, None))
+        except Exception as e:
+            results.put((episode, None, str(e)))
+
+    return mgr.safe_driver.qtable.to_dict(), mgr.risky_driver.qtable.to_dict()
+
+
+def merge_q(master: dict, updates: list[dict]) -> dict:
+    """
+    Apply the mean of the workers' changes to each q-value,
+    averaging only over workers that changed that value
+    """
+    sums: dict = {}
+    counts: dict = {}
+    width: dict = {}
+    for update in updates:
+        for state, q_vals in update.items():
+            width[state] = len(q_vals)
+            base = master.get(state)
+            for a, q in enumerate(q_vals):
+                delta = q - (base[a] if base is not None else 0.0)
+                if delta != 0.0:
+                    sums[state, a] = sums.get((state, a), 0.0) + delta
+                    counts[state, a] = counts.get((state, a), 0) + 1
+
+    merged = {state: list(q_vals) for state, q_vals in master.items()}
+    for (state, a), total in sums.items():
+        merged.setdefault(state, [0.0] * width[state])[a] += total / counts[state, a]
+    return merged
+
+
+def run_episodes_parallel(mgr: AgentManager, num_runs: int, workers: int,
+                          merge_every: int, runner_args: tuple,
+                          runner_kwargs: dict, backend: str = "traci",
+                          manager_kwargs: dict | None = None,
+                          first_episode: int = 1):
+    """
+    Yields (episode, (run_data, route_idx) | None, error | None,
+    (eps_safe, eps_risky) after that episode) as episodes finish.
+
+    Episodes are dealt out in rounds, every worker runs up to merge_every
+    consecutive episodes from the same master Q-tables and the updates are
+    merged into mgr's tables when the round ends (merge_every=1 syncs after
+    every episode). Epsilons are taken from mgr.decay_exploration in episode
+    order, one decay per episode dealt out whether it succeeds or not (as
+    batch.main's serial loop), so the schedule does not depend on the
+    number of workers.
+    Workers build their own AgentManager(**manager_kwargs).
+    A resumed batch starts dealing at first_episode
+    """
+    mgr.load_drivers()
+    ctx = mp.get_context()
+    results = ctx.Queue()
+    counter = ctx.Value("i", 0)
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(runner_args, runner_kwargs, manager_kwargs or {}, backend, results,
+                  counter),
+    ) as pool:
+        episode = first_episode
+        while episode <= num_runs:
+            q_safe = mgr.safe_driver.qtable.to_dict()
+            q_risky = mgr.risky_driver.qtable.to_dict()
+
+            # deal out one round
+            futures = []
+            eps_after = {}
+            for _ in range(workers):
+                n = min(merge_every, num_runs - episode + 1)
+                if n <= 0:
+                    break
+                epsilons = []
+                for i in range(episode, episode + n):
+                    epsilons.append((mgr.safe_driver.qtable.epsilon,
+                                     mgr.risky_driver.qtable.epsilon))
+                    mgr.decay_exploration()
+                    eps_after[i] = (mgr.safe_driver.qtable.epsilon,
+                                    mgr.risky_driver.qtable.epsilon)
+                futures.append(pool.submit(_run_chunk, episode, epsilons, q_safe, q_risky))
+                episode += n
+
+            # stream episodes back as they finish
+            pending = len(eps_after)
+            while pending:
+                try:
+                    i, result, error = results.get(timeout=1.0)
+                except queue.Empty:
+                    # surface a dead worker instead of waiting forever
+                    for f in futures:
+                        if f.done() and f.exception() is not None:
+                            raise f.exception()
+                    continue
+                pending -= 1
+                yield i, result, error, eps_after[i]
+
+            updates = [f.result() for f in futures]
+            mgr.safe_driver.qtable.from_dict(merge_q(q_safe, [u[0] for u in updates]))
+            mgr.risky_driver.qtable.from_dict(merge_q(q_risky, [u[1] for u in updates]))
@@ -0,0 +1,272 @@
+"""
+Opt-in episode profiler
+    - every TraCI call made through the backend proxy while an episode
+      runs is counted and timed per function (vehicle.getSpeed,
+      simulationStep, ...),
+    - lap(phase) charges the time since the previous lap to a phase of
+      the episode (start, inject, step, agents, metrics, ...) on the
+      monotonic ns clock,
+    - after each episode its report is appended to episodes.jsonl and
+      the summary (summary.json, phases.csv, calls.csv) rewritten, a
+      profiler continues the profile already in its directory,
+    - chosen episodes also run under cProfile, saved as episode_<n>.prof
+      (pstats format: snakeviz, flameprof or gprof2dot draw it).
+
+    python -m src.simulation.profiler show DIR
+"""
+
+import argparse
+import cProfile
+import csv
+import inspect
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from src.simulation import backend
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.path.join(os.path.dirname(__file__), "profiles")
+SUMMARY_FILE = "summary.json"
+EPISODES_FILE = "episodes.jsonl"
+
+# TraCI domains whose calls are timed one by one
+DOMAINS = ("simulation", "vehicle", "trafficlight", "route", "edge", "lane",
+           "junction", "person")
+
+
+def _timed(fn, key: str, calls: dict):
+    def call(*args, **kwargs):
+        t0 = time.perf_counter_ns()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter_ns() - t0
+            entry = calls.get(key)
+            if entry is None:
+                calls[key] = [1, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+    return call
+
+
+class _TimedDomain:
+    """A TraCI domain whose functions count into calls as domain.function"""
+
+    def __init__(self, domain, name: str, calls: dict):
+        self._domain = domain
+        self._name = name
+        self._calls = calls
+
+    def __getattr__(self, attr):
+        value = getattr(self._domain, attr)
+        if inspect.isroutine(value):
+            value = _timed(value, f"{self._name}.{attr}", self._calls)
+            # later lookups skip __getattr__
+            self.__dict__[attr] = value
+        return value
+
+
+class _TimedBackend:
+    """Stands in for the active backend module while an episode is profiled"""
+
+    def __init__(self, module, calls: dict):
+        self._module = module
+        self._calls = calls
+
+    def __getattr__(self, attr):
+        value = getattr(self._module, attr)
+        if attr in DOMAINS:
+            value = _TimedDomain(value, attr, self._calls)
+        elif inspect.isroutine(value):
+            value = _timed(value, attr, self._calls)
+        else:
+            return value
+        self.__dict__[attr] = value
+        return value
+
+
+def _empty_summary() -> dict:
+    # sums only, so worker summaries add up
+    return {"episodes": 0, "steps": 0, "seconds": 0.0, "phases": {}, "calls": {}}
+
+
+def _add(summary: dict, report: dict) -> None:
+    summary["episodes"] += report.get("episodes", 1)
+    summary["steps"] += report["steps"]
+    summary["seconds"] += report["seconds"]
+    for phase, seconds in report["phases"].items():
+        summary["phases"][phase] = summary["phases"].get(phase, 0.0) + seconds
+    for fn, (count, seconds) in report["calls"].items():
+        entry = summary["calls"].setdefault(fn, [0, 0.0])
+        entry[0] += count
+        entry[1] += seconds
+
+
+class EpisodeProfiler:
+    """
+    Phase timers and TraCI call counts of every episode a runner plays,
+    written to out_dir. profile_episodes are episode numbers to run
+    under cProfile as well
+    """
+
+    def __init__(self, out_dir: str = PROFILE_DIR, profile_episodes=()):
+        self.out_dir = out_dir
+        self.profile_episodes = set(profile_episodes)
+        self.episodes = 0
+        self.summary = _empty_summary()
+        self.last_report: dict | None = None
+        self._episode = 0
+        self._phases: dict = {}
+        self._calls: dict = {}
+        self._steps = 0
+        self._start = self._last = 0
+        self._cprofile: cProfile.Profile | None = None
+        os.makedirs(out_dir, exist_ok=True)
+        # continue an existing profile (e.g. of the batch before a --resume)
+        path = os.path.join(out_dir, SUMMARY_FILE)
+        if os.path.exists(path):
+            with open(path) as f:
+                self.summary = json.load(f)
+            self.episodes = self.summary["episodes"]
+
+    def __repr__(self) -> str:
+        return f"EpisodeProfiler({self.out_dir!r}, episodes={self.episodes})"
+
+    @contextmanager
+    def instrument(self):
+        """TraCI calls made through the backend proxy are timed inside the block"""
+        with backend.wrapped(lambda module: _TimedBackend(module, self._calls)):
+            yield
+
+    def begin_episode(self, episode: int | None = None) -> None:
+        self._episode = self.episodes + 1 if episode is None else episode
+        self._phases, self._steps = {}, 0
+        # the timed backend holds on to this dict
+        self._calls.clear()
+        if self._episode in self.profile_episodes:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self._start = self._last = time.perf_counter_ns()
+
+    def lap(self, phase: str) -> None:
+        """Charge the time since the last lap to phase"""
+        now = time.perf_counter_ns()
+        self._phases[phase] = self._phases.get(phase, 0) + now - self._last
+        self._last = now
+
+    def step(self) -> None:
+        """Lap the step phase (traci.simulationStep) and count the step"""
+        self.lap("step")
+        self._steps += 1
+
+    def end_episode(self) -> dict:
+        """Close the episode (the time since the last lap is 'finish'), returns its report"""
+        self.lap("finish")
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            path = os.path.join(self.out_dir, f"episode_{self._episode}.prof")
+            self._cprofile.dump_stats(path)
+            self._cprofile = None
+            logger.info("cProfile of episode %d saved to %s", self._episode, path)
+
+        report = {
+            "episode": self._episode,
+            "steps": self._steps,
+            "seconds": (self._last - self._start) / 1e9,
+            "phases": {p: ns / 1e9 for p, ns in self._phases.items()},
+            "calls": {fn: [n, ns / 1e9] for fn, (n, ns) in
+                      sorted(self._calls.items(), key=lambda kv: -kv[1][0])},
+        }
+        self.episodes += 1
+        self.last_report = report
+        _add(self.summary, report)
+        with open(os.path.join(self.out_dir, EPISODES_FILE), "a") as f:
+            f.write(json.dumps(report) + "\n")
+        write_summary(self.out_dir, self.summary)
+        logger.info("Episode %d profile: %s", self._episode, _phase_line(report))
+        return report
+
+
+def _phase_line(report: dict) -> str:
+    total = report["seconds"] or 1.0
+    return ", ".join(f"{p} {100 * s / total:.0f}%" for p, s in
+                     sorted(report["phases"].items(), key=lambda kv: -kv[1]))
+
+
+def write_summary(out_dir: str, summary: dict) -> None:
+    """summary.json plus phases.csv and calls.csv derived from it, each atomically"""
+    steps = max(1, summary["steps"])
+    total = summary["seconds"] or 1.0
+    traci_total = sum(s for _n, s in summary["calls"].values()) or 1.0
+
+    phases = [["phase", "seconds", "share", "us_per_step"]] + [
+        [p, round(s, 6), round(s / total, 4), round(1e6 * s / steps, 2)]
+        for p, s in sorted(summary["phases"].items(), key=lambda kv: -kv[1])
+    ]
+    calls = [["function", "calls", "seconds", "mean_us", "calls_per_step", "traci_share"]] + [
+        [fn, n, round(s, 6), round(1e6 * s / n, 3), round(n / steps, 3),
+         round(s / traci_total, 4)]
+        for fn, (n, s) in sorted(summary["calls"].items(), key=lambda kv: -kv[1][0])
+    ]
+    for name, content in ((SUMMARY_FILE, summary), ("phases.csv", phases),
+                          ("calls.csv", calls)):
+        path = os.path.join(out_dir, name)
+        tmp = path + ".tmp"
+        with open(tmp, "w", newline="") as f:
+            if name == SUMMARY_FILE:
+                json.dump(content, f, indent=1)
+            else:
+                csv.writer(f).writerows(content)
+        os.replace(tmp, path)
+
+
+def load_summary(out_dir: str, since: float | None = None) -> dict:
+    """
+    Summary of out_dir and every worker subdirectory under it, added up;
+    since (a time.time()) skips summaries older than it, e.g. of workers
+    of an earlier batch
+    """
+    summary = _empty_summary()
+    for root, _dirs, files in os.walk(out_dir):
+        path = os.path.join(root, SUMMARY_FILE)
+        if SUMMARY_FILE in files and (since is None or os.path.getmtime(path) >= since):
+            with open(path) as f:
+                _add(summary, json.load(f))
+    return summary
+
+
+def report(summary: dict, top: int = 10) -> str:
+    """Phase shares and the most called TraCI functions, as text"""
+    n, steps = summary["episodes"], max(1, summary["steps"])
+    total = summary["seconds"] or 1.0
+    lines = [f">>> Profile of {n} episode(s), {summary['steps']} steps, "
+             f"{summary['seconds']:.2f} s ({1e6 * summary['seconds'] / steps:.0f} us/step)"]
+    for phase, seconds in sorted(summary["phases"].items(), key=lambda kv: -kv[1]):
+        lines.append(f"    {phase:<14}{seconds:>9.2f} s{100 * seconds / total:>6.1f}%")
+    calls = sorted(summary["calls"].items(), key=lambda kv: -kv[1][0])
+    if calls:
+        lines.append(f"    {'traci call':<38}{'calls':>9}{'/step':>8}{'mean us':>9}")
+    for fn, (count, seconds) in calls[:top]:
+        lines.append(f"    {fn:<38}{count:>9}{count / steps:>8.2f}"
+                     f"{1e6 * seconds / count:>9.1f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise episode profiles")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="Phase shares and top TraCI calls")
+    show.add_argument("path", nargs="?", default=PROFILE_DIR)
+    show.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    print(report(load_summary(args.path), args.top))
+
+
+if __name__ == "__main__":
+    main()
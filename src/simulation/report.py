@@ -0,0 +1,344 @@
+"""
+Report stage of a batch: figures and summary CSVs from raw results
+    - reads what training left behind: batch_results.npz (per-run table,
+      epsilon histories, run metadata) and the saved .qtab models,
+    - writes the averages CSV and the per-route CSV next to the results,
+      then the epsilon-decay plot, Q heatmaps and speed-bin comparisons,
+    - each figure is an independent job: its input is reduced to a few
+      arrays saved under .figures/ and a process pool draws the jobs,
+    - figure_cache.json holds a digest of each figure's input, a figure
+      whose input is unchanged since it was drawn is not drawn again,
+    - start_background() runs the stage in a detached process, so the
+      caller can carry on training or exit while figures render,
+    - the only module of a batch needing pandas, matplotlib and seaborn,
+      so train-only runs (and parallel workers) never import them.
+
+    python -m src.simulation.report [RESULTS_DIR] [--model-dir DIR] [--workers N]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+from src.agents.agent_manager import AgentManager
+from src.agents.learning.model_format import load_model
+from src.io.csv_exporter import CsvExporter
+from src.metrics import analytics
+from src.metrics.metrics_collector import AVERAGES_HEADERS, MetricsCollector
+from src.simulation.batch import CSV_DIR, RESULTS_FILE, load_results
+
+MODEL_DIR = os.path.normpath(
+    os.path.join(os.path.dirname(__file__), "..", "agents", "learning", "models")
+)
+REPO_ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", ".."))
+JOBS_DIR = ".figures"
+FIGURE_CACHE = "figure_cache.json"
+REPORT_LOG = "report.log"
+# part of every figure digest, bump it when a renderer draws differently
+RENDER_VERSION = 1
+
+phases = ["GREEN", "AMBER", "RED"]
+speed_bins = [0, 1, 2]
+dist_labels = ["0-10", "10-20", "20-40", ">40"]
+speed_labels = {
+    0: "Stopped (0 m/s)",
+    1: "Slow (0-5 m/s)",
+    2: "Cruise (>5 m/s)"
+}
+
+
+# --- FIGURE INPUTS
+
+def q_means(qtable) -> np.ndarray:
+    """
+    Q-values for the heatmap: (phase, dist_bin, speed_bin, action) mean
+    over the time-to-red bins of visited states, nan where none was visited
+    """
+    dims = [len(dim) for dim in qtable.state_dims]
+    q = qtable.q.reshape(*dims, len(qtable.actions))
+    visited = qtable.visited.reshape(dims)
+    counts = visited.sum(axis=3)[..., None]
+    sums = np.where(visited[..., None], q, 0.0).sum(axis=3)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    rows = [qtable.state_dims[0].index(phase) for phase in phases]
+    return means[rows][:, :, speed_bins]
+
+
+def figure_jobs(episodes_table, eps_history_safe, eps_history_risky, meta: dict,
+                model_dir: str) -> list[tuple[str, str, dict]]:
+    """(renderer, file name, input arrays) of every figure of the report"""
+    jobs = [("epsilon", "epsilon_decay.png", {
+        "eps_safe": np.asarray(eps_history_safe, dtype=np.float64),
+        "eps_risky": np.asarray(eps_history_risky, dtype=np.float64),
+    })]
+
+    for name, title in (("safe", "SafeDriver"), ("risky", "RiskyDriver")):
+        qtable = load_model(os.path.join(model_dir, f"{name}_driver_qtable.qtab"))
+        jobs.append(("q_heatmap", f"Q_heatmap_grid_{name}.png", {
+            "means": q_means(qtable),
+            "actions": np.array(qtable.actions),
+            "title": np.array(f"{title} Q-Values Heatmap"),
+        }))
+
+    pct = 0.10
+    group_size = max(1, int(meta["successful"] * pct))
+    agents = meta["agents"]
+    shares = analytics.speed_bin_shares(episodes_table, agents, pct)
+    for agent_id in agents:
+        df_cmp = shares[agent_id]
+        jobs.append(("speed_bins", f"speed_bins_compare_{agent_id}.png", {
+            "shares": df_cmp.to_numpy(dtype=np.float64),
+            "groups": np.array(list(df_cmp.index)),
+            "bins": np.array(list(df_cmp.columns)),
+            "agent": np.array(agent_id),
+            "group_size": np.array(group_size),
+        }))
+    return jobs
+
+
+def digest(kind: str, data: dict) -> str:
+    """Identifies a figure's input: renderer, its version and every array"""
+    h = hashlib.sha1(f"{kind}:{RENDER_VERSION}".encode())
+    for key in sorted(data):
+        value = np.ascontiguousarray(data[key])
+        h.update(f"{key}:{value.dtype.str}:{value.shape}".encode())
+        h.update(value.tobytes())
+    return h.hexdigest()
+
+
+# --- RENDERERS, run in the pool
+
+def _save(fig, out_path: str) -> None:
+    # readers never see a half-written png
+    tmp = out_path + ".tmp.png"
+    fig.savefig(tmp)
+    plt.close(fig)
+    os.replace(tmp, out_path)
+
+
+def plot_epsilon(data: dict, out_path: str) -> None:
+    eps_history_safe, eps_history_risky = data["eps_safe"], data["eps_risky"]
+    fig = plt.figure()
+    runs = list(range(1, len(eps_history_safe) + 1))
+    plt.plot(runs, eps_history_safe,  marker="o", label="SafeDriver")
+    plt.plot(runs, eps_history_risky, marker="x", label="RiskyDriver")
+    plt.title("Exploration Rate Decay over Runs")
+    plt.xlabel("Simulation Run")
+    plt.ylabel("ε (epsilon)")
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    _save(fig, out_path)
+
+
+def plot_q_heatmap(data: dict, out_path: str) -> None:
+    means, actions, title = data["means"], data["actions"].tolist(), str(data["title"])
+    fig, axes = plt.subplots(
+        len(phases),
+        len(speed_bins),
+        figsize=(12, 9),
+        sharex=True,
+        sharey=True
+    )
+    for i_phase, phase in enumerate(phases):
+        for j_speed, speed in enumerate(speed_bins):
+            ax = axes[i_phase, j_speed]
+            # dist_bin x action
+            grid = means[i_phase, :, j_speed, :]
+            if np.isnan(grid).all():
+                ax.axis("off")
+                continue
+            sns.heatmap(
+                grid,
+                annot=True,
+                fmt=".2f",
+                cbar=(j_speed == len(speed_bins) - 1),
+                xticklabels=actions,
+                yticklabels=dist_labels,
+                ax=ax,
+                cmap="viridis"
+            )
+            if i_phase == 0:
+                ax.set_title(speed_labels[speed])
+            if j_speed == 0:
+                ax.set_ylabel(phase)
+            else:
+                ax.set_ylabel("")
+    fig.suptitle( #TODO: change this to be better names?
+        f"{title}\n"
+        "(rows = TLS phase, columns = speed bin,\n"
+        " y-axis = distance bin, x-axis = action)",
+        y=0.92
+    )
+    for ax in axes.flat:
+        ax.set_xlabel("")
+        ax.set_xticklabels(ax.get_xticklabels(), rotation=45)
+    plt.tight_layout(rect=[0, 0, 1, 0.90])
+    _save(fig, out_path)
+
+
+def plot_speed_bins(data: dict, out_path: str) -> None:
+    agent_id = str(data["agent"])
+    df_cmp = pd.DataFrame(
+        data["shares"],
+        index=pd.Index(data["groups"].tolist(), name="Group"),
+        columns=data["bins"].tolist()
+    )
+    fig, ax = plt.subplots(figsize=(8, 4))
+    df_cmp.plot(
+        kind="bar",
+        stacked=True,
+        ax=ax,
+        legend=True
+    )
+    fig.suptitle(
+        f"{agent_id}: Avg Speed-Bin Distribution\n",
+        y=0.95
+    )
+    ax.set_ylabel("Fraction of Timesteps")
+    ax.set_ylim(0, 1)
+    plt.xticks(rotation=0)
+    plt.tight_layout()
+    fig.subplots_adjust(top=0.88)
+    _save(fig, out_path)
+
+
+RENDERERS = {
+    "epsilon": plot_epsilon,
+    "q_heatmap": plot_q_heatmap,
+    "speed_bins": plot_speed_bins,
+}
+
+
+def render_job(kind: str, data_path: str, out_path: str) -> str:
+    """Draw one figure from its saved input, the pool's entry point"""
+    with np.load(data_path) as data:
+        RENDERERS[kind](dict(data), out_path)
+    return out_path
+
+
+# --- SCHEDULING
+
+def _load_cache(out_dir: str) -> dict:
+    path = os.path.join(out_dir, FIGURE_CACHE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_cache(out_dir: str, cache: dict) -> None:
+    path = os.path.join(out_dir, FIGURE_CACHE)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def render(jobs: list[tuple[str, str, dict]], out_dir: str,
+           workers: int | None = None) -> list[str]:
+    """
+    Draw the figures of jobs into out_dir with a process pool; those whose
+    input matches the cache and whose file exists are kept. Returns the
+    names of the figures drawn
+    """
+    cache = _load_cache(out_dir)
+    jobs_dir = os.path.join(out_dir, JOBS_DIR)
+    os.makedirs(jobs_dir, exist_ok=True)
+
+    todo = []
+    for kind, name, data in jobs:
+        key = digest(kind, data)
+        out_path = os.path.join(out_dir, name)
+        if cache.get(name) == key and os.path.exists(out_path):
+            print(f"[Plot] {out_path} unchanged, kept")
+            continue
+        data_path = os.path.join(jobs_dir, os.path.splitext(name)[0] + ".npz")
+        np.savez(data_path, **data)
+        todo.append((kind, name, key, data_path, out_path))
+    if not todo:
+        return []
+
+    workers = workers or min(len(todo), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            (pool.submit(render_job, kind, data_path, out_path), name, key)
+            for kind, name, key, data_path, out_path in todo
+        ]
+        for future, name, key in futures:
+            print(f"[Plot] {name} saved to {future.result()}")
+            cache[name] = key
+    _write_cache(out_dir, cache)
+    return [name for _kind, name, *_rest in todo]
+
+
+def main(results_dir: str = CSV_DIR, model_dir: str = MODEL_DIR,
+         workers: int | None = None) -> list[str]:
+    """
+    Every figure and summary CSV of the batch whose results are in
+    results_dir, returns the figures that had to be drawn
+    """
+    episodes_table, eps_history_safe, eps_history_risky, meta = load_results(results_dir)
+    exporter = CsvExporter()
+
+    # --- DATA: export csvs
+    # many agents: one average row per policy rather than per vehicle
+    group_by = AgentManager.policy_of if meta["fleet"] else None
+    exporter.to_file(
+        os.path.join(results_dir, "simulation_averages.csv"),
+        headers=AVERAGES_HEADERS,
+        rows=MetricsCollector().compute_averages(episodes_table, group_by)
+    )
+    by_route = analytics.per_route(episodes_table, group_by)
+    exporter.to_file(
+        os.path.join(results_dir, "simulation_per_route.csv"),
+        headers=list(by_route.columns),
+        rows=by_route.to_dict('split')['data']
+    )
+
+    # --- FIGURES: epsilon decay, Q heatmaps per agent, speed-bin stacked bars
+    jobs = figure_jobs(episodes_table, eps_history_safe, eps_history_risky, meta, model_dir)
+    return render(jobs, results_dir, workers)
+
+
+def start_background(results_dir: str = CSV_DIR, model_dir: str = MODEL_DIR,
+                     workers: int | None = None) -> subprocess.Popen:
+    """
+    Run the report stage in a process of its own session, output going to
+    report.log in results_dir; it goes on after the caller exits
+    """
+    cmd = [sys.executable, "-m", "src.simulation.report", os.path.abspath(results_dir),
+           "--model-dir", os.path.abspath(model_dir)]
+    if workers is not None:
+        cmd += ["--workers", str(workers)]
+    with open(os.path.join(results_dir, REPORT_LOG), "w") as log:
+        return subprocess.Popen(cmd, cwd=REPO_ROOT, stdin=subprocess.DEVNULL, stdout=log,
+                                stderr=subprocess.STDOUT, start_new_session=True)
+
+
+def cli():
+    parser = argparse.ArgumentParser(
+        description="Build the figures and summary CSVs of a finished batch"
+    )
+    parser.add_argument("results_dir", nargs="?", default=CSV_DIR,
+                        help=f"Directory holding {RESULTS_FILE} (default: src/simulation/csv_results)")
+    parser.add_argument("--model-dir", default=MODEL_DIR,
+                        help="Directory holding the saved .qtab models")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processes drawing figures (default: one per figure, up to the CPU count)")
+    args = parser.parse_args()
+    main(args.results_dir, args.model_dir, args.workers)
+
+
+if __name__ == "__main__":
+    cli()
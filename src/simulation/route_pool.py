@@ -0,0 +1,201 @@
+"""
+Offline route pool for AgentManager.inject_agents
+    - built once from osm.net.xml.gz with sumolib, no SUMO process needed,
+    - every route is connected for passenger cars and has > 1 edge,
+    - records length, traffic-light count and speed limits per route,
+    - sampled in O(1), optionally stratified by those attributes.
+
+    python -m src.simulation.route_pool --size 2000
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import random
+
+from src.simulation.net_index import net_hash
+
+logger = logging.getLogger(__name__)
+
+NET_FILE = os.path.join(os.path.dirname(__file__), "..", "osm_data", "osm.net.xml.gz")
+POOL_FILE = os.path.join(os.path.dirname(__file__), "..", "osm_data", "osm.routes.json.gz")
+
+FORMAT_VERSION = 1
+
+# strata labels, bin edges are tercile cut points of the built pool
+BIN_LABELS = ("low", "mid", "high")
+STRATA = ("length", "tls", "max_speed")
+
+
+class RoutePool:
+    """Validated routes plus the indices needed for stratified sampling"""
+
+    def __init__(self, routes: list[dict], cuts: dict | None = None):
+        self.routes = routes
+        self.cuts = cuts if cuts is not None else self._tercile_cuts(routes)
+        # net_hash of the network a loaded pool was built from
+        self.net_hash: str | None = None
+        self._strata: dict = {}
+        for idx, route in enumerate(routes):
+            self._strata.setdefault(self.stratum(route), []).append(idx)
+
+    def __len__(self) -> int:
+        return len(self.routes)
+
+    def __repr__(self) -> str:
+        return f"RoutePool(routes={len(self.routes)}, strata={len(self._strata)})"
+
+    @staticmethod
+    def _tercile_cuts(routes: list[dict]) -> dict:
+        cuts = {}
+        for attr in STRATA:
+            values = sorted(r[attr] for r in routes)
+            if not values:
+                cuts[attr] = [0.0, 0.0]
+                continue
+            cuts[attr] = [values[len(values) // 3], values[2 * len(values) // 3]]
+        return cuts
+
+    def stratum(self, route: dict) -> tuple[str, ...]:
+        """(length, tls, max_speed) bin labels of a route"""
+        labels = []
+        for attr in STRATA:
+            lo, hi = self.cuts[attr]
+            v = route[attr]
+            labels.append(BIN_LABELS[0] if v < lo else BIN_LABELS[1] if v < hi else BIN_LABELS[2])
+        return tuple(labels)
+
+    def sample(self, rng=random, stratified: bool = False, **bins) -> int:
+        """
+        Index of a random route.
+        bins restrict strata, e.g. sample(length="high", tls="low"),
+        stratified=True picks a stratum uniformly first so rare
+        combinations are drawn as often as common ones
+        """
+        unknown = set(bins) - set(STRATA)
+        if unknown:
+            raise ValueError(f"Unknown route attributes {sorted(unknown)}, expected {STRATA}")
+
+        keys = [
+            key for key in self._strata
+            if all(key[STRATA.index(attr)] == label for attr, label in bins.items())
+        ]
+        if not keys:
+            raise ValueError(f"No routes in stratum {bins}")
+
+        if stratified:
+            return rng.choice(self._strata[rng.choice(keys)])
+        if len(keys) == len(self._strata):
+            return rng.randrange(len(self.routes))
+        # weight strata by their size = uniform over the matching routes
+        total = sum(len(self._strata[k]) for k in keys)
+        pick = rng.randrange(total)
+        for k in keys:
+            if pick < len(self._strata[k]):
+                return self._strata[k][pick]
+            pick -= len(self._strata[k])
+
+    # --- PERSISTENCE
+
+    def save(self, path: str = POOL_FILE, net_file: str = NET_FILE) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + ".tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump({
+                "version": FORMAT_VERSION,
+                "net": os.path.basename(net_file),
+                "net_hash": net_hash(net_file),
+                "cuts": self.cuts,
+                "routes": self.routes,
+            }, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = POOL_FILE) -> "RoutePool":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported route pool version {data.get('version')!r}")
+        pool = cls(data["routes"], data["cuts"])
+        pool.net_hash = data.get("net_hash")
+        return pool
+
+    @classmethod
+    def load_or_build(cls, path: str = POOL_FILE, net_file: str = NET_FILE,
+                      size: int = 2000) -> "RoutePool":
+        """Cached pool if it was built from this exact net file, else a rebuilt one"""
+        if os.path.exists(path):
+            pool = cls.load(path)
+            if pool.net_hash == net_hash(net_file):
+                return pool
+            logger.info("Route pool %s was built from another network, rebuilding", path)
+        pool = build_pool(net_file, size)
+        pool.save(path, net_file)
+        return pool
+
+
+def _lane_speed(edge) -> float:
+    # same limit inject_agents used: first lane's max speed
+    lanes = edge.getLanes()
+    return lanes[0].getSpeed() if lanes else 0.0
+
+
+def build_pool(net_file: str = NET_FILE, size: int = 2000, seed: int = 0,
+               max_attempts: int | None = None) -> RoutePool:
+    """Route random passenger-edge pairs through the network, keep connected ones"""
+    import sumolib
+
+    net = sumolib.net.readNet(net_file)
+    edges = [
+        e for e in net.getEdges()
+        if e.getFunction() != "internal" and e.allows("passenger")
+    ]
+    rng = random.Random(seed)
+    routes, seen = [], set()
+    max_attempts = max_attempts or size * 20
+
+    for _ in range(max_attempts):
+        if len(routes) >= size:
+            break
+        a, b = rng.sample(edges, 2)
+        if (a.getID(), b.getID()) in seen:
+            continue
+        seen.add((a.getID(), b.getID()))
+
+        path, _cost = net.getFastestPath(a, b, vClass="passenger")
+        if not path or len(path) < 2:
+            continue
+        speeds = [_lane_speed(e) for e in path]
+        routes.append({
+            "edges": [e.getID() for e in path],
+            "length": round(sum(e.getLength() for e in path), 2),
+            "tls": len({e.getTLS().getID() for e in path[:-1] if e.getTLS() is not None}),
+            "max_speed": max(speeds),
+            "min_speed": min(speeds),
+        })
+
+    if not routes:
+        raise RuntimeError(f"No connected routes found in {net_file}")
+    logger.info("Built route pool with %d routes from %s", len(routes), net_file)
+    return RoutePool(routes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the agent route pool")
+    parser.add_argument("--net", default=NET_FILE)
+    parser.add_argument("--out", default=POOL_FILE)
+    parser.add_argument("--size", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    pool = build_pool(args.net, args.size, args.seed)
+    pool.save(args.out, args.net)
+    print(f"Saved {len(pool)} routes to {args.out}")
+    for key, idxs in sorted(pool._strata.items()):
+        print(f"  length={key[0]:<4} tls={key[1]:<4} max_speed={key[2]:<4} {len(idxs)}")
+
+
+if __name__ == "__main__":
+    main()
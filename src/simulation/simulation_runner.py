@@ -1,18 +1,67 @@
-import traci
 import logging
+import os
+from contextlib import nullcontext
+
+from traci import constants as tc
+
+from src.agents.learning.experience import ExperienceLog
+from src.simulation import telemetry
+from src.simulation.backend import traci
+from src.simulation.episode_record import (
+    AMBER, GREEN, RED, Interner, VehicleRecord, colour_code,
+)
+from src.simulation.profiler import EpisodeProfiler
+from src.simulation.trajectory import TrajectoryRecorder
+from src.simulation.warm_start import WarmStartPool
+from src.simulation.world_snapshot import WorldSnapshot
 
 logger = logging.getLogger(__name__)
 
 SUDDEN_BRAKE_THRESHOLD = 3.0
 
+# subscription mode: everything the loop reads arrives in one step response
+VEHICLE_VARS = [
+    tc.VAR_SPEED, tc.VAR_ROAD_ID, tc.VAR_DISTANCE, tc.VAR_LANE_ID, tc.VAR_NEXT_TLS,
+    tc.VAR_ALLOWED_SPEED,
+]
+TLS_VARS = [tc.TL_RED_YELLOW_GREEN_STATE, tc.TL_NEXT_SWITCH, tc.TL_PHASE_DURATION]
+SIM_VARS = [
+    tc.VAR_DEPARTED_VEHICLES_IDS, tc.VAR_ARRIVED_VEHICLES_IDS,
+    tc.VAR_COLLIDING_VEHICLES_IDS, tc.VAR_TIME,
+]
+
 class SimulationRunner:
     """
     - starts SUMO simulation,
     - injects agents, 
     - collects raw per-agent data.
+
+    Options:
+        use_subscriptions: read per-step telemetry from TraCI subscriptions
+            instead of individual getter calls,
+        label: names the TraCI connection when several SUMOs run side by side,
+            output directories get a subdirectory of that name,
+        persistent: keep one SUMO alive and reset it with traci.load between
+            episodes (call close() when the batch is done),
+        warm_start: restore a saved warmed-up traffic state at episode start,
+        trajectory_dir: record every agent's per-step trajectory there,
+        experience_dir: log every Q-update there for offline training,
+        profile_dir: time the phases and TraCI calls of every episode,
+            profile_episodes also run under cProfile,
+        telemetry_dir: sample per-step agent events into a TelemetryBuffer,
+            every telemetry_every steps, only within telemetry_near_tls
+            metres of a TLS if given.
     """
     def __init__(self, sumo_binary: str, sumo_config: str,
-                 max_steps: int = 3000, step_length: float = 1.0):
+                 max_steps: int = 3000, step_length: float = 1.0,
+                 use_subscriptions: bool = False, label: str | None = None,
+                 persistent: bool = False,
+                 warm_start: WarmStartPool | None = None,
+                 trajectory_dir: str | None = None,
+                 experience_dir: str | None = None,
+                 profile_dir: str | None = None, profile_episodes=(),
+                 telemetry_dir: str | None = None, telemetry_every: int = 1,
+                 telemetry_near_tls: float | None = None):
         mem = max_steps * step_length
         self.cmd = [
             sumo_binary, "-c", sumo_config,
@@ -20,147 +69,305 @@ class SimulationRunner:
             f"--waiting-time-memory", str(mem),
             "--quit-on-end"
         ]
+        self.sumo_config = sumo_config
         self.max_steps = max_steps
         self.step_length = step_length
+        self.use_subscriptions = use_subscriptions
+        self.label = label
+        self.persistent = persistent
+        self.warm_start = warm_start
+        self._session_open = False
+        self.call_stats: dict = {}
+        # edge/lane/TLS ids -> ints for the records, shared across episodes
+        self.intern = Interner()
+        self.trajectory = None
+        if trajectory_dir is not None:
+            self.trajectory = TrajectoryRecorder(self._output_dir(trajectory_dir))
+        self.experience = None
+        if experience_dir is not None:
+            self.experience = ExperienceLog(self._output_dir(experience_dir))
+        self.profiler = None
+        if profile_dir is not None:
+            self.profiler = EpisodeProfiler(self._output_dir(profile_dir), profile_episodes)
+        self.telemetry = None
+        if telemetry_dir is not None:
+            self.telemetry = telemetry.TelemetryBuffer(
+                self._output_dir(telemetry_dir),
+                every=telemetry_every, near_tls=telemetry_near_tls
+            )
+
+    def _output_dir(self, base: str) -> str:
+        """Where this runner writes an output, a labelled runner in its own subdirectory"""
+        return base if self.label is None else os.path.join(base, self.label)
 
-    def run(self, agent_manager):
+    def run(self, agent_manager, episode: int | None = None):
+        """One episode, episode numbers it for the profiler"""
+        prof = self.profiler
+        with prof.instrument() if prof is not None else nullcontext():
+            return self._run(agent_manager, prof, episode)
+
+    def _run(self, agent_manager, prof: EpisodeProfiler | None, episode: int | None):
         data = {}
         route_idx = None
 
         try:
-            traci.start(self.cmd)
+            if prof is not None:
+                prof.begin_episode(episode)
+            if self.warm_start is not None and not self._session_open:
+                self.warm_start.ensure(self.cmd)
+            self._start()
+            if self.warm_start is not None:
+                # agents join already realistic traffic, steps count from here
+                traci.simulation.loadState(self.warm_start.choose(self.sumo_config))
+            if prof is not None:
+                prof.lap("start")
             agent_manager.inject_agents()
-            dest = agent_manager.get_destination_edge()
+            dests = agent_manager.agent_destinations()
             route_idx = agent_manager.get_route_label()
+            trajectory = self.trajectory
+            if trajectory is not None:
+                trajectory.begin_episode(route_idx)
+            if self.experience is not None:
+                self.experience.begin_episode(route_idx)
+                agent_manager.attach_experience(self.experience)
 
             # init agent records
-            for vid in ["safe_1", "risky_1"]:
-                data[vid] = {
-                    'reached': False,
-                    'end_step': None,
-                    'total_distance': 0.0,
-                    'edges_visited': set(),
-                    'tls_encountered': set(),
-                    'tls_stop_count': 0,
-                    'amber_encountered': 0,
-                    'red_encountered': 0,
-                    'green_encountered': 0,
-                    'amber_run_count': 0,
-                    'red_run_count': 0,
-                    'green_run_count': 0,
-                    'tls_last_state': {},
-                    'max_speed': 0.0,
-                    'sudden_brake_count': 0,
-                    'max_decel': 0.0,
-                    'sum_decel': 0.0,
-                    'lane_change_count': 0,
-                    'prev_speed': None,
-                    'prev_lane': None,
-                    'collision_count': 0,
-                    'wait_time': 0.0,
-                    'speed_bin_counts': {0: 0, 1: 0, 2: 0, 3: 0}, # for stacked plot
-                }
+            for vid in dests:
+                data[vid] = self._new_record()
+
+            if self.use_subscriptions:
+                traci.simulation.subscribe(SIM_VARS)
+                subscribed_tls = set()
+                active = set()
+
+            requests = calls = 0
+            if prof is not None:
+                prof.lap("inject")
 
             # simulation loop
             for step in range(self.max_steps):
                 traci.simulationStep()
-                agent_manager.update_agents(step)
+                if prof is not None:
+                    prof.step()
+                world = WorldSnapshot()
+                if self.use_subscriptions:
+                    self._read_subscriptions(world, data, active, subscribed_tls)
+                    if prof is not None:
+                        prof.lap("subscriptions")
 
-                colliding = traci.simulation.getCollidingVehiclesIDList()
+                agent_manager.update_agents(step, world)
+                if prof is not None:
+                    prof.lap("agents")
+
+                colliding = world.colliding()
                 for vid, rec in data.items():
-                    if vid not in traci.vehicle.getIDList():
+                    if not world.is_active(vid):
                         continue
+                    self._record_step(
+                        rec, vid, step, world, colliding, dests[vid], agent_manager
+                    )
+                    if trajectory is not None:
+                        trajectory.record(step, vid, world, *agent_manager.last_decision(vid))
+
+                requests += world.requests
+                calls += world.calls
+                if prof is not None:
+                    prof.lap("metrics")
 
-                    # tally current speed bin
-                    speed = traci.vehicle.getSpeed(vid) # pick driver by veh id to get  bin logic
-                    driver = (agent_manager.safe_driver
-                              if vid == agent_manager.safe_driver.vehicle_id
-                              else agent_manager.risky_driver)
-                    b = driver._speed_bin(speed)
-                    
-                    logger.debug(
-                        "Vehicle %s: Current speed=%.2f m/s, Speed Bin=%d", vid, speed, b)
-                    
-                    rec['speed_bin_counts'][b] += 1 
-
-                    # collisions
-                    if vid in colliding:
-                        rec['collision_count'] += 1
-
-                    # distance & edges
-                    rec['edges_visited'].add(traci.vehicle.getRoadID(vid))
-                    rec['total_distance'] = traci.vehicle.getDistance(vid)
-
-                    # --- TLS STUFF
-                    next_tls = traci.vehicle.getNextTLS(vid)
-                    seen_ids = set()
-                    for tls_id, link_index, dist_raw, *extra in next_tls:
-                        dist = float(dist_raw)
-                        seen_ids.add(tls_id)
-
-                        # fetch TLS colour string
-                        raw_state = traci.trafficlight.getRedYellowGreenState(tls_id).lower()
-                        rec['tls_last_state'][tls_id] = raw_state
-
-                        # count first encounter within 10m
-                        if dist <= 10.0 and tls_id not in rec['tls_encountered']:
-                            rec['tls_encountered'].add(tls_id)
-                            if 'y' in raw_state:
-                                rec['amber_encountered'] += 1
-                            elif 'r' in raw_state:
-                                rec['red_encountered'] += 1
-                            elif 'g' in raw_state:
-                                rec['green_encountered'] += 1
-
-                    passed = set(rec['tls_last_state']) - seen_ids
-                    for tls_id in passed:
-                        last = rec['tls_last_state'].pop(tls_id)
-                        # one run per tls passed based on colour
-                        if 'y' in last:
-                            rec['amber_run_count'] += 1
-                        elif 'r' in last:
-                            rec['red_run_count'] += 1
-                        elif 'g' in last:
-                            rec['green_run_count'] += 1
-
-                    # --- SPEED STUFF
-                    # max speed
-                    speed = traci.vehicle.getSpeed(vid)
-                    rec['max_speed'] = max(rec['max_speed'], speed)
-
-                    # braking 
-                    if rec['prev_speed'] is not None:
-                        decel = rec['prev_speed'] - speed
-                        if decel > 0:
-                            rec['sum_decel'] += decel
-                            if decel >= SUDDEN_BRAKE_THRESHOLD:
-                                rec['sudden_brake_count'] += 1
-                                rec['max_decel'] = max(rec['max_decel'], decel)
-                    rec['prev_speed'] = speed
-
-                    # lane changes
-                    lane = traci.vehicle.getLaneID(vid)
-                    if rec['prev_lane'] is not None and lane != rec['prev_lane']:
-                        rec['lane_change_count'] += 1
-                    rec['prev_lane'] = lane
-
-                    # reached destination y/n
-                    if (not rec['reached']
-                            and traci.vehicle.getRoadID(vid) == dest):
-                        rec['reached'] = True
-                        rec['end_step'] = step
+            # per-episode traci accounting
+            self.call_stats = {
+                "requests": requests, "calls": calls, "saved": requests - calls
+            }
+            logger.info(
+                "TraCI reads: %d requested, %d issued, %d saved by snapshot",
+                requests, calls, requests - calls
+            )
 
             # after stepping get acc waiting time for each vehicle
             for vid, rec in data.items():
                 try:
-                    rec['wait_time'] = traci.vehicle.getAccumulatedWaitingTime(vid)
+                    rec.wait_time = traci.vehicle.getAccumulatedWaitingTime(vid)
                 except traci.TraCIException:
-                    rec['wait_time'] = 0.0
+                    rec.wait_time = 0.0
+            if prof is not None:
+                prof.lap("wait_times")
 
         finally:
+            if self.trajectory is not None:
+                self.trajectory.end_episode()
+            if self.experience is not None:
+                self.experience.end_episode()
+            if self.telemetry is not None:
+                self.telemetry.end_episode()
+            if not self.persistent:
+                self.close()
+            if prof is not None:
+                prof.end_episode()
+
+        return data, route_idx
+
+    # --- SUMO SESSION
+
+    def _start(self) -> None:
+        """
+        Spawn SUMO, or in persistent mode reload the running one:
+        same config and seed, so the episode starts exactly as a fresh spawn
+        """
+        if self.persistent and self._session_open:
             try:
-                traci.close()
-            except traci.TraCIException:
-                pass
+                traci.load(self.cmd[1:])
+                return
+            except (traci.TraCIException, traci.FatalTraCIError) as e:
+                logger.warning("SUMO session lost (%s), respawning", e)
+                self.close()
+
+        if self.label is None:
+            traci.start(self.cmd)
+        else:
+            # own connection label, traci picks a free port for it
+            traci.start(self.cmd, label=self.label)
+        self._session_open = True
+
+    def close(self) -> None:
+        """End the SUMO session"""
+        self._session_open = False
+        try:
+            traci.close()
+        except (traci.TraCIException, traci.FatalTraCIError):
+            pass
+
+    @staticmethod
+    def _new_record() -> VehicleRecord:
+        return VehicleRecord()
+
+    # --- COLLECTION
+
+    def _read_subscriptions(self, world: WorldSnapshot, data: dict,
+                            active: set, subscribed_tls: set) -> None:
+        """
+        Seed the step snapshot from subscription results, values arrive
+        batched in the simulationStep response. Agents are subscribed on
+        the step they depart, TLS on the step they are first seen
+        """
+        sim = traci.simulation.getSubscriptionResults()
+        for vid in sim.get(tc.VAR_DEPARTED_VEHICLES_IDS, ()):
+            if vid in data:
+                traci.vehicle.subscribe(vid, VEHICLE_VARS)
+                active.add(vid)
+        active.difference_update(sim.get(tc.VAR_ARRIVED_VEHICLES_IDS, ()))
+        world.seed(None, {
+            tc.VAR_COLLIDING_VEHICLES_IDS:
+                set(sim.get(tc.VAR_COLLIDING_VEHICLES_IDS, ())),
+            tc.VAR_TIME: sim[tc.VAR_TIME],
+        })
+
+        running = set()
+        for vid in active:
+            res = traci.vehicle.getSubscriptionResults(vid)
+            if not isinstance(res.get(tc.VAR_NEXT_TLS), (list, tuple)):
+                # libsumo hands compound values back unparsed, poll those
+                res = {var: v for var, v in res.items() if var != tc.VAR_NEXT_TLS}
+            # polling leaves teleporting vehicles out (getIDList), so does this
+            if not world.seed_vehicle(vid, res):
+                continue
+            running.add(vid)
+            for tls_id, *_ in world.next_tls(vid):
+                if tls_id not in subscribed_tls:
+                    traci.trafficlight.subscribe(tls_id, TLS_VARS)
+                    subscribed_tls.add(tls_id)
+                world.seed(tls_id, traci.trafficlight.getSubscriptionResults(tls_id))
+        world.seed_active(running)
+
+    # --- BOOKKEEPING
+
+    def _record_step(self, rec, vid, step, world, colliding,
+                     dest, agent_manager) -> None:
+        # tally current speed bin
+        speed = world.speed(vid) # bin logic of the vehicle's policy
+        b = agent_manager.speed_bin(vid, speed)
+
+        if telemetry.TRACE:
+            logger.debug(
+                "Vehicle %s: Current speed=%.2f m/s, Speed Bin=%d", vid, speed, b)
+
+        rec.speed_bin_counts[b] += 1
+
+        # collisions
+        if vid in colliding:
+            rec.collision_count += 1
+
+        # distance & edges
+        road = world.road_id(vid)
+        rec.edges_visited.add(self.intern(road))
+        rec.total_distance = world.distance(vid)
+
+        # --- TLS STUFF
+        next_tls = world.next_tls(vid)
+        last_state = rec.tls_last_state
+        seen_ids = set()
+        for tls_id, link_index, dist_raw, *extra in next_tls:
+            dist = float(dist_raw)
+            tls = self.intern(tls_id)
+            seen_ids.add(tls)
+
+            # TLS colour, amber before red before green
+            colour = colour_code(world.tls_state(tls_id).lower())
+            last_state[tls] = colour
+
+            # count first encounter within 10m
+            if dist <= 10.0 and tls not in rec.tls_encountered:
+                rec.tls_encountered.add(tls)
+                if colour == AMBER:
+                    rec.amber_encountered += 1
+                elif colour == RED:
+                    rec.red_encountered += 1
+                elif colour == GREEN:
+                    rec.green_encountered += 1
+
+        sampler = self.telemetry
+        if sampler is not None:
+            # nearest TLS ahead, the first of next_tls
+            if next_tls:
+                tls_dist = float(next_tls[0][2])
+                tls_colour = last_state[self.intern(next_tls[0][0])]
+            else:
+                tls_dist, tls_colour = float("nan"), 0
+            if sampler.wants(step, tls_dist):
+                sampler.record(step, vid, speed, world.allowed_speed(vid), b,
+                               tls_colour, tls_dist)
+
+        passed = last_state.keys() - seen_ids
+        for tls in passed:
+            last = last_state.pop(tls)
+            # one run per tls passed based on colour
+            if last == AMBER:
+                rec.amber_run_count += 1
+            elif last == RED:
+                rec.red_run_count += 1
+            elif last == GREEN:
+                rec.green_run_count += 1
+
+        # --- SPEED STUFF
+        # max speed
+        rec.max_speed = max(rec.max_speed, speed)
+
+        # braking
+        if rec.prev_speed is not None:
+            decel = rec.prev_speed - speed
+            if decel > 0:
+                rec.sum_decel += decel
+                if decel >= SUDDEN_BRAKE_THRESHOLD:
+                    rec.sudden_brake_count += 1
+                    rec.max_decel = max(rec.max_decel, decel)
+        rec.prev_speed = speed
+
+        # lane changes
+        lane = self.intern(world.lane_id(vid))
+        if rec.prev_lane is not None and lane != rec.prev_lane:
+            rec.lane_change_count += 1
+        rec.prev_lane = lane
 
-        return data, route_idx
\ No newline at end of file
+        # reached destination y/n
+        if not rec.reached and road == dest:
+            rec.reached = True
+            rec.end_step = step
@@ -0,0 +1,687 @@
+"""
+Pure-python traffic surrogate, selectable as the "surrogate" backend
+    - implements the subset of the traci API the runner, AgentManager,
+      both drivers and the warm-start pool call (same names, arguments,
+      return shapes and TraCIException on unknown ids),
+    - the network is a synthetic grid: single-lane edges both ways between
+      neighbouring junctions, random lengths and speed limits, fixed-cycle
+      TLS at most junctions (one signal group each, every approach sees
+      the same colour),
+    - vehicles move with a Krauss-style car-following model in numpy,
+      stop for red and for amber when they can, background traffic keeps
+      a constant number of vehicles on random routes,
+    - speed mode 0 (the agents) follows setSpeed/slowDown directly,
+      without accel, safe-gap or TLS checks, so agents can run lights and
+      collide, as in SUMO.
+
+Not SUMO: no lane changes, junction internals, right of way, teleports
+or routing costs beyond free-flow travel time. The sumo binary and
+config in start() are ignored, apart from --seed and --step-length.
+
+    python -m src.main --backend surrogate -n 100
+"""
+
+import gzip
+import heapq
+import pickle
+from types import SimpleNamespace
+
+import numpy as np
+from traci import constants as tc
+from traci.exceptions import FatalTraCIError, TraCIException
+
+# grid and traffic, change with configure() before start()
+OPTIONS = {
+    "rows": 6,
+    "cols": 6,
+    "tls_share": 0.8,        # signalized junctions
+    "net_seed": 0,           # the network does not change with --seed
+    "background": 60,        # background vehicles kept on the grid
+    "edge_length": (80.0, 250.0),
+    "speed_limits": (8.33, 13.89, 19.44),
+    "phases": (("G", 27.0), ("y", 3.0), ("r", 30.0)),
+}
+DEFAULT_SEED = 23423
+
+# vehicle type, SUMO passenger defaults
+LENGTH = 5.0
+MIN_GAP = 2.5
+ACCEL = 2.6
+DECEL = 4.5
+EMERGENCY_DECEL = 9.0
+TAU = 1.0
+MAX_SPEED = 55.56
+STOP_OFFSET = 1.0
+WAITING_SPEED = 0.1
+DEFAULT_SPEED_MODE = 31
+
+# per-slot vehicle arrays: fill value, dtype
+_FIELDS = {
+    "active": (False, bool),
+    "edge": (0, np.intp),
+    "next_edge": (-1, np.intp),     # -1: last edge of the route
+    "route_pos": (0, np.intp),
+    "mode": (DEFAULT_SPEED_MODE, np.intp),
+    "pos": (0.0, np.float64),
+    "speed": (0.0, np.float64),
+    "vmax": (MAX_SPEED, np.float64),
+    "factor": (1.0, np.float64),
+    "cmd": (np.nan, np.float64),    # setSpeed/slowDown target, nan: none
+    "ramp": (np.nan, np.float64),   # slowDown m/s per s, nan: none
+    "wait": (0.0, np.float64),
+    "distance": (0.0, np.float64),
+    "depart_speed": (0.0, np.float64),
+}
+
+# phase codes
+GREEN, AMBER, RED = 0, 1, 2
+_PHASE_CODES = {"G": GREEN, "g": GREEN, "y": AMBER, "r": RED}
+
+
+def configure(**options) -> None:
+    """Change OPTIONS for simulations started from now on"""
+    unknown = options.keys() - OPTIONS.keys()
+    if unknown:
+        raise ValueError(f"Unknown surrogate options {sorted(unknown)}")
+    OPTIONS.update(options)
+
+
+class GridNet:
+    """rows x cols junctions J{r}_{c}, edges J{a}-J{b} between neighbours"""
+
+    def __init__(self, rows: int, cols: int, seed: int, tls_share: float,
+                 edge_length: tuple, speed_limits: tuple, phases: tuple):
+        rng = np.random.default_rng(seed)
+        self.junctions = [f"J{r}_{c}" for r in range(rows) for c in range(cols)]
+        edges = []
+        for r in range(rows):
+            for c in range(cols):
+                for dr, dc in ((0, 1), (1, 0), (0, -1), (-1, 0)):
+                    if 0 <= r + dr < rows and 0 <= c + dc < cols:
+                        edges.append((r * cols + c, (r + dr) * cols + c + dc))
+        self.edge_ids = [f"{self.junctions[a]}-{self.junctions[b]}" for a, b in edges]
+        self.edge_index = {e: i for i, e in enumerate(self.edge_ids)}
+        self.edge_from = [a for a, _ in edges]
+        self.edge_to = [b for _, b in edges]
+        self.length = rng.uniform(*edge_length, len(edges)).round(2)
+        self.speed = rng.choice(speed_limits, len(edges))
+        self.out_edges = [[] for _ in self.junctions]
+        for i, (a, _) in enumerate(edges):
+            self.out_edges[a].append(i)
+
+        # fixed-cycle TLS at signalized junctions, random offsets
+        signalized = np.flatnonzero(rng.random(len(self.junctions)) < tls_share)
+        self.tls_ids = [self.junctions[j] for j in signalized]
+        self.tls_index = {t: i for i, t in enumerate(self.tls_ids)}
+        tls_of = np.full(len(self.junctions), -1)
+        tls_of[signalized] = np.arange(len(signalized))
+        self.edge_tls = tls_of[self.edge_to]
+        self.incoming = np.bincount(self.edge_to, minlength=len(self.junctions))[signalized]
+        self.phase_chars = [p for p, _ in phases]
+        self.phase_codes = np.array([_PHASE_CODES[p] for p in self.phase_chars])
+        self.phase_ends = np.cumsum([d for _, d in phases])
+        self.cycle = float(self.phase_ends[-1])
+        self.tls_offset = rng.uniform(0, self.cycle, len(signalized))
+        # shortest-path trees by start junction, built on first use
+        self._trees: dict = {}
+
+    def __repr__(self) -> str:
+        return (
+            f"GridNet(junctions={len(self.junctions)}, edges={len(self.edge_ids)}, "
+            f"tls={len(self.tls_ids)})"
+        )
+
+    def tls_phase(self, time: float) -> tuple[np.ndarray, np.ndarray]:
+        """Phase index of every TLS at time and when each phase ends (absolute)"""
+        t = (time + self.tls_offset) % self.cycle
+        phase = np.searchsorted(self.phase_ends, t, side="right")
+        return phase, time + self.phase_ends[phase] - t
+
+    def route(self, src: int, dst: int) -> list[int]:
+        """Fastest free-flow edge sequence from edge src to edge dst, [] if none"""
+        src, dst = int(src), int(dst)
+        if src == dst:
+            return [src]
+        start, target = self.edge_to[src], self.edge_from[dst]
+        prev = self._tree(start)
+        if target != start and target not in prev:
+            return []
+        path, j = [], target
+        while j != start:
+            path.append(int(prev[j]))
+            j = self.edge_from[prev[j]]
+        return [src, *reversed(path), dst]
+
+    def _tree(self, start: int) -> dict:
+        """Shortest-path tree from junction start: junction -> edge reaching it"""
+        if start in self._trees:
+            return self._trees[start]
+        best = {start: 0.0}
+        prev = {}
+        heap = [(0.0, start)]
+        while heap:
+            cost, j = heapq.heappop(heap)
+            if cost > best[j]:
+                continue
+            for e in self.out_edges[j]:
+                k = self.edge_to[e]
+                c = cost + self.length[e] / self.speed[e]
+                if c < best.get(k, np.inf):
+                    best[k], prev[k] = c, e
+                    heapq.heappush(heap, (c, k))
+        self._trees[start] = prev
+        return prev
+
+
+class Simulation:
+    """Vehicle state as numpy arrays over slots, one slot per known vehicle"""
+
+    def __init__(self, seed: int = DEFAULT_SEED, step_length: float = 1.0):
+        opts = OPTIONS
+        self.net = GridNet(opts["rows"], opts["cols"], opts["net_seed"], opts["tls_share"],
+                           opts["edge_length"], opts["speed_limits"], opts["phases"])
+        self.rng = np.random.default_rng(seed)
+        self.dt = step_length
+        self.time = 0.0
+        self.routes: dict[str, list[int]] = {}
+        self.slot: dict[str, int] = {}
+        self.ids: list[str | None] = []
+        self.route_of: list[list[int]] = []
+        self.pending: list[str] = []
+        self._free: list[int] = []
+        self._alloc(256)
+        self.colliding: tuple = ()
+        self.departed: tuple = ()
+        self.arrived: tuple = ()
+        self.subscriptions: dict = {"simulation": [], "vehicle": {}, "trafficlight": {}}
+        self._running: tuple | None = ()
+        self._background = 0
+        self._update_tls()
+        for _ in range(opts["background"]):
+            self._add_background()
+
+    def _alloc(self, capacity: int) -> None:
+        """Grow every per-slot array to capacity"""
+        n = len(self.ids)
+        for name, (fill, dtype) in _FIELDS.items():
+            out = np.full(capacity, fill, dtype=dtype)
+            if n:
+                out[:n] = getattr(self, name)
+            setattr(self, name, out)
+        self.ids.extend([None] * (capacity - n))
+        self.route_of.extend([[] for _ in range(capacity - n)])
+        self._free.extend(range(capacity - 1, n - 1, -1))
+
+    # --- VEHICLES
+
+    def add_vehicle(self, vid: str, route_id: str, depart_speed: str = "0") -> None:
+        if vid in self.slot:
+            raise TraCIException(f"Could not add vehicle '{vid}', it already exists.")
+        if route_id not in self.routes:
+            raise TraCIException(f"Invalid route '{route_id}' for vehicle '{vid}'.")
+        if not self._free:
+            self._alloc(2 * len(self.ids))
+        k = self._free.pop()
+        self.slot[vid] = k
+        self.ids[k] = vid
+        self.route_of[k] = self.routes[route_id]
+        self.route_pos[k] = 0
+        self._enter(k)
+        self.pos[k] = self.speed[k] = self.wait[k] = self.distance[k] = 0.0
+        self.vmax[k] = MAX_SPEED
+        self.factor[k] = 1.0
+        self.cmd[k] = self.ramp[k] = np.nan
+        self.mode[k] = DEFAULT_SPEED_MODE
+        self.depart_speed[k] = np.inf if depart_speed == "max" else float(depart_speed)
+        self.pending.append(vid)
+
+    def _enter(self, k: int) -> None:
+        """Put slot k on the route edge at route_pos"""
+        route, i = self.route_of[k], self.route_pos[k]
+        self.edge[k] = route[i]
+        self.next_edge[k] = route[i + 1] if i + 1 < len(route) else -1
+
+    def _add_background(self) -> None:
+        n_edges = len(self.net.edge_ids)
+        while True:
+            a, b = self.rng.choice(n_edges, 2, replace=False)
+            edges = self.net.route(a, b)
+            if len(edges) > 1:
+                break
+        vid = f"bg_{self._background}"
+        self._background += 1
+        self.routes[f"route_{vid}"] = edges
+        self.add_vehicle(vid, f"route_{vid}", "max")
+        self.factor[self.slot[vid]] = float(np.clip(self.rng.normal(1.0, 0.1), 0.8, 1.2))
+
+    def running_ids(self) -> tuple:
+        if self._running is None:
+            self._running = tuple(self.ids[k] for k in np.flatnonzero(self.active))
+        return self._running
+
+    def known(self, vid: str) -> int:
+        try:
+            return self.slot[vid]
+        except KeyError:
+            raise TraCIException(f"Vehicle '{vid}' is not known.") from None
+
+    def running(self, vid: str) -> int:
+        k = self.known(vid)
+        if not self.active[k]:
+            raise TraCIException(f"Vehicle '{vid}' is not on the network.")
+        return k
+
+    def next_tls(self, k: int) -> tuple:
+        net, route = self.net, self.route_of[k]
+        dist = net.length[self.edge[k]] - self.pos[k]
+        out = []
+        # none at the end of the route, the vehicle arrives before it
+        for i in range(int(self.route_pos[k]), len(route) - 1):
+            e = route[i]
+            if i > self.route_pos[k]:
+                dist += net.length[e]
+            t = net.edge_tls[e]
+            if t >= 0:
+                out.append((net.tls_ids[t], 0, float(dist), self.tls_chars[t]))
+        return tuple(out)
+
+    # --- TRAFFIC LIGHTS
+
+    def _update_tls(self) -> None:
+        net = self.net
+        self.tls_phase, self.tls_switch = net.tls_phase(self.time)
+        self.tls_code = net.phase_codes[self.tls_phase]
+        self.tls_chars = [net.phase_chars[p] for p in self.tls_phase]
+
+    def tls(self, tls_id: str) -> int:
+        try:
+            return self.net.tls_index[tls_id]
+        except KeyError:
+            raise TraCIException(f"Traffic light '{tls_id}' is not known.") from None
+
+    # --- STEP
+
+    def step(self) -> None:
+        self.time += self.dt
+        self._update_tls()
+        departed = self._insert()
+        a = np.flatnonzero(self.active)
+        collided, arrived = (), []
+        if len(a):
+            self._move(a)
+            arrived = self._advance(a)
+            collided = self._collisions()
+        self.departed = tuple(departed)
+        self.arrived = tuple(arrived)
+        self.colliding = collided
+        self._running = None
+        for vid in arrived:
+            if vid.startswith("bg_"):
+                self._add_background()
+
+    def _insert(self) -> list[str]:
+        """Pending vehicles enter the start of their first edge when there is room"""
+        departed, waiting = [], []
+        for vid in self.pending:
+            k = self.slot[vid]
+            e = self.edge[k]
+            occupied = self.active & (self.edge == e) & (self.pos < LENGTH + MIN_GAP)
+            if occupied.any():
+                waiting.append(vid)
+                continue
+            self.active[k] = True
+            limit = self.net.speed[e] * self.factor[k]
+            self.speed[k] = min(self.depart_speed[k], limit, self.vmax[k])
+            departed.append(vid)
+        self.pending = waiting
+        return departed
+
+    def _move(self, a: np.ndarray) -> None:
+        net, dt = self.net, self.dt
+        e, p, v = self.edge[a], self.pos[a], self.speed[a]
+        respect = self.mode[a] != 0
+        limit = net.speed[e] * self.factor[a]
+
+        # commanded (setSpeed/slowDown) or free speed
+        cmd = self.cmd[a]
+        des = np.where(np.isnan(cmd), limit, np.where(respect, np.minimum(cmd, limit), cmd))
+        ramp = self.ramp[a]
+        ramping = ~np.isnan(ramp)
+        des = np.where(ramping, np.maximum(des, v - np.where(ramping, ramp, 0.0) * dt), des)
+        des = np.minimum(des, self.vmax[a])
+        des = np.where(respect, np.minimum(des, v + ACCEL * dt), des)
+
+        # stop at red, and at amber when braking comfortably is possible
+        # (not on the last route edge, vehicles arrive before its junction)
+        nxt = self.next_edge[a]
+        tls = np.where(nxt >= 0, net.edge_tls[e], -1)
+        state = np.where(tls >= 0, self.tls_code[tls], GREEN)
+        d_stop = np.maximum(net.length[e] - p - STOP_OFFSET, 0.0)
+        stop = respect & ((state == RED) | ((state == AMBER) & (v * v / (2 * DECEL) < d_stop)))
+        v_stop = np.minimum(np.sqrt(2 * DECEL * d_stop), d_stop / dt)
+        des = np.where(stop, np.minimum(des, v_stop), des)
+
+        # Krauss safe speed behind the leader: next on the same edge, else
+        # the rearmost vehicle on the next route edge
+        order = np.lexsort((p, e))
+        se = e[order]
+        same = se[1:] == se[:-1]
+        lead = np.full(len(a), -1)
+        lead[order[:-1][same]] = order[1:][same]
+        rear = np.full(len(net.edge_ids), -1)
+        first = np.flatnonzero(np.concatenate(([True], ~same)))
+        rear[se[first]] = order[first]
+        ahead = (lead < 0) & (nxt >= 0)
+        lead = np.where(ahead, rear[nxt], lead)
+        has = lead >= 0
+        vl = v[lead]
+        gap = p[lead] - LENGTH - MIN_GAP - p + np.where(ahead, net.length[e], 0.0)
+        v_safe = vl + (gap - vl * TAU) / ((v + vl) / (2 * DECEL) + TAU)
+        des = np.where(has & respect, np.minimum(des, np.maximum(v_safe, 0.0)), des)
+
+        new_v = np.where(respect, np.maximum(des, v - EMERGENCY_DECEL * dt), des)
+        new_v = np.maximum(new_v, 0.0)
+        done = ramping & (new_v <= cmd + 1e-9)
+        self.ramp[a[done]] = np.nan
+
+        self.speed[a] = new_v
+        self.pos[a] = p + new_v * dt
+        self.distance[a] += new_v * dt
+        self.wait[a] += np.where(new_v < WAITING_SPEED, dt, 0.0)
+
+    def _advance(self, a: np.ndarray) -> list[str]:
+        """Move vehicles past the end of their edge onto the next route edge"""
+        net = self.net
+        arrived = []
+        for k in a[self.pos[a] >= net.length[self.edge[a]]].tolist():
+            route = self.route_of[k]
+            while self.pos[k] >= net.length[self.edge[k]]:
+                self.pos[k] -= net.length[self.edge[k]]
+                self.route_pos[k] += 1
+                if self.route_pos[k] >= len(route):
+                    arrived.append(self._remove(k))
+                    break
+                self._enter(k)
+        return arrived
+
+    def _remove(self, k: int) -> str:
+        vid = self.ids[k]
+        self.active[k] = False
+        self.ids[k] = None
+        self._free.append(k)
+        del self.slot[vid]
+        self.subscriptions["vehicle"].pop(vid, None)
+        return vid
+
+    def _collisions(self) -> tuple:
+        """Followers that ran into their leader are set back behind it"""
+        a = np.flatnonzero(self.active)
+        e, p = self.edge[a], self.pos[a]
+        order = np.lexsort((p, e))
+        f, l = a[order[:-1]], a[order[1:]]
+        hit = (self.edge[f] == self.edge[l]) & (self.pos[l] - self.pos[f] < LENGTH)
+        if not hit.any():
+            return ()
+        f, l = f[hit], l[hit]
+        self.pos[f] = np.maximum(self.pos[l] - LENGTH - MIN_GAP, 0.0)
+        self.speed[f] = self.speed[l]
+        return tuple(sorted({self.ids[k] for k in np.concatenate([f, l]).tolist()}))
+
+
+_sim: Simulation | None = None
+
+
+def _require() -> Simulation:
+    if _sim is None:
+        raise FatalTraCIError("Not connected.")
+    return _sim
+
+
+def _option(args: list, name: str, default: str) -> str:
+    return args[args.index(name) + 1] if name in args else default
+
+
+# --- CONNECTION
+
+def start(cmd: list, port=None, numRetries=60, label: str = "default", **kwargs) -> tuple:
+    """New simulation, only --seed and --step-length of cmd are read"""
+    global _sim
+    _sim = Simulation(int(_option(cmd, "--seed", DEFAULT_SEED)),
+                      float(_option(cmd, "--step-length", "1.0")))
+    return 21, "surrogate"
+
+
+def load(args: list) -> None:
+    start(args)
+
+
+def close(wait: bool = True) -> None:
+    global _sim
+    _sim = None
+
+
+def simulationStep(step: float = 0.0) -> None:
+    _require().step()
+
+
+# --- DOMAINS
+
+_VEHICLE_VARS = {
+    tc.VAR_SPEED: "getSpeed", tc.VAR_ROAD_ID: "getRoadID", tc.VAR_LANE_ID: "getLaneID",
+    tc.VAR_DISTANCE: "getDistance", tc.VAR_NEXT_TLS: "getNextTLS",
+    tc.VAR_ALLOWED_SPEED: "getAllowedSpeed",
+}
+_TLS_VARS = {
+    tc.TL_RED_YELLOW_GREEN_STATE: "getRedYellowGreenState",
+    tc.TL_NEXT_SWITCH: "getNextSwitch", tc.TL_PHASE_DURATION: "getPhaseDuration",
+}
+_SIM_VARS = {
+    tc.VAR_DEPARTED_VEHICLES_IDS: "departed", tc.VAR_ARRIVED_VEHICLES_IDS: "arrived",
+    tc.VAR_COLLIDING_VEHICLES_IDS: "colliding", tc.VAR_TIME: "time",
+}
+
+
+def _check_vars(varIDs, known: dict) -> list:
+    unknown = [v for v in varIDs if v not in known]
+    if unknown:
+        raise TraCIException(f"Surrogate cannot subscribe to variables {unknown}")
+    return list(varIDs)
+
+
+class _Simulation:
+
+    def getTime(self) -> float:
+        return _require().time
+
+    def getCollidingVehiclesIDList(self) -> tuple:
+        return _require().colliding
+
+    def findRoute(self, fromEdge: str, toEdge: str, *args, **kwargs) -> SimpleNamespace:
+        net = _require().net
+        try:
+            edges = net.route(net.edge_index[fromEdge], net.edge_index[toEdge])
+        except KeyError as e:
+            raise TraCIException(f"Unknown edge {e.args[0]!r}.") from None
+        ids = tuple(net.edge_ids[i] for i in edges)
+        return SimpleNamespace(
+            edges=ids,
+            length=float(net.length[edges].sum()) if edges else 0.0,
+            travelTime=float((net.length[edges] / net.speed[edges]).sum()) if edges else 0.0,
+        )
+
+    def saveState(self, fileName: str) -> None:
+        with gzip.open(fileName, "wb") as f:
+            pickle.dump(_require(), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loadState(self, fileName: str) -> None:
+        global _sim
+        _require()
+        with gzip.open(fileName, "rb") as f:
+            _sim = pickle.load(f)
+
+    def subscribe(self, varIDs=(tc.VAR_DEPARTED_VEHICLES_IDS,), *args, **kwargs) -> None:
+        _require().subscriptions["simulation"] = _check_vars(varIDs, _SIM_VARS)
+
+    def getSubscriptionResults(self, objectID=None) -> dict:
+        sim = _require()
+        return {var: getattr(sim, _SIM_VARS[var]) for var in sim.subscriptions["simulation"]}
+
+
+class _Vehicle:
+
+    def getIDList(self) -> tuple:
+        return _require().running_ids()
+
+    def getSpeed(self, vehID: str) -> float:
+        sim = _require()
+        return float(sim.speed[sim.running(vehID)])
+
+    def getAllowedSpeed(self, vehID: str) -> float:
+        sim = _require()
+        k = sim.running(vehID)
+        return float(sim.net.speed[sim.edge[k]] * sim.factor[k])
+
+    def getRoadID(self, vehID: str) -> str:
+        sim = _require()
+        return sim.net.edge_ids[sim.edge[sim.running(vehID)]]
+
+    def getLaneID(self, vehID: str) -> str:
+        return f"{self.getRoadID(vehID)}_0"
+
+    def getDistance(self, vehID: str) -> float:
+        sim = _require()
+        return float(sim.distance[sim.running(vehID)])
+
+    def getNextTLS(self, vehID: str) -> tuple:
+        sim = _require()
+        return sim.next_tls(sim.running(vehID))
+
+    def getAccumulatedWaitingTime(self, vehID: str) -> float:
+        sim = _require()
+        return float(sim.wait[sim.known(vehID)])
+
+    def getSpeedMode(self, vehID: str) -> int:
+        sim = _require()
+        return int(sim.mode[sim.known(vehID)])
+
+    def setSpeedMode(self, vehID: str, speedMode: int) -> None:
+        sim = _require()
+        sim.mode[sim.known(vehID)] = speedMode
+
+    def setMaxSpeed(self, vehID: str, speed: float) -> None:
+        sim = _require()
+        sim.vmax[sim.known(vehID)] = speed
+
+    def setSpeed(self, vehID: str, speed: float) -> None:
+        """Hold speed from the next step on, a negative speed hands control back"""
+        sim = _require()
+        k = sim.known(vehID)
+        sim.cmd[k] = np.nan if speed < 0 else speed
+        sim.ramp[k] = np.nan
+
+    def slowDown(self, vehID: str, speed: float, duration: float) -> None:
+        """Change to speed linearly over duration seconds, then hold it"""
+        sim = _require()
+        k = sim.known(vehID)
+        sim.cmd[k] = speed
+        sim.ramp[k] = max(0.0, sim.speed[k] - speed) / max(duration, sim.dt)
+
+    def setColor(self, vehID: str, color: tuple) -> None:
+        _require().known(vehID)
+
+    def add(self, vehID: str, routeID: str, typeID: str = "DEFAULT_VEHTYPE",
+            depart: str = "now", departLane: str = "first", departPos: str = "base",
+            departSpeed: str = "0", **kwargs) -> None:
+        _require().add_vehicle(vehID, routeID, departSpeed)
+
+    def subscribe(self, objectID: str, varIDs=(tc.VAR_ROAD_ID, tc.VAR_LANEPOSITION),
+                  *args, **kwargs) -> None:
+        sim = _require()
+        sim.known(objectID)
+        sim.subscriptions["vehicle"][objectID] = _check_vars(varIDs, _VEHICLE_VARS)
+
+    def getSubscriptionResults(self, objectID: str) -> dict:
+        sim = _require()
+        varIDs = sim.subscriptions["vehicle"].get(objectID)
+        if not varIDs or not sim.active[sim.slot[objectID]]:
+            return {}
+        return {var: getattr(self, _VEHICLE_VARS[var])(objectID) for var in varIDs}
+
+
+class _TrafficLight:
+
+    def getIDList(self) -> tuple:
+        return tuple(_require().net.tls_ids)
+
+    def getRedYellowGreenState(self, tlsID: str) -> str:
+        sim = _require()
+        t = sim.tls(tlsID)
+        return sim.tls_chars[t] * int(sim.net.incoming[t])
+
+    def getNextSwitch(self, tlsID: str) -> float:
+        sim = _require()
+        return float(sim.tls_switch[sim.tls(tlsID)])
+
+    def getPhaseDuration(self, tlsID: str) -> float:
+        sim = _require()
+        phase = sim.tls_phase[sim.tls(tlsID)]
+        ends = sim.net.phase_ends
+        return float(ends[phase] - (ends[phase - 1] if phase else 0.0))
+
+    def subscribe(self, objectID: str, varIDs=(tc.TL_CURRENT_PHASE,), *args, **kwargs) -> None:
+        sim = _require()
+        sim.tls(objectID)
+        sim.subscriptions["trafficlight"][objectID] = _check_vars(varIDs, _TLS_VARS)
+
+    def getSubscriptionResults(self, objectID: str) -> dict:
+        varIDs = _require().subscriptions["trafficlight"].get(objectID, ())
+        return {var: getattr(self, _TLS_VARS[var])(objectID) for var in varIDs}
+
+
+class _Route:
+
+    def add(self, routeID: str, edges) -> None:
+        sim = _require()
+        if routeID in sim.routes:
+            raise TraCIException(f"Could not add route '{routeID}'.")
+        try:
+            sim.routes[routeID] = [sim.net.edge_index[e] for e in edges]
+        except KeyError as e:
+            raise TraCIException(f"Unknown edge {e.args[0]!r} in route '{routeID}'.") from None
+
+    def getEdges(self, routeID: str) -> tuple:
+        sim = _require()
+        try:
+            return tuple(sim.net.edge_ids[e] for e in sim.routes[routeID])
+        except KeyError:
+            raise TraCIException(f"Route '{routeID}' is not known.") from None
+
+
+class _Edge:
+
+    def getIDList(self) -> tuple:
+        return tuple(_require().net.edge_ids)
+
+    def getParameter(self, objectID: str, key: str) -> str:
+        return ""
+
+    def getLaneNumber(self, edgeID: str) -> int:
+        return 1
+
+
+class _Lane:
+
+    def getMaxSpeed(self, laneID: str) -> float:
+        net = _require().net
+        try:
+            return float(net.speed[net.edge_index[laneID.rsplit("_", 1)[0]]])
+        except KeyError:
+            raise TraCIException(f"Lane '{laneID}' is not known.") from None
+
+
+simulation = _Simulation()
+vehicle = _Vehicle()
+trafficlight = _TrafficLight()
+route = _Route()
+edge = _Edge()
+lane = _Lane()
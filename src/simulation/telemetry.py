@@ -0,0 +1,215 @@
+"""
+Logging setup and low-overhead per-step telemetry
+    - configure_logging(): the root logger setup, called by the entry
+      point rather than at import time,
+    - TRACE: per-step debug records (speed bins, overspeed penalties) are
+      only formatted when it is on, hot paths test it before calling
+      logger.debug, so tracing off costs one attribute read,
+    - TelemetryBuffer: sampled per-step events (every Nth step and/or only
+      near a TLS) in a preallocated ring of two halves; a full half is
+      appended to telemetry.bin by a background thread while the other
+      half fills, meta.json (names, rows, episodes) follows each write.
+
+    python -m src.simulation.telemetry info DIR
+"""
+
+import argparse
+import json
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+from src.simulation.episode_record import Interner
+
+# per-step debug tracing, set by configure_logging(trace=True)
+TRACE = False
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+TELEMETRY_DIR = os.path.join(os.path.dirname(__file__), "telemetry")
+DATA_FILE = "telemetry.bin"
+META_FILE = "meta.json"
+
+TELEMETRY_DTYPE = np.dtype([
+    ('episode', '<i4'),
+    ('step', '<i4'),
+    ('vehicle', '<i4'),     # names id
+    ('speed', '<f4'),
+    ('allowed', '<f4'),
+    ('speed_bin', 'i1'),
+    ('tls_state', 'i1'),    # episode_record colour code, 0: no TLS ahead
+    ('tls_dist', '<f4'),    # nan: no TLS ahead
+])
+
+
+def configure_logging(level: str = "INFO", trace: bool = False) -> None:
+    """Root logger for a batch run; trace turns on the per-step debug records"""
+    global TRACE
+    TRACE = trace
+    logging.basicConfig(level=logging.DEBUG if trace else level, format=LOG_FORMAT)
+    # ignore noisy libs
+    logging.getLogger("PIL").setLevel(logging.WARNING)
+    logging.getLogger("matplotlib").setLevel(logging.INFO)
+
+
+class TelemetryBuffer:
+    """
+    Sampled per-step events of every agent, appended to the recording in
+    out_dir, continuing an existing one (rows beyond its meta.json, e.g.
+    from a crash, are cut off). every keeps one step in N, near_tls only
+    steps with a TLS within that many metres; with both, a step needs both
+    """
+
+    def __init__(self, out_dir: str = TELEMETRY_DIR, capacity: int = 65536,
+                 every: int = 1, near_tls: float | None = None):
+        self.out_dir = out_dir
+        self.every = max(1, every)
+        self.near_tls = near_tls
+        self.names = Interner()
+        self.episodes = 0
+        self.rows = 0
+        self._ring = np.empty(2 * max(1, capacity // 2), dtype=TELEMETRY_DTYPE)
+        self._half = len(self._ring) // 2
+        self._base = 0
+        self._n = 0
+        self._pending: list[Future | None] = [None, None]
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="telemetry")
+
+        os.makedirs(out_dir, exist_ok=True)
+        meta = _read_meta(out_dir)
+        if meta is not None:
+            if np.dtype([tuple(field) for field in meta["dtype"]]) != TELEMETRY_DTYPE:
+                raise ValueError(f"{out_dir}: recorded with a different row layout")
+            for name in meta["names"]:
+                self.names(name)
+            self.rows = meta["rows"]
+            self.episodes = meta["episodes"]
+        with open(os.path.join(out_dir, DATA_FILE), "ab") as f:
+            f.truncate(self.rows * TELEMETRY_DTYPE.itemsize)
+        self._write_meta(list(self.names), self.rows, self.episodes)
+
+    def __repr__(self) -> str:
+        return (
+            f"TelemetryBuffer({self.out_dir!r}, episodes={self.episodes}, "
+            f"rows={self.rows + self._n})"
+        )
+
+    def wants(self, step: int, tls_dist: float) -> bool:
+        """Whether the sampling keeps this step (nan: no TLS ahead)"""
+        if step % self.every:
+            return False
+        return self.near_tls is None or tls_dist <= self.near_tls
+
+    def record(self, step: int, vid: str, speed: float, allowed: float,
+               speed_bin: int, tls_state: int, tls_dist: float) -> None:
+        self._ring[self._base + self._n] = (
+            self.episodes, step, self.names(vid), speed, allowed,
+            speed_bin, tls_state, tls_dist,
+        )
+        self._n += 1
+        if self._n == self._half:
+            self._submit()
+
+    def _submit(self, episode_done: bool = False) -> None:
+        """
+        Hand the filled half to the writer and switch to the other one,
+        episode_done when the current episode ends with it
+        """
+        half = self._base // self._half
+        if self._n:
+            rows = self._ring[self._base:self._base + self._n]
+            self.rows += self._n
+            # meta counts completed episodes only
+            episodes = self.episodes + 1 if episode_done else self.episodes
+            self._pending[half] = self._writer.submit(
+                self._write, rows, list(self.names), self.rows, episodes
+            )
+        self._base, self._n = (1 - half) * self._half, 0
+        # the other half is only refilled once it is on disk
+        waiting = self._pending[1 - half]
+        if waiting is not None:
+            waiting.result()
+            self._pending[1 - half] = None
+
+    def end_episode(self) -> None:
+        """Send the episode's remaining rows to the writer"""
+        self._submit(episode_done=True)
+        self.episodes += 1
+
+    def flush(self) -> None:
+        """Block until every submitted row is on disk"""
+        for i, pending in enumerate(self._pending):
+            if pending is not None:
+                pending.result()
+                self._pending[i] = None
+
+    def close(self) -> None:
+        if self._n:
+            self._submit()
+        self.flush()
+        self._writer.shutdown()
+
+    # --- WRITER THREAD
+
+    def _write(self, rows: np.ndarray, names: list, total: int, episodes: int) -> None:
+        with open(os.path.join(self.out_dir, DATA_FILE), "ab") as f:
+            f.write(rows.tobytes())
+        self._write_meta(names, total, episodes)
+
+    def _write_meta(self, names: list, rows: int, episodes: int) -> None:
+        meta = {
+            "format": "telemetry",
+            "dtype": TELEMETRY_DTYPE.descr,
+            "rows": rows,
+            "episodes": episodes,
+            "every": self.every,
+            "near_tls": self.near_tls,
+            "names": names,
+        }
+        path = os.path.join(self.out_dir, META_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+
+def _read_meta(out_dir: str) -> dict | None:
+    path = os.path.join(out_dir, META_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def read_telemetry(out_dir: str = TELEMETRY_DIR) -> tuple[np.ndarray, list[str]]:
+    """(rows, names) of a recording, rows memory-mapped up to meta.json's count"""
+    meta = _read_meta(out_dir)
+    if meta is None:
+        raise FileNotFoundError(f"no {META_FILE} in {out_dir}")
+    if not meta["rows"]:
+        return np.empty(0, dtype=TELEMETRY_DTYPE), meta["names"]
+    rows = np.memmap(os.path.join(out_dir, DATA_FILE), dtype=TELEMETRY_DTYPE,
+                     mode="r", shape=(meta["rows"],))
+    return rows, meta["names"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a telemetry recording")
+    sub = parser.add_subparsers(dest="command", required=True)
+    info = sub.add_parser("info", help="Rows per vehicle and TLS share")
+    info.add_argument("path", nargs="?", default=TELEMETRY_DIR)
+    args = parser.parse_args()
+
+    rows, names = read_telemetry(args.path)
+    episodes = len(np.unique(rows['episode'])) if len(rows) else 0
+    print(f"{args.path}: {len(rows)} rows, {episodes} episode(s)")
+    for vid in np.unique(rows['vehicle']).tolist():
+        mine = rows[rows['vehicle'] == vid]
+        near = np.mean(~np.isnan(mine['tls_dist']))
+        print(f"    {names[vid]:<12}{len(mine):>9} rows  mean speed "
+              f"{mine['speed'].mean():6.2f}  TLS ahead {100 * near:5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Per-step agent trajectories on disk
+    - TrajectoryRecorder: one row per agent and step (speed, edge, lane,
+      distance, next TLS id/colour/distance, action, reward) buffered in a
+      preallocated array and appended to one .bin file per column when
+      the buffer fills or an episode ends, so memory stays bounded,
+    - strings (agents, edges, lanes, TLS, actions) are stored as ids into
+      the names table of meta.json, rewritten atomically after each episode,
+    - TrajectoryReader: np.memmap view of every column for analysis.
+
+    python -m src.simulation.trajectory info DIR
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+from src.simulation.episode_record import Interner, colour_code
+from src.simulation.world_snapshot import WorldSnapshot
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+CHUNK_ROWS = 65536
+TRAJECTORY_DIR = os.path.join(os.path.dirname(__file__), "trajectories")
+
+# columns, little-endian so files read the same on any machine
+TRAJECTORY_DTYPE = np.dtype([
+    ('episode', '<i4'),
+    ('step', '<i4'),
+    ('agent', '<i4'),       # names id
+    ('speed', '<f4'),
+    ('edge', '<i4'),        # names id
+    ('lane', '<i4'),        # names id
+    ('distance', '<f4'),
+    ('tls', '<i4'),         # names id, -1: no TLS ahead
+    ('tls_state', 'i1'),    # episode_record colour code
+    ('tls_dist', '<f4'),    # nan: no TLS ahead
+    ('action', '<i4'),      # names id, -1: no action yet
+    ('reward', '<f4'),      # nan: no update this step
+])
+
+
+def _read_meta(out_dir: str) -> dict | None:
+    path = os.path.join(out_dir, META_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        meta = json.load(f)
+    if meta.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported trajectory version {meta.get('version')}")
+    return meta
+
+
+class TrajectoryRecorder:
+    """
+    Appends to the trajectory in out_dir, continuing an existing one
+    (rows beyond its meta.json, e.g. from a crash, are cut off)
+    """
+
+    def __init__(self, out_dir: str = TRAJECTORY_DIR, chunk_rows: int = CHUNK_ROWS):
+        self.out_dir = out_dir
+        self.names = Interner()
+        self.episodes: list[dict] = []
+        self.rows = 0
+        self._buf = np.empty(chunk_rows, dtype=TRAJECTORY_DTYPE)
+        self._n = 0
+        self._start = None
+        self._route = None
+
+        os.makedirs(out_dir, exist_ok=True)
+        meta = _read_meta(out_dir)
+        if meta is not None:
+            for name in meta["names"]:
+                self.names(name)
+            self.episodes = meta["episodes"]
+            self.rows = meta["rows"]
+        for name in TRAJECTORY_DTYPE.names:
+            with open(self._column_path(name), "ab") as f:
+                f.truncate(self.rows * TRAJECTORY_DTYPE[name].itemsize)
+
+    def __repr__(self) -> str:
+        return (
+            f"TrajectoryRecorder({self.out_dir!r}, episodes={len(self.episodes)}, "
+            f"rows={self.rows + self._n})"
+        )
+
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.out_dir, f"{name}.bin")
+
+    # --- RECORDING
+
+    def begin_episode(self, route_idx: int | None = None) -> None:
+        self._start = self.rows + self._n
+        self._route = route_idx
+
+    def record(self, step: int, vid: str, world: WorldSnapshot,
+               action: str | None = None, reward: float | None = None) -> None:
+        """One row for vid, read from the step's (already warm) snapshot"""
+        names = self.names
+        next_tls = world.next_tls(vid)
+        if next_tls:
+            tls_id, _, dist, *_ = next_tls[0]
+            tls = names(tls_id)
+            state = colour_code(world.tls_state(tls_id).lower())
+            dist = float(dist)
+        else:
+            tls, state, dist = -1, 0, np.nan
+
+        self._buf[self._n] = (
+            len(self.episodes), step, names(vid), world.speed(vid),
+            names(world.road_id(vid)), names(world.lane_id(vid)), world.distance(vid),
+            tls, state, dist,
+            -1 if action is None else names(action),
+            np.nan if reward is None else reward,
+        )
+        self._n += 1
+        if self._n == len(self._buf):
+            self.flush()
+
+    def flush(self) -> None:
+        """Append the buffered rows to the column files"""
+        if not self._n:
+            return
+        rows = self._buf[:self._n]
+        for name in TRAJECTORY_DTYPE.names:
+            with open(self._column_path(name), "ab") as f:
+                f.write(rows[name].tobytes())
+        self.rows += self._n
+        self._n = 0
+
+    def end_episode(self) -> None:
+        """Flush and publish the episode in meta.json"""
+        if self._start is None:
+            return
+        self.flush()
+        self.episodes.append({"start": self._start, "stop": self.rows, "route": self._route})
+        self._start = None
+        self._write_meta()
+
+    def close(self) -> None:
+        self.end_episode()
+
+    def _write_meta(self) -> None:
+        meta = {
+            "format": "trajectory",
+            "version": FORMAT_VERSION,
+            "rows": self.rows,
+            "columns": {name: TRAJECTORY_DTYPE[name].str for name in TRAJECTORY_DTYPE.names},
+            "names": list(self.names),
+            "episodes": self.episodes,
+        }
+        path = os.path.join(self.out_dir, META_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+
+class TrajectoryReader:
+    """
+    Read-only memory-mapped columns of a recorded trajectory,
+    reader['speed'] is an np.memmap over every row
+    """
+
+    def __init__(self, out_dir: str = TRAJECTORY_DIR):
+        meta = _read_meta(out_dir)
+        if meta is None:
+            raise FileNotFoundError(f"no {META_FILE} in {out_dir}")
+        self.out_dir = out_dir
+        self.meta = meta
+        self.names: list[str] = meta["names"]
+        self.episodes: list[dict] = meta["episodes"]
+        self.rows: int = meta["rows"]
+        self._ids = {name: i for i, name in enumerate(self.names)}
+        self.columns = {}
+        for name, dtype in meta["columns"].items():
+            path = os.path.join(out_dir, f"{name}.bin")
+            self.columns[name] = (
+                np.memmap(path, dtype=dtype, mode="r", shape=(self.rows,))
+                if self.rows else np.empty(0, dtype=dtype)
+            )
+
+    def __repr__(self) -> str:
+        return f"TrajectoryReader({self.out_dir!r}, episodes={len(self.episodes)}, rows={self.rows})"
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+    def name_id(self, name: str) -> int:
+        return self._ids.get(name, -2)
+
+    def decode(self, ids) -> list[str | None]:
+        """names for an id column slice, None for -1"""
+        return [self.names[i] if i >= 0 else None for i in np.asarray(ids).tolist()]
+
+    def episode(self, episode: int, agent: str | None = None) -> dict:
+        """Columns of one episode (views into the maps), optionally one agent's rows"""
+        ep = self.episodes[episode]
+        cols = {name: col[ep["start"]:ep["stop"]] for name, col in self.columns.items()}
+        if agent is not None:
+            mask = cols["agent"] == self.name_id(agent)
+            cols = {name: col[mask] for name, col in cols.items()}
+        return cols
+
+    def to_frame(self, episode: int | None = None, agent: str | None = None):
+        """pandas DataFrame with the id columns decoded to strings"""
+        import pandas as pd
+
+        if episode is None:
+            cols = dict(self.columns)
+            if agent is not None:
+                mask = cols["agent"] == self.name_id(agent)
+                cols = {name: col[mask] for name, col in cols.items()}
+        else:
+            cols = self.episode(episode, agent)
+        frame = pd.DataFrame({name: np.asarray(col) for name, col in cols.items()})
+        for name in ("agent", "edge", "lane", "tls", "action"):
+            frame[name] = self.decode(frame[name].to_numpy())
+        return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a recorded trajectory")
+    parser.add_argument("command", choices=["info"])
+    parser.add_argument("path", nargs="?", default=TRAJECTORY_DIR)
+    args = parser.parse_args()
+
+    reader = TrajectoryReader(args.path)
+    agents = sorted(set(reader.decode(np.unique(reader["agent"]))))
+    print(f"{args.path}: {len(reader.episodes)} episodes, {reader.rows} rows, "
+          f"{len(reader.names)} names")
+    print(f"agents: {', '.join(agents)}")
+    for i, ep in enumerate(reader.episodes[-5:], start=max(0, len(reader.episodes) - 5)):
+        print(f"  episode {i}: rows {ep['start']}..{ep['stop']}, route {ep['route']}")
+
+
+if __name__ == "__main__":
+    main()
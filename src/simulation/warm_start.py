@@ -0,0 +1,60 @@
+import logging
+import os
+import random
+
+from src.simulation.backend import traci
+
+logger = logging.getLogger(__name__)
+
+STATE_DIR = os.path.join(os.path.dirname(__file__), "warm_states")
+
+
+class WarmStartPool:
+    """
+    Saved SUMO states taken after a background-traffic warm-up
+        - simulated once with saveState, reused by every later episode,
+        - pool_size > 1 keeps several states (one SUMO seed each) for variety,
+        - episodes restore a random one with loadState.
+    """
+
+    def __init__(self, warmup_steps: int = 600, pool_size: int = 1,
+                 state_dir: str = STATE_DIR):
+        self.warmup_steps = warmup_steps
+        self.pool_size = pool_size
+        self.state_dir = state_dir
+
+    def __repr__(self) -> str:
+        return (
+            f"WarmStartPool(warmup_steps={self.warmup_steps}, "
+            f"pool_size={self.pool_size}, state_dir={self.state_dir!r})"
+        )
+
+    def paths(self, sumo_config: str) -> list[str]:
+        stem = os.path.basename(sumo_config).split(".")[0]
+        return [
+            os.path.join(self.state_dir, f"{stem}_{self.warmup_steps}s_seed{k}.xml.gz")
+            for k in range(self.pool_size)
+        ]
+
+    def ensure(self, cmd: list[str]) -> None:
+        """Simulate and save any warm-up state not on disk yet"""
+        sumo_config = cmd[cmd.index("-c") + 1]
+        for seed, path in enumerate(self.paths(sumo_config)):
+            if os.path.exists(path):
+                continue
+            os.makedirs(self.state_dir, exist_ok=True)
+            logger.info("Warming up %d steps (seed %d) -> %s",
+                        self.warmup_steps, seed, path)
+            traci.start(cmd + ["--seed", str(seed)], label="warm_start")
+            try:
+                for _ in range(self.warmup_steps):
+                    traci.simulationStep()
+                # write next to the target so a crash never leaves half a state
+                tmp = path + ".tmp.xml.gz"
+                traci.simulation.saveState(tmp)
+                os.replace(tmp, path)
+            finally:
+                traci.close()
+
+    def choose(self, sumo_config: str) -> str:
+        return random.choice(self.paths(sumo_config))
@@ -0,0 +1,128 @@
+from traci import constants as tc
+
+from src.simulation.backend import traci
+
+# snapshot-only keys for values that have no single TraCI variable id
+_ID_LIST = "id_list"
+_ACTIVE = "active"
+
+
+class WorldSnapshot:
+    """
+    Read-through cache of one simulation step
+        - each vehicle/TLS quantity is fetched from TraCI at most once,
+        - shared by the runner, AgentManager and every driver,
+        - counts requested reads against real TraCI calls.
+
+    Values can also be seeded from subscription results, those reads
+    cost no TraCI call at all.
+    """
+
+    def __init__(self):
+        self._cache: dict = {}
+        self.requests = 0
+        self.calls = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"WorldSnapshot(requests={self.requests}, calls={self.calls}, "
+            f"saved={self.saved})"
+        )
+
+    @property
+    def saved(self) -> int:
+        """TraCI round trips avoided compared to querying on every read"""
+        return self.requests - self.calls
+
+    def _get(self, var, obj_id, getter, *args):
+        self.requests += 1
+        key = (var, obj_id)
+        try:
+            return self._cache[key]
+        except KeyError:
+            self.calls += 1
+            value = self._cache[key] = getter(*args)
+            return value
+
+    def seed(self, obj_id: str, values: dict) -> None:
+        """Pre-fill a vehicle/TLS from a subscription result {var: value}"""
+        for var, value in values.items():
+            self._cache[(var, obj_id)] = value
+
+    def seed_vehicle(self, vid: str, values: dict) -> bool:
+        """
+        Pre-fill an agent from its subscription result unless it is off the
+        road: no result, or the frame SUMO sends while it teleports (speed
+        INVALID_DOUBLE_VALUE, empty road id). Returns whether it was seeded
+        """
+        if (not values or values.get(tc.VAR_SPEED) == tc.INVALID_DOUBLE_VALUE
+                or values.get(tc.VAR_ROAD_ID) == ""):
+            return False
+        self.seed(vid, values)
+        return True
+
+    def seed_active(self, vehicle_ids) -> None:
+        """
+        Pre-fill the set of running agents (subscription mode), leaving out
+        any seeded with a teleport's invalid speed, as getIDList does
+        """
+        self._cache[(_ACTIVE, None)] = {
+            vid for vid in vehicle_ids
+            if self._cache.get((tc.VAR_SPEED, vid)) != tc.INVALID_DOUBLE_VALUE
+        }
+
+    # --- SIMULATION
+
+    def vehicle_ids(self) -> set:
+        return self._get(_ID_LIST, None,
+                         lambda: set(traci.vehicle.getIDList()))
+
+    def is_active(self, vid: str) -> bool:
+        active = self._cache.get((_ACTIVE, None))
+        if active is None:
+            active = self.vehicle_ids()
+        else:
+            self.requests += 1
+        return vid in active
+
+    def colliding(self) -> set:
+        return self._get(tc.VAR_COLLIDING_VEHICLES_IDS, None,
+                         lambda: set(traci.simulation.getCollidingVehiclesIDList()))
+
+    def time(self) -> float:
+        return self._get(tc.VAR_TIME, None, traci.simulation.getTime)
+
+    # --- VEHICLE
+
+    def speed(self, vid: str) -> float:
+        return self._get(tc.VAR_SPEED, vid, traci.vehicle.getSpeed, vid)
+
+    def allowed_speed(self, vid: str) -> float:
+        return self._get(tc.VAR_ALLOWED_SPEED, vid,
+                         traci.vehicle.getAllowedSpeed, vid)
+
+    def road_id(self, vid: str) -> str:
+        return self._get(tc.VAR_ROAD_ID, vid, traci.vehicle.getRoadID, vid)
+
+    def lane_id(self, vid: str) -> str:
+        return self._get(tc.VAR_LANE_ID, vid, traci.vehicle.getLaneID, vid)
+
+    def distance(self, vid: str) -> float:
+        return self._get(tc.VAR_DISTANCE, vid, traci.vehicle.getDistance, vid)
+
+    def next_tls(self, vid: str) -> list:
+        return self._get(tc.VAR_NEXT_TLS, vid, traci.vehicle.getNextTLS, vid)
+
+    # --- TRAFFIC LIGHTS
+
+    def tls_state(self, tls_id: str) -> str:
+        return self._get(tc.TL_RED_YELLOW_GREEN_STATE, tls_id,
+                         traci.trafficlight.getRedYellowGreenState, tls_id)
+
+    def next_switch(self, tls_id: str) -> float:
+        return self._get(tc.TL_NEXT_SWITCH, tls_id,
+                         traci.trafficlight.getNextSwitch, tls_id)
+
+    def phase_duration(self, tls_id: str) -> float:
+        return self._get(tc.TL_PHASE_DURATION, tls_id,
+                         traci.trafficlight.getPhaseDuration, tls_id)
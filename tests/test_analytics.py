@@ -0,0 +1,66 @@
+# vectorized analytics agree with the record-by-record collector
+
+import random
+
+import numpy as np
+import pytest
+
+from src.metrics import analytics
+from src.metrics.metrics_collector import AVERAGES_HEADERS, MetricsCollector
+from src.simulation.episode_record import EpisodeTable
+
+
+def random_table(episodes, vids, seed=0):
+    rng = random.Random(seed)
+    table = EpisodeTable()
+    runs = []
+    for _ in range(episodes):
+        run = {}
+        for vid in vids:
+            run[vid] = {
+                'end_step': rng.randrange(100, 900) if rng.random() < 0.8 else None,
+                'total_distance': rng.uniform(500, 4000), 'max_speed': rng.uniform(5, 20),
+                'edges_visited': set(range(rng.randrange(1, 90))),
+                'tls_encountered': set(range(rng.randrange(0, 12))),
+                'amber_encountered': rng.randrange(3), 'red_encountered': rng.randrange(5),
+                'green_encountered': rng.randrange(5), 'amber_run_count': rng.randrange(3),
+                'red_run_count': rng.randrange(4), 'green_run_count': rng.randrange(6),
+                'sudden_brake_count': rng.randrange(0, 50), 'max_decel': rng.uniform(0, 9),
+                'sum_decel': rng.uniform(0, 300), 'lane_change_count': rng.randrange(80),
+                'collision_count': rng.randrange(3), 'wait_time': rng.uniform(0, 60),
+                'speed_bin_counts': [rng.randrange(50) for _ in range(4)],
+            }
+        route = rng.choice([None, 0, 1, 2])
+        table.add(run, route)
+        runs.append((run, route))
+    return table, runs
+
+
+@pytest.mark.parametrize("group_by", [None, lambda vid: vid.rsplit("_", 1)[0]])
+def test_averages_match_collector(group_by):
+    table, runs = random_table(300, ["risky_2", "safe_1", "risky_1", "safe_2"])
+    expected = MetricsCollector().compute_averages(runs, group_by=group_by)
+    assert analytics.averages_rows(table, group_by) == expected
+    assert list(analytics.averages(table, group_by).columns) == AVERAGES_HEADERS
+
+
+def test_never_reached_agent():
+    table, _ = random_table(3, ["safe_1"])
+    table.rows['end_step'] = -1
+    assert analytics.averages_rows(table) == [["safe_1"] + ["N/A"] * 21]
+
+
+def test_speed_bin_shares_and_routes():
+    table, runs = random_table(50, ["safe_1", "risky_1"], seed=4)
+    shares = analytics.speed_bin_shares(table, ["safe_1"], pct=0.10)["safe_1"]
+    first = np.sum([r["safe_1"]["speed_bin_counts"] for r, _ in runs[:5]], axis=0)
+    last = np.sum([r["safe_1"]["speed_bin_counts"] for r, _ in runs[-5:]], axis=0)
+    assert shares.iloc[0].to_numpy() == pytest.approx(first / first.sum())
+    assert shares.iloc[1].to_numpy() == pytest.approx(last / last.sum())
+
+    by_route = analytics.per_route(table)
+    assert by_route["Runs"].sum() == 100
+    safe_none = by_route[(by_route["Agent"] == "safe_1") & (by_route["Route"] == -1)]
+    runs_none = [r["safe_1"] for r, route in runs if route is None]
+    assert safe_none["Runs"].item() == len(runs_none)
+    assert safe_none["Reached"].item() == sum(r["end_step"] is not None for r in runs_none)
@@ -0,0 +1,44 @@
+# backend proxy: traci default, libsumo opt-in with fallback
+
+import pytest
+import traci as real_traci
+
+import src.simulation.backend as backend
+
+
+@pytest.fixture(autouse=True)
+def restore_backend():
+    yield
+    backend.select_backend("traci")
+
+
+def test_default_backend_is_traci():
+    assert backend.active_backend() == "traci"
+    assert backend.traci.vehicle is real_traci.vehicle
+
+
+def test_libsumo_falls_back_to_traci(monkeypatch):
+    def missing(name):
+        raise ImportError(f"No module named {name!r}")
+    monkeypatch.setattr(backend.importlib, "import_module", missing)
+    assert backend.select_backend("libsumo") == "traci"
+
+
+def test_libsumo_selected_when_available(monkeypatch):
+    class FakeLibsumo:
+        __name__ = "libsumo"
+        def simulationStep(self):
+            return "in-process"
+    monkeypatch.setattr(backend.importlib, "import_module", lambda name: FakeLibsumo())
+    assert backend.select_backend("libsumo") == "libsumo"
+    assert backend.traci.simulationStep() == "in-process"
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        backend.select_backend("carla")
+
+
+def test_monkeypatch_through_proxy_reaches_backend(monkeypatch):
+    monkeypatch.setattr(backend.traci, "start", lambda cmd: "stubbed")
+    assert real_traci.start([]) == "stubbed"
@@ -0,0 +1,42 @@
+# benchmark suite: results JSON and the regression check
+
+from benchmarks import suite
+
+
+def results(**values) -> dict:
+    return {"meta": {}, "metrics": {
+        name: {"value": value, "unit": suite.METRICS[name][0],
+               "higher_is_better": suite.METRICS[name][1]}
+        for name, value in values.items()
+    }}
+
+
+def test_compare_flags_only_regressions_beyond_threshold():
+    baseline = results(episode_steps_per_sec=1000.0, model_load_ms=2.0,
+                       qtable_updates_per_sec=1e6)
+    new = results(episode_steps_per_sec=850.0, model_load_ms=2.6,
+                  qtable_updates_per_sec=2e6)
+    _, regressed = suite.compare(baseline, new, threshold=0.2)
+    # 15% fewer steps/s is within 20%, 30% slower loading is not
+    assert regressed == ["model_load_ms"]
+
+    _, regressed = suite.compare(baseline, new, threshold=0.1)
+    assert regressed == ["episode_steps_per_sec", "model_load_ms"]
+
+
+def test_missing_metrics_never_fail():
+    lines, regressed = suite.compare(results(model_save_ms=1.0),
+                                     results(model_load_ms=5.0))
+    assert regressed == []
+    assert any("only in baseline" in line for line in lines)
+    assert any("only in results" in line for line in lines)
+
+
+def test_quick_run_writes_every_metric(tmp_path):
+    out = suite.run_suite(quick=True, repeats=1)
+    assert set(out["metrics"]) == set(suite.METRICS)
+    assert all(m["value"] > 0 for m in out["metrics"].values())
+
+    path = str(tmp_path / "results.json")
+    suite._write(path, out)
+    assert suite.compare(suite._load(path), out)[1] == []
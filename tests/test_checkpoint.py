@@ -0,0 +1,157 @@
+# checkpoints: atomic round trip, and the pieces a resumed batch restores
+
+import os
+import pickle
+import random
+
+import numpy as np
+import pytest
+
+from src.io.csv_exporter import CsvExporter
+from src.metrics.metrics_collector import StreamingAggregator
+from src.simulation.checkpoint import (
+    load_checkpoint, restore_rng, rng_state, save_checkpoint,
+)
+from src.simulation.episode_record import EpisodeTable
+
+
+def record(end_step):
+    return {
+        'end_step': end_step, 'total_distance': 100.0, 'max_speed': 10.0,
+        'edges_visited': {"a"}, 'tls_encountered': set(), 'amber_encountered': 0,
+        'red_encountered': 1, 'green_encountered': 0, 'amber_run_count': 0,
+        'red_run_count': 0, 'green_run_count': 0, 'sudden_brake_count': 0,
+        'max_decel': 0.0, 'sum_decel': 0.0, 'lane_change_count': 0,
+        'collision_count': 0, 'wait_time': 1.0, 'speed_bin_counts': [1, 2, 3, 4],
+    }
+
+
+def test_roundtrip_restores_rng_and_metrics(tmp_path):
+    path = str(tmp_path / "checkpoint.pkl")
+    assert load_checkpoint(path) is None
+
+    table, agg = EpisodeTable(), StreamingAggregator()
+    for step in (10, 20):
+        table.add({"safe_1": record(step)}, 0)
+        agg.add_run(table.episode_rows(-1))
+
+    random.seed(5)
+    np.random.seed(5)
+    save_checkpoint(path, {"episode": 2, "rng": rng_state(), "metrics": agg.state(),
+                           "episodes": table.rows})
+    expected = (random.random(), np.random.random())
+    assert not os.path.exists(path + ".tmp")
+
+    state = load_checkpoint(path)
+    restore_rng(state["rng"])
+    assert (random.random(), np.random.random()) == expected
+
+    resumed_table = EpisodeTable.from_rows(state["episodes"])
+    resumed = StreamingAggregator()
+    resumed.restore(state["metrics"])
+    for a, b in ((table, agg), (resumed_table, resumed)):
+        a.add({"safe_1": record(30)}, 1)
+        b.add_run(a.episode_rows(-1))
+    assert resumed.rows() == agg.rows()
+    assert np.array_equal(resumed_table.rows, table.rows)
+    assert resumed_table.episodes == 3
+
+
+def test_rejects_other_versions(tmp_path):
+    path = str(tmp_path / "checkpoint.pkl")
+    with open(path, "wb") as f:
+        pickle.dump({"version": 0}, f)
+    with pytest.raises(ValueError):
+        load_checkpoint(path)
+
+
+def test_csv_rolls_back_to_checkpoint(tmp_path):
+    path = str(tmp_path / "per_run.csv")
+    stream = CsvExporter().stream(path, ["Agent", "Time"])
+    stream.write_run(1, [["safe_1", 10]])
+    at_checkpoint = stream.sync()
+    stream.write_run(2, [["safe_1", 20]])
+    stream.close(publish=False)
+
+    stream = CsvExporter().stream(path, ["Agent", "Time"], resume=True, progress=at_checkpoint)
+    assert stream.last_completed == 1
+    stream.write_run(2, [["safe_1", 21]])
+    stream.close()
+    assert open(path).read().splitlines() == ["Agent,Time", "safe_1,10", "safe_1,21"]
+
+
+def test_csv_resumes_a_published_export(tmp_path):
+    path = str(tmp_path / "per_run.csv")
+    stream = CsvExporter().stream(path, ["Agent", "Time"])
+    stream.write_run(1, [["safe_1", 10]])
+    at_checkpoint = stream.sync()
+    stream.close()
+
+    stream = CsvExporter().stream(path, ["Agent", "Time"], resume=True, progress=at_checkpoint)
+    stream.write_run(2, [["safe_1", 20]])
+    stream.close()
+    assert open(path).read().splitlines() == ["Agent,Time", "safe_1,10", "safe_1,20"]
+
+
+@pytest.mark.parametrize("manager_kwargs", [
+    {"n_agents": 4},
+    {"dense_q": True, "replay": {"capacity": 500, "batch_size": 8, "every": 3,
+                                  "between_episodes": 2}},
+    {"n_agents": 4, "replay": {"capacity": 500, "prioritized": True, "every": 2}},
+], ids=["fleet", "replay", "fleet_replay"])
+def test_resume_continues_fleet_and_replay_runs(tmp_path, manager_kwargs):
+    import src.simulation.backend as backend
+    from src.agents.agent_manager import AgentManager
+    from src.simulation import surrogate
+    from src.simulation.simulation_runner import SimulationRunner
+
+    def episodes(mgr, n):
+        # frozen rows, as batch.main keeps them: interned ids are per runner
+        runner, table = SimulationRunner("sumo", "unused.sumocfg", max_steps=200), EpisodeTable()
+        for _ in range(n):
+            table.add(*runner.run(mgr))
+            mgr.replay_episode_end()
+            mgr.decay_exploration()
+        rows = table.rows.copy()
+        rows["episode"] = 0
+        return [row.tobytes() for row in rows]
+
+    def checkpoint(mgr):
+        return {"q_safe": mgr.safe_driver.qtable.to_dict(),
+                "q_risky": mgr.risky_driver.qtable.to_dict(),
+                "epsilon": (mgr.safe_driver.qtable.epsilon, mgr.risky_driver.qtable.epsilon),
+                "rng": rng_state(), "replay": mgr.replay_state()}
+
+    backend.select_backend("surrogate")
+    try:
+        random.seed(5)
+        np.random.seed(5)
+        straight = AgentManager(**manager_kwargs)
+        expected = episodes(straight, 3)
+
+        random.seed(5)
+        np.random.seed(5)
+        interrupted = AgentManager(**manager_kwargs)
+        before = episodes(interrupted, 1)
+        path = str(tmp_path / "checkpoint.pkl")
+        save_checkpoint(path, checkpoint(interrupted))
+
+        # a fresh process: new manager, same order of restores as batch.main
+        state = load_checkpoint(path)
+        resumed = AgentManager(**manager_kwargs)
+        resumed.load_drivers()
+        resumed.safe_driver.qtable.from_dict(state["q_safe"])
+        resumed.risky_driver.qtable.from_dict(state["q_risky"])
+        resumed.safe_driver.qtable.epsilon, resumed.risky_driver.qtable.epsilon = state["epsilon"]
+        resumed.restore_replay(state["replay"])
+        restore_rng(state["rng"])
+        after = episodes(resumed, 2)
+    finally:
+        surrogate.close()
+        backend.select_backend("traci")
+
+    assert before + after == expected
+    for policy in ("safe_driver", "risky_driver"):
+        assert np.array_equal(getattr(resumed, policy).qtable.q, getattr(straight, policy).qtable.q)
+    if "replay" in manager_kwargs:
+        assert resumed.replay_state()["safe"]["buffer"]["added"] > 0
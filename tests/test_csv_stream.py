@@ -0,0 +1,55 @@
+# streaming csv export: same file as to_file, resumable after a crash
+
+import json
+
+from src.io.csv_exporter import CsvExporter
+
+HEADERS = ["Agent", "Route", "Time(steps)"]
+
+
+def test_stream_matches_to_file(tmp_path):
+    rows = {1: [["safe_1", 0, 10], ["risky_1", 0, "-"]], 2: [["safe_1", None, 12.5]]}
+    expected = tmp_path / "expected.csv"
+    CsvExporter().to_file(str(expected), HEADERS, [r for run in rows.values() for r in run])
+
+    path = tmp_path / "per_run.csv"
+    with CsvExporter().stream(str(path), HEADERS) as stream:
+        for i, run_rows in rows.items():
+            stream.write_run(i, run_rows)
+    assert path.read_bytes() == expected.read_bytes()
+    assert not (tmp_path / "per_run.csv.part").exists()
+    assert not (tmp_path / "per_run.csv.progress.json").exists()
+
+
+def test_resume_after_crash(tmp_path):
+    path = str(tmp_path / "per_run.csv")
+    stream = CsvExporter().stream(path, HEADERS)
+    stream.write_run(1, [["safe_1", 0, 10]])
+    stream.write_run(2, [["safe_1", 1, 11]])
+    stream.close(publish=False)
+    # half a run written after the last progress update
+    with open(path + ".part", "ab") as f:
+        f.write(b"safe_1,2,1")
+
+    progress = json.loads(open(path + ".progress.json").read())
+    assert progress["run"] == 2 and progress["rows"] == 2
+
+    stream = CsvExporter().stream(path, HEADERS, resume=True)
+    assert stream.last_completed == 2
+    stream.write_run(3, [["safe_1", 2, 12]])
+    stream.close()
+    assert open(path).read().splitlines() == [
+        "Agent,Route,Time(steps)", "safe_1,0,10", "safe_1,1,11", "safe_1,2,12",
+    ]
+
+
+def test_without_resume_starts_over(tmp_path):
+    path = str(tmp_path / "per_run.csv")
+    stream = CsvExporter().stream(path, HEADERS)
+    stream.write_run(1, [["safe_1", 0, 10]])
+    stream.close(publish=False)
+
+    stream = CsvExporter().stream(path, HEADERS)
+    assert stream.last_completed is None
+    stream.close()
+    assert open(path).read().splitlines() == ["Agent,Route,Time(steps)"]
@@ -1,6 +1,10 @@
 # test waiting times metric collection
 
+import os
+import shutil
+
 import pytest
+from src.agents.agent_manager import AgentManager
 from src.simulation.batch import main                     
 from src.io.csv_exporter import CsvExporter    
 
@@ -8,10 +12,18 @@ from src.io.csv_exporter import CsvExporter
 
 # dummy runner = returns every key summarise_run 
 class DummyRunner:
+    telemetry = None
+    warm_start = None
+
     def __init__(self, *args, **kwargs):
         pass
 
-    def run(self, mgr):
+    def close(self):
+        pass
+
+    def run(self, mgr, episode=None):
+        # the real runner loads them when it injects the agents
+        mgr.load_drivers()
         base = {
             'end_step': 10,
             'total_distance': 100.0,
@@ -36,22 +48,43 @@ class DummyRunner:
         return {'safe_1': base.copy(), 'risky_1': base.copy()}, 42
 
 @pytest.fixture(autouse=True)
-def patch_runner(monkeypatch):
+def patch_runner(monkeypatch, tmp_path):
     import src.simulation.batch as sb
     monkeypatch.setattr(sb, "SimulationRunner", DummyRunner)
+    # results and models of the batch stay out of the repo
+    monkeypatch.setattr(sb, "CSV_DIR", str(tmp_path))
+    model_dir = str(tmp_path / "models")
+    os.makedirs(model_dir)
+    for name in ("safe_driver_qtable", "risky_driver_qtable"):
+        shutil.copy(AgentManager().model_path(name), model_dir)
+
+    class TmpManager(AgentManager):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.model_dir = model_dir
+    monkeypatch.setattr(sb, "AgentManager", TmpManager)
 
 @pytest.fixture(autouse=True)
 def capture_csv(monkeypatch):
     calls = []
-    def fake_to_file(self, path, headers, rows):
-        calls.append(rows)
-    monkeypatch.setattr(CsvExporter, "to_file", fake_to_file)
+
+    class FakeStream:
+        """per-run rows are streamed run by run"""
+        def write_run(self, run_index, rows):
+            calls.append(rows)
+        def sync(self):
+            return {}
+        def close(self, publish=True):
+            pass
+
+    monkeypatch.setattr(CsvExporter, "stream", lambda self, path, headers, **kw: FakeStream())
     return calls
 
 def test_batch_exports_waiting_time(capture_csv):
-    main(num_runs=1)
-    # per-run and averages
-    assert len(capture_csv) == 2
+    # the averages CSV belongs to the report stage now
+    main(num_runs=1, persistent=True, report=False)
+    # one run's per-run rows
+    assert len(capture_csv) == 1
     per_run_rows = capture_csv[0]
     # summarise_run rounds wait time into the last column
     assert any(row[-1] == 7.0 for row in per_run_rows)
@@ -0,0 +1,82 @@
+# numpy-backed q-table: same actions and values as QTable, batch ops
+
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from src.agents.learning.q_table import QTable, DenseQTable, STATE_DIMS
+
+ACTIONS = ['STOP', 'SLOW', 'GO_COMPLIANT', 'GO_OVERSHOOT_S', 'GO_OVERSHOOT_L']
+STATES = list(itertools.product(*STATE_DIMS))
+
+
+def play(table, steps=3000):
+    random.seed(7)
+    rng = random.Random(3)
+    chosen = []
+    state = rng.choice(STATES)
+    for _ in range(steps):
+        action = table.choose_action(state)
+        next_state = rng.choice(STATES[:30])
+        table.update(state, action, rng.uniform(-5, 5), next_state)
+        chosen.append(action)
+        state = next_state
+    return chosen
+
+
+def test_matches_dict_qtable():
+    dict_q, dense_q = QTable(ACTIONS, epsilon=0.2), DenseQTable(ACTIONS, epsilon=0.2)
+    assert play(dict_q) == play(dense_q)
+    assert dense_q.to_dict() == dict_q.to_dict()
+
+
+def test_pickles_are_interchangeable(tmp_path):
+    dict_q = QTable(ACTIONS, epsilon=0.3)
+    play(dict_q, 500)
+    path = str(tmp_path / "q.pkl")
+    dict_q.save(path)
+
+    dense_q = DenseQTable(ACTIONS)
+    dense_q.load(path)
+    assert dense_q.Q == dict_q.to_dict()
+    assert dense_q.epsilon == 0.3
+
+    dense_q.save(path)
+    again = QTable(ACTIONS)
+    again.load(path)
+    assert again.to_dict() == dict_q.to_dict()
+
+
+def test_unseen_state_explores_and_unknown_state_fails():
+    dense_q = DenseQTable(ACTIONS, epsilon=0.0)
+    assert dense_q.choose_action(STATES[0]) in ACTIONS
+    with pytest.raises(ValueError):
+        dense_q.choose_action(("PURPLE", 0, 0, 0))
+
+
+def test_update_batch_matches_distinct_updates():
+    seq, batch = DenseQTable(ACTIONS), DenseQTable(ACTIONS)
+    init = np.random.default_rng(0).random(seq.q.shape)
+    seq.q[:] = init
+    batch.q[:] = init
+
+    # distinct states and next states disjoint from them: order does not matter
+    s = np.arange(0, 40)
+    ns = np.arange(100, 140)
+    a = s % len(ACTIONS)
+    r = np.linspace(-1, 1, len(s))
+    for i in range(len(s)):
+        seq.update(STATES[s[i]], ACTIONS[a[i]], r[i], STATES[ns[i]])
+    batch.update_batch(s, a, r, ns)
+
+    assert np.allclose(seq.q, batch.q)
+    assert (seq.visited == batch.visited).all()
+
+
+def test_greedy_actions_breaks_ties_among_maxima():
+    dense_q = DenseQTable(ACTIONS)
+    dense_q.q[0] = [1.0, 3.0, 3.0, 0.0, 3.0]
+    picks = {int(dense_q.greedy_actions(np.random.default_rng(i))[0]) for i in range(50)}
+    assert picks == {1, 2, 4}
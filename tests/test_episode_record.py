@@ -0,0 +1,76 @@
+# compact episode records: slots records, frozen rows, metrics read from rows
+
+import pickle
+
+import numpy as np
+
+from src.metrics.metrics_collector import MetricsCollector
+from src.simulation.episode_record import (
+    EPISODE_DTYPE, EpisodeTable, Interner, VehicleRecord, freeze_run,
+)
+
+
+def legacy_record(end_step, distance=100.0, wait=2.5):
+    return {
+        'reached': end_step is not None, 'end_step': end_step,
+        'total_distance': distance, 'edges_visited': {"a", "b"},
+        'tls_encountered': {"t1"}, 'tls_stop_count': 0,
+        'amber_encountered': 1, 'red_encountered': 0, 'green_encountered': 0,
+        'amber_run_count': 0, 'red_run_count': 1, 'green_run_count': 0,
+        'tls_last_state': {}, 'max_speed': 13.456, 'sudden_brake_count': 2,
+        'max_decel': 4.5, 'sum_decel': 7.25, 'lane_change_count': 3,
+        'prev_speed': None, 'prev_lane': None, 'collision_count': 0,
+        'wait_time': wait, 'speed_bin_counts': {0: 1, 1: 5, 2: 2, 3: 0},
+    }
+
+
+def test_record_keeps_dict_access_and_pickles():
+    intern = Interner()
+    rec = VehicleRecord()
+    rec.edges_visited.add(intern("edge_a"))
+    rec['wait_time'] = 3.0
+    assert intern("edge_a") == 0 and intern("edge_b") == 1
+    assert rec['wait_time'] == 3.0 and rec.get('end_step') is None
+    assert not hasattr(rec, '__dict__')
+    assert pickle.loads(pickle.dumps(rec)) == rec
+
+
+def test_metrics_same_from_records_and_rows():
+    runs = [
+        ({"safe_1": legacy_record(40), "risky_1": legacy_record(None)}, 3),
+        ({"safe_1": legacy_record(55, 130.0), "risky_1": legacy_record(20, 80.0)}, None),
+    ]
+    table = EpisodeTable(capacity=1)
+    for run_data, idx in runs:
+        table.add(run_data, idx)
+    assert len(table) == 2 and table.rows.dtype == EPISODE_DTYPE
+
+    collector = MetricsCollector()
+    per_rows = [collector.summarise_run(rows) for rows in table]
+    assert per_rows == [collector.summarise_run(d, i) for d, i in runs]
+    assert per_rows[0][0][:3] == ["safe_1", 3, 40]
+    assert per_rows[0][0][6:8] == [2, 1]
+    assert per_rows[0][1] == ["risky_1", 3] + ["-"] * 17
+    assert per_rows[1][0][1] is None
+    assert all(type(v) in (str, int, float, type(None)) for v in per_rows[0][0])
+
+    assert collector.compute_averages(table) == collector.compute_averages(runs)
+    assert collector.compute_averages(table)[0][:3] == ["safe_1", 47.5, 115.0]
+
+
+def test_episode_ranges_and_bins():
+    table = EpisodeTable(capacity=2)
+    for e in range(5):
+        rec = legacy_record(10 + e)
+        rec['speed_bin_counts'] = {0: e, 1: 1, 2: 0, 3: 0}
+        table.add({"safe_1": rec}, e)
+
+    assert table.episode_rows(0, 2)['route'].tolist() == [0, 1]
+    assert table.episode_rows(-2)['route'].tolist() == [3, 4]
+    last = table.episode_rows(-2)
+    assert last['speed_bin_counts'].sum(axis=0).tolist() == [7, 2, 0, 0]
+    assert [len(r) for r in table] == [1] * 5
+
+    frozen = freeze_run({"safe_1": legacy_record(None)}, None)
+    assert frozen['end_step'][0] == -1 and frozen['route'][0] == -1
+    assert not np.any(frozen['reached'])
@@ -0,0 +1,96 @@
+# experience log: compact transitions on disk, replayed offline into a Q-table
+
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from src.agents.learning.experience import EXPERIENCE_DTYPE, ExperienceLog, ExperienceReader
+from src.agents.learning.offline import load_transitions, main, replay, train
+from src.agents.learning.q_table import DenseQTable, STATE_DIMS
+
+ACTIONS = ['STOP', 'SLOW', 'GO_COMPLIANT', 'GO_OVERSHOOT_S', 'GO_OVERSHOOT_L']
+STATES = list(itertools.product(*STATE_DIMS))
+
+
+def play(table, writer, steps=2000):
+    random.seed(7)
+    rng = random.Random(3)
+    state = rng.choice(STATES)
+    for _ in range(steps):
+        action = table.choose_action(state)
+        next_state = rng.choice(STATES[:40])
+        # quarter steps survive the float32 reward column exactly
+        reward = rng.randint(-20, 20) / 4
+        table.update(state, action, reward, next_state)
+        writer.add(state, action, reward, next_state, table.epsilon)
+        state = next_state
+
+
+def test_replay_one_by_one_matches_online(tmp_path):
+    log = ExperienceLog(str(tmp_path), chunk_rows=256)
+    online = DenseQTable(ACTIONS, epsilon=0.3)
+    log.begin_episode(0)
+    play(online, log.policy("safe", ACTIONS))
+    log.end_episode()
+
+    rows, actions, state_dims = load_transitions([str(tmp_path)], "safe")
+    assert len(rows) == 2000 and actions == ACTIONS
+    offline = DenseQTable(actions, state_dims=state_dims)
+    replay(offline, rows, batch_size=1)
+    assert np.array_equal(offline.q, online.q)
+    assert np.array_equal(offline.visited, online.visited)
+
+
+def test_batches_span_chunks_and_policies(tmp_path):
+    log = ExperienceLog(str(tmp_path), chunk_rows=8)
+    safe, risky = log.policy("safe", ACTIONS), log.policy("risky", ACTIONS)
+    log.begin_episode(3)
+    safe.add_batch(np.arange(20), np.arange(20) % 5, np.ones(20), np.arange(1, 21), 0.5)
+    risky.add(STATES[0], 'STOP', -1.0, STATES[1], 0.9)
+    log.end_episode()
+
+    reader = ExperienceReader(str(tmp_path))
+    assert reader.episodes == [{"start": 0, "stop": 21, "route": 3}]
+    assert reader.data.dtype == EXPERIENCE_DTYPE
+    assert reader.transitions("safe")['state'].tolist() == list(range(20))
+    assert reader.transitions("risky")['reward'].tolist() == [-1.0]
+    assert len(reader.transitions("other")) == 0
+
+
+def test_reopen_drops_unpublished_rows(tmp_path):
+    log = ExperienceLog(str(tmp_path), chunk_rows=4)
+    safe = log.policy("safe", ACTIONS)
+    log.begin_episode()
+    safe.add(STATES[0], 'SLOW', 1.0, STATES[1], 0.5)
+    log.end_episode()
+    log.begin_episode()
+    for _ in range(6):
+        safe.add(STATES[1], 'STOP', 2.0, STATES[2], 0.5)
+    # crash: six rows flushed past meta.json
+
+    log = ExperienceLog(str(tmp_path))
+    assert log.rows == 1 and len(ExperienceReader(str(tmp_path))) == 1
+    log.policy("safe", ACTIONS)
+
+
+def test_train_sweeps_with_other_parameters(tmp_path):
+    log = ExperienceLog(str(tmp_path))
+    log.begin_episode()
+    play(DenseQTable(ACTIONS, epsilon=0.3), log.policy("safe", ACTIONS))
+    log.end_episode()
+
+    rows, actions, state_dims = load_transitions([str(tmp_path)], "safe")
+    table, history = train(rows, actions, state_dims, alpha=0.5, gamma=0.5,
+                           epochs=20, batch_size=500, seed=1)
+    assert (table.alpha, table.gamma, table.epsilon) == (0.5, 0.5, np.float32(0.3))
+    assert len(history) == 20 and history[-1] < history[0]
+
+
+@pytest.mark.parametrize("flag", ["--epochs", "--batch-size"])
+def test_main_rejects_empty_sweeps(tmp_path, monkeypatch, capsys, flag):
+    monkeypatch.setattr("sys.argv", ["offline", str(tmp_path), flag, "0"])
+    with pytest.raises(SystemExit):
+        main()
+    assert f"{flag} must be at least 1" in capsys.readouterr().err
@@ -0,0 +1,115 @@
+# fleet mode: batched encode/reward/update matches the per-agent drivers
+
+import random
+
+import numpy as np
+import pytest
+from traci import constants as tc
+
+import src.agents.fleet as fl
+from src.agents.fleet import AgentFleet, PolicyGroup
+from src.agents.safe_driver import SafeDriver
+from src.agents.risky_driver import RiskyDriver
+from src.metrics.metrics_collector import MetricsCollector
+from src.simulation.world_snapshot import WorldSnapshot
+from src.simulation.tls_recorder import TLSEventRecorder
+
+
+def seeded_world(n, rng):
+    """Snapshot with n vehicles and three TLS, no traci needed"""
+    world = WorldSnapshot()
+    world.seed(None, {tc.VAR_TIME: 100.0})
+    for k, (state, switch) in enumerate((("GGrr", 110.0), ("yyrr", 103.0), ("rrrr", 130.0))):
+        world.seed(f"tls{k}", {
+            tc.TL_RED_YELLOW_GREEN_STATE: state,
+            tc.TL_NEXT_SWITCH: switch,
+            tc.TL_PHASE_DURATION: 40.0,
+        })
+    vids = []
+    for i in range(n):
+        vid = f"v_{i}"
+        allowed = rng.choice([8.33, 13.89])
+        next_tls = [] if i % 4 == 0 else [(f"tls{i % 3}", 0, rng.choice([5.0, 10.0, 15.0, 40.0, 90.0]), "r")]
+        world.seed(vid, {
+            tc.VAR_SPEED: rng.choice([0.0, allowed * 0.5, allowed, allowed * 1.1, allowed * 1.5]),
+            tc.VAR_ALLOWED_SPEED: allowed,
+            tc.VAR_NEXT_TLS: next_tls,
+        })
+        vids.append(vid)
+    world.seed_active(vids)
+    return world, vids
+
+
+@pytest.fixture
+def commands(monkeypatch):
+    sent = []
+    monkeypatch.setattr(fl.traci.vehicle, "setSpeed", lambda vid, v: sent.append(("setSpeed", vid, v)))
+    monkeypatch.setattr(fl.traci.vehicle, "slowDown", lambda vid, v, d: sent.append(("slowDown", vid, d)))
+    return sent
+
+
+@pytest.mark.parametrize("make", [
+    lambda: SafeDriver("safe_1", TLSEventRecorder(), dense=True),
+    lambda: RiskyDriver("risky_1", "route", TLSEventRecorder(), dense=True),
+])
+def test_encode_and_rewards_match_driver(make):
+    rng = random.Random(0)
+    world, vids = seeded_world(40, rng)
+    template = make()
+    template.qtable.epsilon = 0.37
+    group = PolicyGroup(template, vids)
+
+    states, speed_b, ttl_b, _, _ = group.encode(world, vids)
+    for vid, s in zip(vids, states):
+        driver = make()
+        driver.vehicle_id, driver.world = vid, world
+        assert group.qtable.states[s] == driver.encode_state()
+
+    R, D = group.reward_tables()
+    all_states = template.qtable.states
+    for _ in range(500):
+        prev, new = rng.choice(all_states), rng.choice(all_states)
+        a = rng.randrange(len(template.qtable.actions))
+        decel = rng.uniform(0, 5)
+        expected = template.reward(prev, template.qtable.actions[a], new, decel)
+        got = R[group.qtable.encode(prev), a, new[2], new[3]] + D[group.qtable.encode(prev), a] * decel
+        assert got == pytest.approx(expected)
+
+
+def test_step_updates_shared_table_and_skips_repeated_commands(commands):
+    world, vids = seeded_world(30, random.Random(1))
+    template = SafeDriver("safe_1", TLSEventRecorder(), dense=True)
+    template.qtable.epsilon = 0.0
+    # every state prefers GO_COMPLIANT
+    template.qtable.q[:, 2] = 1.0
+    template.qtable.visited[:] = True
+    fleet = AgentFleet({"safe": PolicyGroup(template, vids, np.random.default_rng(0))})
+
+    fleet.step(world)
+    assert len(commands) == len(vids)
+    assert all(c[0] == "setSpeed" for c in commands)
+
+    before = template.qtable.q.copy()
+    fleet.step(world)
+    # same targets again: nothing sent, but every agent learned
+    assert len(commands) == len(vids)
+    assert fleet.commands == {"sent": len(vids), "skipped": len(vids)}
+    assert not np.array_equal(before, template.qtable.q)
+    assert fleet.speed_bin(vids[0]) in (0, 1, 2, 3)
+
+
+def test_averages_group_by_policy():
+    rec = {
+        'end_step': 10, 'total_distance': 100.0, 'max_speed': 10.0, 'edges_visited': {"a"},
+        'tls_encountered': set(), 'amber_encountered': 0, 'red_encountered': 0,
+        'green_encountered': 0, 'amber_run_count': 0, 'red_run_count': 0,
+        'green_run_count': 0, 'sudden_brake_count': 0, 'max_decel': 0.0, 'sum_decel': 0.0,
+        'lane_change_count': 0, 'collision_count': 0, 'wait_time': 0.0,
+    }
+    run = {"safe_1": rec, "safe_2": dict(rec, end_step=20), "risky_1": rec}
+    rows = MetricsCollector().compute_averages([(run, 0)], group_by=lambda v: v.rsplit("_", 1)[0])
+    assert [r[0] for r in rows] == ["safe", "risky"]
+    assert rows[0][1] == 15.0 and rows[0][6] == 2
+
+    per_vehicle = MetricsCollector().compute_averages([(run, 0)])
+    assert [r[0] for r in per_vehicle] == ["safe_1", "safe_2", "risky_1"]
@@ -0,0 +1,75 @@
+# .qtab model format: round trips, memory-mapping and pickle migration
+
+import pickle
+
+import numpy as np
+import pytest
+
+from src.agents.learning.q_table import QTable, DenseQTable
+from src.agents.learning.model_format import (
+    ALIGN, save_model, load_model, read_header, migrate,
+)
+
+ACTIONS = ['STOP', 'SLOW', 'GO_COMPLIANT', 'GO_OVERSHOOT_S', 'GO_OVERSHOOT_L']
+
+
+def trained_table() -> QTable:
+    table = QTable(ACTIONS, epsilon=0.25)
+    table.Q[("GREEN", 3, 1, 0)] = [0.5, -1.0, 2.0, 0.0, 1.5]
+    table.Q[("RED", 0, 2, 1)] = [-3.0, 0.25, 0.0, -7.5, -9.0]
+    return table
+
+
+def test_header_and_roundtrip(tmp_path):
+    path = str(tmp_path / "m.qtab")
+    table = trained_table()
+    table.save(path, {"episodes": 12})
+
+    header = read_header(path)
+    assert header["actions"] == ACTIONS
+    assert header["epsilon"] == 0.25
+    assert header["metadata"]["episodes"] == 12
+    assert header["data_offset"] % ALIGN == 0
+
+    again = QTable(ACTIONS)
+    again.load(path)
+    assert again.to_dict() == table.to_dict()
+    assert again.epsilon == 0.25
+
+
+def test_mmap_is_shared_read_only(tmp_path):
+    path = str(tmp_path / "m.qtab")
+    save_model(path, trained_table())
+
+    model = load_model(path, mmap=True)
+    assert isinstance(model.q, np.memmap)
+    assert model.to_dict() == trained_table().to_dict()
+    model.epsilon = 0.0
+    assert model.choose_action(("GREEN", 3, 1, 0)) == "GO_COMPLIANT"
+    with pytest.raises(TypeError):
+        model.update(("GREEN", 3, 1, 0), "STOP", 1.0, ("RED", 0, 2, 1))
+
+    writable = load_model(path)
+    writable.update(("GREEN", 3, 1, 0), "STOP", 1.0, ("RED", 0, 2, 1))
+    assert isinstance(writable, DenseQTable)
+
+
+def test_migrate_pickle(tmp_path):
+    pkl = str(tmp_path / "old_qtable.pkl")
+    table = trained_table()
+    with open(pkl, "wb") as f:
+        pickle.dump({"Q": dict(table.Q), "epsilon": 0.1}, f)
+
+    out = migrate(pkl, ACTIONS)
+    assert out.endswith("old_qtable.qtab")
+    model = load_model(out)
+    assert model.to_dict() == table.to_dict()
+    assert model.epsilon == 0.1
+    assert read_header(out)["metadata"]["migrated_from"] == "old_qtable.pkl"
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not_a_model.qtab"
+    path.write_bytes(b"PK\x03\x04" + b"\0" * 60)
+    with pytest.raises(ValueError):
+        read_header(str(path))
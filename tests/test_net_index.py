@@ -0,0 +1,66 @@
+# compiled network index: build, cache by net hash and lookups without traci
+
+import os
+import random
+
+import src.agents.agent_manager as am
+from src.agents.agent_manager import AgentManager
+from src.simulation.net_index import NetIndex, NET_FILE, net_hash
+
+
+def test_build_and_cache_roundtrip(tmp_path):
+    cache = str(tmp_path)
+    built = NetIndex.load_or_build(NET_FILE, cache)
+    path = os.path.join(cache, f"net_index_{net_hash(NET_FILE)}.npz")
+    assert os.path.exists(path)
+
+    loaded = NetIndex.load_or_build(NET_FILE, cache)
+    assert loaded.edge_list == built.edge_list
+    assert (loaded.edge_speed_limit == built.edge_speed_limit).all()
+    assert (loaded.edge_tls == built.edge_tls).all()
+    assert loaded.tls_ids.tolist() == built.tls_ids.tolist()
+
+
+def test_lookups_match_sumolib(tmp_path):
+    import sumolib
+
+    index = NetIndex.load_or_build(NET_FILE, str(tmp_path))
+    net = sumolib.net.readNet(NET_FILE)
+    for edge_id in random.Random(0).sample(index.edge_list, 50):
+        edge = net.getEdge(edge_id)
+        assert index.lane_count(edge_id) == edge.getLaneNumber()
+        assert abs(index.edge_speed(edge_id) - edge.getLanes()[0].getSpeed()) < 1e-3
+        assert abs(index.length(edge_id) - edge.getLength()) < 1e-2
+        tls = edge.getTLS()
+        assert index.tls_of(edge_id) == (tls.getID() if tls is not None else None)
+    assert not index.has_edge("no_such_edge")
+
+
+def test_inject_reads_speeds_from_index(monkeypatch, tmp_path):
+    t = am.traci
+    index = NetIndex.load_or_build(NET_FILE, str(tmp_path))
+    a, b = index.edge_list[:2]
+    speeds = []
+
+    class Route:
+        edges = [a, b]
+
+    def no_lookup(*args):
+        raise AssertionError("network lookup through traci with a net index")
+
+    monkeypatch.setattr(t.edge, "getIDList", no_lookup)
+    monkeypatch.setattr(t.edge, "getParameter", no_lookup)
+    monkeypatch.setattr(t.lane, "getMaxSpeed", no_lookup)
+    monkeypatch.setattr(t.simulation, "findRoute", lambda x, y: Route)
+    monkeypatch.setattr(t.route, "add", lambda rid, edges: None)
+    monkeypatch.setattr(t.vehicle, "add", lambda vid, **kw: None)
+    monkeypatch.setattr(t.vehicle, "setColor", lambda vid, c: None)
+    monkeypatch.setattr(t.vehicle, "setMaxSpeed", lambda vid, s: speeds.append((vid, s)))
+    monkeypatch.setattr(t.vehicle, "getSpeedMode", lambda vid: 0)
+    monkeypatch.setattr(t.vehicle, "setSpeedMode", lambda vid, m: None)
+
+    mgr = AgentManager(net_index=index)
+    mgr.inject_agents()
+
+    route_max = max(index.edge_speed(a), index.edge_speed(b))
+    assert ("safe_1", route_max * mgr.safe_driver.max_speed_excess) in speeds
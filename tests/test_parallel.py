@@ -0,0 +1,116 @@
+# parallel batches: q-table merging and the shared epsilon schedule
+
+import shutil
+
+import pytest
+
+import src.simulation.parallel as par
+from src.agents.agent_manager import AgentManager
+from src.simulation.episode_record import VehicleRecord
+from src.simulation.parallel import merge_q, run_episodes_parallel
+
+
+def test_merge_averages_only_changed_values():
+    master = {"s": [1.0, 1.0]}
+    updates = [
+        {"s": [3.0, 1.0]},
+        {"s": [1.0, 1.0], "t": [0.0, 4.0]},
+        {"s": [5.0, 1.0]},
+    ]
+    merged = merge_q(master, updates)
+    assert merged["s"] == [4.0, 1.0]   # (2 + 4) / 2 workers that changed it
+    assert merged["t"] == [0.0, 4.0]
+    assert master == {"s": [1.0, 1.0]}
+
+
+class DummyRunner:
+    """Marks the state table with the episode's epsilon, no SUMO"""
+    def __init__(self, *args, **kwargs):
+        self.label = kwargs.get("label")
+
+    def run(self, mgr, episode=None):
+        mgr.load_drivers()
+        eps = mgr.safe_driver.qtable.epsilon
+        mgr.safe_driver.qtable.Q[("seen", eps)] = [1.0] * 5
+        return {"safe_1": {"eps": eps, "label": self.label}}, 0
+
+
+@pytest.mark.parametrize("workers,merge_every", [(2, 1), (3, 2)])
+def test_epsilon_schedule_matches_sequential(monkeypatch, workers, merge_every):
+    monkeypatch.setattr(par, "SimulationRunner", DummyRunner)
+
+    sequential = AgentManager()
+    sequential.load_drivers()
+    expected = []
+    for _ in range(5):
+        expected.append(sequential.safe_driver.qtable.epsilon)
+        sequential.decay_exploration()
+
+    mgr = AgentManager()
+    out = list(run_episodes_parallel(mgr, 5, workers, merge_every, (), {}))
+
+    assert sorted(i for i, *_ in out) == [1, 2, 3, 4, 5]
+    used = {i: result[0]["safe_1"]["eps"] for i, result, _, _ in out}
+    assert [used[i] for i in range(1, 6)] == expected
+    labels = {r[0]["safe_1"]["label"] for _, r, _, _ in out}
+    assert labels <= {f"worker_{n}" for n in range(workers)}
+    # every worker's update is merged back into the parent's table
+    for eps in expected:
+        assert mgr.safe_driver.qtable.Q[("seen", eps)] == [1.0] * 5
+    assert mgr.safe_driver.qtable.epsilon == sequential.safe_driver.qtable.epsilon
+
+
+class FlakyRunner(DummyRunner):
+    """Episode 2 fails, the others finish with an empty record per agent"""
+    telemetry = None
+    warm_start = None
+
+    def run(self, mgr, episode=None):
+        mgr.load_drivers()
+        if episode == 2:
+            raise RuntimeError("SUMO connection lost")
+        return {"safe_1": VehicleRecord(), "risky_1": VehicleRecord()}, 0
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_failed_episode_keeps_the_epsilon_schedule(tmp_path, monkeypatch, workers):
+    import src.simulation.batch as sb
+
+    models = tmp_path / "models"
+    models.mkdir()
+    for name in ("safe_driver_qtable", "risky_driver_qtable"):
+        shutil.copy(AgentManager().model_path(name), models)
+
+    class TmpManager(AgentManager):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.model_dir = str(models)
+
+    monkeypatch.setattr(sb, "SimulationRunner", FlakyRunner)
+    monkeypatch.setattr(par, "SimulationRunner", FlakyRunner)
+    monkeypatch.setattr(sb, "AgentManager", TmpManager)
+    monkeypatch.setattr(sb, "CSV_DIR", str(tmp_path))
+
+    sequential = AgentManager()
+    sequential.load_drivers()
+    schedule = []
+    for _ in range(4):
+        sequential.decay_exploration()
+        schedule.append(sequential.safe_driver.qtable.epsilon)
+
+    checkpoints = []
+    monkeypatch.setattr(sb, "save_checkpoint", lambda path, state: checkpoints.append(state))
+
+    sb.main(num_runs=4, workers=workers, persistent=True, report=False, checkpoint_every=2)
+    _, eps_safe, _, meta = sb.load_results(str(tmp_path))
+    # the failed episode 2 still took its step of the schedule
+    assert meta["successful"] == 3
+    assert eps_safe == [schedule[0], schedule[2], schedule[3]]
+    # and is checkpointed like any other
+    assert [c["episode"] for c in checkpoints] == [2, 4]
+    assert [c["successful"] for c in checkpoints] == [1, 3]
+    # a resume continues from the epsilon after the failed run, not the last successful one
+    assert [c["epsilon"][0] for c in checkpoints] == [schedule[1], schedule[3]]
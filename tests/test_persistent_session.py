@@ -0,0 +1,52 @@
+# persistent mode: one SUMO spawn, traci.load between episodes, respawn if it died
+
+import pytest
+
+import src.simulation.simulation_runner as sr
+from src.simulation.simulation_runner import SimulationRunner
+
+
+class DummyManager:
+    def inject_agents(self): pass
+    def get_destination_edge(self): return "EDGE_0"
+    def agent_destinations(self): return {}
+    def get_route_label(self): return 0
+    def update_agents(self, step, world=None): pass
+
+
+@pytest.fixture
+def sumo(monkeypatch):
+    calls = []
+    t = sr.traci
+    monkeypatch.setattr(t, "start", lambda cmd, **kw: calls.append("start"))
+    monkeypatch.setattr(t, "load", lambda args: calls.append(("load", tuple(args))))
+    monkeypatch.setattr(t, "close", lambda: calls.append("close"))
+    monkeypatch.setattr(t.vehicle, "getAccumulatedWaitingTime", lambda vid: 0.0)
+    return calls
+
+
+def test_fresh_process_per_episode_by_default(sumo):
+    runner = SimulationRunner("sumo", "dummy.sumocfg", max_steps=0)
+    for _ in range(2):
+        runner.run(DummyManager())
+    assert sumo == ["start", "close", "start", "close"]
+
+
+def test_persistent_session_reloads(sumo):
+    runner = SimulationRunner("sumo", "dummy.sumocfg", max_steps=0, persistent=True)
+    for _ in range(3):
+        runner.run(DummyManager())
+    runner.close()
+    reload = ("load", tuple(runner.cmd[1:]))
+    assert sumo == ["start", reload, reload, "close"]
+
+
+def test_dead_session_is_respawned(sumo, monkeypatch):
+    runner = SimulationRunner("sumo", "dummy.sumocfg", max_steps=0, persistent=True)
+    runner.run(DummyManager())
+
+    def dead(args):
+        raise sr.traci.FatalTraCIError("Connection closed by SUMO.")
+    monkeypatch.setattr(sr.traci, "load", dead)
+    runner.run(DummyManager())
+    assert sumo == ["start", "close", "start"]
@@ -0,0 +1,65 @@
+# episode profiler: phase timers and per-function TraCI call counts
+
+import json
+import os
+import random
+
+import pytest
+
+import src.simulation.backend as backend
+from src.agents.agent_manager import AgentManager
+from src.simulation import surrogate
+from src.simulation.profiler import EPISODES_FILE, load_summary
+from src.simulation.simulation_runner import SimulationRunner
+
+
+@pytest.fixture(autouse=True)
+def surrogate_backend():
+    options = dict(surrogate.OPTIONS)
+    backend.select_backend("surrogate")
+    yield
+    surrogate.close()
+    surrogate.OPTIONS.update(options)
+    backend.select_backend("traci")
+
+
+def test_episode_report_counts_calls_and_phases(tmp_path):
+    random.seed(3)
+    runner = SimulationRunner("sumo", "unused.sumocfg", max_steps=200,
+                              profile_dir=str(tmp_path), profile_episodes=(2,))
+    mgr = AgentManager(dense_q=True)
+    runner.run(mgr)
+    runner.run(mgr)
+    # the proxy is back on the plain backend after each episode
+    assert backend.active_backend() == "surrogate"
+    assert backend.traci.simulationStep is surrogate.simulationStep
+
+    report = runner.profiler.last_report
+    assert report["episode"] == 2 and report["steps"] == 200
+    assert report["calls"]["simulationStep"][0] == 200
+    assert report["calls"]["vehicle.getIDList"][0] == 200
+    assert {"start", "inject", "step", "agents", "metrics", "finish"} <= set(report["phases"])
+    assert sum(report["phases"].values()) == pytest.approx(report["seconds"])
+
+    with open(tmp_path / EPISODES_FILE) as f:
+        assert [json.loads(line)["episode"] for line in f] == [1, 2]
+    assert os.path.exists(tmp_path / "episode_2.prof")
+    assert not os.path.exists(tmp_path / "episode_1.prof")
+    summary = load_summary(str(tmp_path))
+    assert (summary["episodes"], summary["steps"]) == (2, 400)
+    assert summary["calls"]["simulationStep"][0] == 400
+
+
+def test_profile_continues_in_the_same_directory(tmp_path):
+    random.seed(3)
+    mgr = AgentManager(dense_q=True)
+    for episode in (1, 2):
+        # a resumed batch builds a new runner on the same directory
+        runner = SimulationRunner("sumo", "unused.sumocfg", max_steps=100,
+                                  profile_dir=str(tmp_path))
+        runner.run(mgr, episode=episode)
+
+    with open(tmp_path / EPISODES_FILE) as f:
+        assert [json.loads(line)["episode"] for line in f] == [1, 2]
+    summary = load_summary(str(tmp_path))
+    assert (summary["episodes"], summary["steps"]) == (2, 200)
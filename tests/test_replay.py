@@ -0,0 +1,82 @@
+# experience replay: ring buffer, prioritized sampling, rare transitions learned faster
+
+import numpy as np
+import pytest
+
+from src.agents.learning.replay import ReplayBuffer
+from src.agents.safe_driver import SafeDriver
+
+
+def test_ring_keeps_the_newest():
+    buf = ReplayBuffer(capacity=5, rng=np.random.default_rng(0))
+    for i in range(3):
+        buf.add(i, 0, float(i), i + 1)
+    buf.add_batch(np.arange(3, 7), np.ones(4), np.arange(3, 7) * 1.0, np.arange(4, 8))
+    assert len(buf) == 5 and buf.added == 7
+    assert sorted(buf.states.tolist()) == [2, 3, 4, 5, 6]
+
+    buf.add_batch(np.arange(10, 22), np.zeros(12), np.zeros(12), np.zeros(12))
+    assert sorted(buf.states.tolist()) == [17, 18, 19, 20, 21]
+    assert buf.sample(100).max() < 5
+
+
+def test_prioritized_prefers_large_td():
+    buf = ReplayBuffer(capacity=100, prioritized=True, rng=np.random.default_rng(0))
+    buf.add_batch(np.arange(100), np.zeros(100), np.zeros(100), np.arange(100))
+    td = np.zeros(100)
+    td[7] = 50.0
+    buf.update_priorities(np.arange(100), td)
+    assert np.mean(buf.sample(1000) == 7) > 0.5
+
+
+def test_replay_needs_dense_table():
+    with pytest.raises(TypeError):
+        SafeDriver("safe_1", None).enable_replay(ReplayBuffer(10))
+
+
+def test_rare_transition_learned_with_replay():
+    # one rewarding pair seen 3 times among 1000 zero-reward transitions
+    rng = np.random.default_rng(1)
+    states = rng.integers(1, 100, 1000)
+    actions = rng.integers(0, 5, 1000)
+    rewards = np.zeros(1000)
+    rare = [100, 500, 900]
+    states[rare], actions[rare], rewards[rare] = 0, 0, 10.0
+    next_states = np.full(1000, 150)
+
+    plain, replayed = SafeDriver("safe_1", None, dense=True), SafeDriver("safe_1", None, dense=True)
+    replayed.enable_replay(ReplayBuffer(2000, rng=np.random.default_rng(2)), batch_size=64, every=4)
+    for k in range(1000):
+        batch = (states[k:k + 1], actions[k:k + 1], rewards[k:k + 1], next_states[k:k + 1])
+        plain.qtable.update_batch(*batch)
+        replayed.qtable.update_batch(*batch)
+        replayed.remember(*batch)
+
+    assert plain.qtable.q[0, 0] == pytest.approx(10 * (1 - 0.9 ** 3))
+    assert replayed.qtable.q[0, 0] > 9.0
+
+
+def test_online_updates_replay_at_the_batched_rate(monkeypatch):
+    import src.agents.safe_driver as sd
+    from traci import constants as tc
+    from src.simulation.world_snapshot import WorldSnapshot
+
+    monkeypatch.setattr(sd.traci.vehicle, "setSpeed", lambda *a: None)
+    monkeypatch.setattr(sd.traci.vehicle, "slowDown", lambda *a: None)
+    online, batched = SafeDriver("safe_1", None, dense=True), SafeDriver("safe_1", None, dense=True)
+    replays = {}
+    for name, driver in (("online", online), ("batched", batched)):
+        driver.enable_replay(ReplayBuffer(100, rng=np.random.default_rng(0)), batch_size=4, every=3)
+        driver.replay.replay = lambda qtable, n, name=name: replays.update({name: replays.get(name, 0) + 1})
+
+    # 11 online transitions (12 steps) against batches of 5, 5 and 1
+    for step in range(12):
+        world = WorldSnapshot()
+        world.seed("safe_1", {tc.VAR_SPEED: float(step % 4), tc.VAR_ALLOWED_SPEED: 13.9,
+                              tc.VAR_NEXT_TLS: []})
+        online.update(world)
+    for n in (5, 5, 1):
+        batched.remember(np.zeros(n, int), np.zeros(n, int), np.zeros(n), np.zeros(n, int))
+    assert len(online.replay) == len(batched.replay) == 11
+    assert replays == {"online": 3, "batched": 3}
+    assert online._since_replay == batched._since_replay == 2
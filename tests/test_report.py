@@ -0,0 +1,85 @@
+# train/report split: lean batch import, report stage from saved results
+
+import csv
+import os
+import subprocess
+import sys
+
+from benchmarks.bench_analytics import synthetic_table
+from benchmarks.bench_qtable import ACTIONS, make_transitions
+from src.agents.learning.q_table import DenseQTable
+from src.metrics.metrics_collector import StreamingAggregator
+from src.simulation.batch import load_results, save_results
+
+
+def test_train_stage_skips_plotting_libraries():
+    code = ("import sys, src.simulation.batch; "
+            "print(sorted(m for m in ('pandas', 'matplotlib', 'seaborn') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.dirname(__file__)))
+    assert out.stdout.strip() == "[]", out.stderr
+
+
+def test_report_from_saved_results(tmp_path):
+    from src.simulation import report
+
+    table = synthetic_table(40)
+    meta = {"num_runs": 20, "successful": 20, "backend": "surrogate", "workers": 1,
+            "fleet": False, "agents": ["safe_1", "risky_1"]}
+    save_results(str(tmp_path), table, [0.9] * 20, [0.8] * 20, meta)
+    loaded, eps_safe, eps_risky, loaded_meta = load_results(str(tmp_path))
+    assert (loaded.rows == table.rows).all() and len(loaded) == 20
+    assert (eps_safe, eps_risky, loaded_meta) == ([0.9] * 20, [0.8] * 20, meta)
+
+    for name in ("safe", "risky"):
+        qtable = DenseQTable(ACTIONS)
+        for s, a, r, ns in make_transitions(500):
+            qtable.update(s, a, r, ns)
+        qtable.save(str(tmp_path / f"{name}_driver_qtable.qtab"))
+    report.main(str(tmp_path), str(tmp_path))
+
+    for name in ("epsilon_decay.png", "Q_heatmap_grid_safe.png", "Q_heatmap_grid_risky.png",
+                 "speed_bins_compare_safe_1.png", "simulation_per_route.csv"):
+        assert os.path.exists(tmp_path / name)
+    running = StreamingAggregator()
+    for rows in table:
+        running.add_run(rows)
+    with open(tmp_path / "simulation_averages.csv") as f:
+        written = list(csv.reader(f))[1:]
+    assert written == [[str(v) for v in row] for row in running.rows()]
+
+    # same input: every figure comes from the cache
+    assert report.main(str(tmp_path), str(tmp_path)) == []
+
+
+def test_figure_cache_redraws_only_changed_input(tmp_path):
+    import numpy as np
+    from src.simulation import report
+
+    jobs = [("epsilon", "epsilon_decay.png", {"eps_safe": np.ones(5), "eps_risky": np.ones(5)}),
+            ("epsilon", "other.png", {"eps_safe": np.ones(5), "eps_risky": np.ones(5)})]
+    assert report.render(jobs, str(tmp_path), workers=2) == ["epsilon_decay.png", "other.png"]
+    jobs[1][2]["eps_risky"] = np.zeros(5)
+    assert report.render(jobs, str(tmp_path), workers=2) == ["other.png"]
+    os.remove(tmp_path / "epsilon_decay.png")
+    assert report.render(jobs, str(tmp_path), workers=2) == ["epsilon_decay.png"]
+
+
+def test_q_means_matches_state_loop():
+    import numpy as np
+    from src.simulation import report
+
+    qtable = DenseQTable(ACTIONS)
+    for s, a, r, ns in make_transitions(500):
+        qtable.update(s, a, r, ns)
+    means = report.q_means(qtable)
+
+    sums, counts = {}, {}
+    for (phase, dist_b, speed_b, _ttl_b), qvals in qtable.Q.items():
+        if phase in report.phases and speed_b in report.speed_bins:
+            key = (report.phases.index(phase), dist_b, report.speed_bins.index(speed_b))
+            sums[key] = sums.get(key, 0) + np.asarray(qvals)
+            counts[key] = counts.get(key, 0) + 1
+    assert np.isnan(means).sum() == means.size - len(sums) * len(ACTIONS)
+    for key, total in sums.items():
+        assert np.allclose(means[key], total / counts[key])
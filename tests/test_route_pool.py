@@ -0,0 +1,103 @@
+# offline route pool: sampling, persistence and injection without traci routing
+
+import random
+import pytest
+
+import src.agents.agent_manager as am
+from src.agents.agent_manager import AgentManager
+from src.simulation.route_pool import RoutePool, build_pool, NET_FILE
+
+
+def make_routes():
+    routes = []
+    for i in range(30):
+        routes.append({
+            "edges": [f"e{i}", f"e{i}b", f"e{i}c"],
+            "length": 100.0 * i,
+            "tls": i % 3,
+            "max_speed": 13.89 if i % 2 else 8.33,
+            "min_speed": 8.33,
+        })
+    return routes
+
+
+def test_sampling_respects_bins():
+    pool = RoutePool(make_routes())
+    rng = random.Random(0)
+    for _ in range(50):
+        idx = pool.sample(rng, length="high")
+        assert pool.stratum(pool.routes[idx])[0] == "high"
+    with pytest.raises(ValueError):
+        pool.sample(rng, colour="red")
+
+
+def test_stratified_sampling_covers_every_stratum():
+    pool = RoutePool(make_routes())
+    rng = random.Random(1)
+    seen = {pool.stratum(pool.routes[pool.sample(rng, stratified=True)]) for _ in range(500)}
+    assert seen == set(pool._strata)
+
+
+def test_save_load_roundtrip(tmp_path):
+    pool = RoutePool(make_routes())
+    path = str(tmp_path / "routes.json.gz")
+    pool.save(path)
+    loaded = RoutePool.load(path)
+    assert loaded.routes == pool.routes
+    assert loaded.cuts == pool.cuts
+
+
+def test_cached_pool_rebuilt_when_the_network_changes(tmp_path, monkeypatch):
+    import src.simulation.route_pool as rp
+
+    built = []
+    def fake_build(net_file, size):
+        built.append(net_file)
+        return RoutePool(make_routes())
+    monkeypatch.setattr(rp, "build_pool", fake_build)
+
+    net = tmp_path / "net.xml.gz"
+    path = str(tmp_path / "routes.json.gz")
+    net.write_bytes(b"network v1")
+    RoutePool.load_or_build(path, str(net))
+    RoutePool.load_or_build(path, str(net))
+    assert len(built) == 1
+    net.write_bytes(b"network v2")
+    RoutePool.load_or_build(path, str(net))
+    assert len(built) == 2
+
+
+def test_build_from_network():
+    pool = build_pool(NET_FILE, size=10, seed=3)
+    assert len(pool) == 10
+    for route in pool.routes:
+        assert len(route["edges"]) > 1
+        assert route["length"] > 0 and route["max_speed"] >= route["min_speed"]
+
+
+def test_inject_uses_pool_without_routing(monkeypatch):
+    t = am.traci
+    added = []
+
+    def no_routing(*args):
+        raise AssertionError("routing through traci with a route pool")
+
+    monkeypatch.setattr(t.edge, "getIDList", no_routing)
+    monkeypatch.setattr(t.simulation, "findRoute", no_routing)
+    monkeypatch.setattr(t.edge, "getParameter", no_routing)
+    monkeypatch.setattr(t.route, "add", lambda rid, edges: added.append((rid, edges)))
+    monkeypatch.setattr(t.vehicle, "add", lambda vid, **kw: None)
+    monkeypatch.setattr(t.vehicle, "setColor", lambda vid, c: None)
+    monkeypatch.setattr(t.vehicle, "setMaxSpeed", lambda vid, s: added.append((vid, s)))
+    monkeypatch.setattr(t.vehicle, "getSpeedMode", lambda vid: 0)
+    monkeypatch.setattr(t.vehicle, "setSpeedMode", lambda vid, m: None)
+
+    pool = RoutePool(make_routes())
+    mgr = AgentManager(route_pool=pool)
+    mgr.inject_agents()
+
+    idx = mgr.get_route_label()
+    route = pool.routes[idx]
+    assert added[0] == (mgr.route_id, route["edges"])
+    assert mgr.get_destination_edge() == route["edges"][-1]
+    assert ("safe_1", route["max_speed"] * mgr.safe_driver.max_speed_excess) in added
@@ -0,0 +1,77 @@
+# streaming averages: same CSV rows as a full pass, Welford/P-square statistics
+
+import random
+
+import numpy as np
+import pytest
+
+from src.metrics.metrics_collector import MetricsCollector, StreamingAggregator
+from src.metrics.running_stats import P2Quantile, RunningStat
+from src.simulation.episode_record import EpisodeTable
+
+
+def random_run(rng):
+    run = {}
+    for vid in ("safe_1", "risky_1"):
+        reached = rng.random() < 0.8
+        run[vid] = {
+            'end_step': rng.randrange(100, 900) if reached else None,
+            'total_distance': rng.uniform(500, 4000), 'max_speed': rng.uniform(5, 20),
+            'edges_visited': set(range(rng.randrange(1, 90))),
+            'tls_encountered': set(range(rng.randrange(0, 12))),
+            'amber_encountered': rng.randrange(3), 'red_encountered': rng.randrange(5),
+            'green_encountered': rng.randrange(5), 'amber_run_count': rng.randrange(3),
+            'red_run_count': rng.randrange(4), 'green_run_count': rng.randrange(6),
+            'sudden_brake_count': rng.randrange(0, 50), 'max_decel': rng.uniform(0, 9),
+            'sum_decel': rng.uniform(0, 300), 'lane_change_count': rng.randrange(80),
+            'collision_count': rng.randrange(3), 'wait_time': rng.uniform(0, 60),
+        }
+    return run, rng.randrange(20)
+
+
+def test_rows_match_full_pass():
+    rng = random.Random(3)
+    runs = [random_run(rng) for _ in range(200)]
+    table = EpisodeTable()
+    agg = StreamingAggregator()
+    for run_data, idx in runs:
+        table.add(run_data, idx)
+        agg.add_run(table.episode_rows(-1))
+
+    assert agg.runs == 200
+    assert agg.rows() == MetricsCollector().compute_averages(runs)
+    assert agg.rows() == MetricsCollector().compute_averages(table)
+
+    reached = [r["safe_1"]["end_step"] for r, _ in runs if r["safe_1"]["end_step"] is not None]
+    time = agg.snapshot()["safe_1"]["time"]
+    assert agg.snapshot()["safe_1"]["count"] == len(reached)
+    assert time["mean"] == pytest.approx(np.mean(reached))
+    assert time["std"] == pytest.approx(np.std(reached, ddof=1))
+    assert (time["min"], time["max"]) == (min(reached), max(reached))
+    assert "safe_1: reached" in agg.report()
+
+
+def test_unreached_agent_gets_placeholder_row():
+    run = random_run(random.Random(0))[0]
+    run["risky_1"]["end_step"] = None
+    agg = StreamingAggregator()
+    agg.add_run(run, 1)
+    assert agg.rows()[1] == ["risky_1"] + ["N/A"] * 21
+    assert np.isnan(agg.snapshot()["risky_1"]["time"]["ci95"])
+
+
+def test_running_stat_and_quantiles():
+    rng = np.random.default_rng(0)
+    values = rng.gamma(2.0, 3.0, 20000)
+    stat = RunningStat()
+    for v in values:
+        stat.add(float(v))
+    assert stat.mean == pytest.approx(values.mean())
+    assert stat.variance == pytest.approx(values.var(ddof=1))
+    assert stat.p50.value() == pytest.approx(np.median(values), rel=0.02)
+    assert stat.p90.value() == pytest.approx(np.quantile(values, 0.9), rel=0.02)
+
+    few = P2Quantile(0.5)
+    for v in (5.0, 1.0, 3.0):
+        few.add(v)
+    assert few.value() == 3.0
@@ -0,0 +1,161 @@
+# subscription collection must produce the same records as polling
+
+import pytest
+from traci import constants as tc
+
+import src.simulation.simulation_runner as sr
+from src.simulation.simulation_runner import SimulationRunner
+
+# scripted per-step world: (speed, road, distance, lane, next_tls)
+SCRIPT = {
+    "safe_1": [
+        (10.0, "e0", 10.0, "e0_0", [("tls1", 0, 30.0, "r")]),
+        (12.0, "e0", 22.0, "e0_1", [("tls1", 0, 8.0, "r")]),
+        (5.0, "e1", 27.0, "e1_0", []),
+        (5.0, "dest", 32.0, "dest_0", []),
+    ],
+    "risky_1": [
+        (15.0, "e0", 15.0, "e0_0", [("tls1", 0, 25.0, "r")]),
+        (20.0, "e1", 35.0, "e1_0", []),
+    ],
+}
+TLS = ["GGrr", "yyrr", "rrGG", "rrGG"]
+
+
+class FakeSumo:
+    def __init__(self):
+        self.step = -1
+        self.vehicle_subs = set()
+        self.tls_subs = set()
+        # (vid, step) spent teleporting: off the road but still subscribed
+        self.teleporting = set()
+
+    def active(self):
+        return [v for v, frames in SCRIPT.items() if 0 <= self.step < len(frames)
+                and (v, self.step) not in self.teleporting]
+
+    def subscription(self, vid):
+        if (vid, self.step) in self.teleporting:
+            # what SUMO sends for a teleporting vehicle
+            invalid = tc.INVALID_DOUBLE_VALUE
+            return {tc.VAR_SPEED: invalid, tc.VAR_ROAD_ID: "", tc.VAR_DISTANCE: invalid,
+                    tc.VAR_LANE_ID: "", tc.VAR_NEXT_TLS: ()}
+        return self.frame(vid) if vid in self.active() else {}
+
+    def frame(self, vid):
+        speed, road, dist, lane, nxt = SCRIPT[vid][self.step]
+        return {tc.VAR_SPEED: speed, tc.VAR_ROAD_ID: road, tc.VAR_DISTANCE: dist,
+                tc.VAR_LANE_ID: lane, tc.VAR_NEXT_TLS: nxt}
+
+    def departed(self):
+        return [v for v in SCRIPT if self.step == 0]
+
+    def arrived(self):
+        return [v for v, frames in SCRIPT.items() if self.step == len(frames)]
+
+
+class DummyDriver:
+    def __init__(self, vid):
+        self.vehicle_id = vid
+
+    def _speed_bin(self, speed):
+        return 1 if speed <= 12.0 else 2
+
+
+class DummyManager:
+    def __init__(self):
+        self.safe_driver = DummyDriver("safe_1")
+        self.risky_driver = DummyDriver("risky_1")
+    def inject_agents(self): pass
+    def get_destination_edge(self): return "dest"
+    def agent_destinations(self): return {"safe_1": "dest", "risky_1": "dest"}
+    def speed_bin(self, vid, speed): return self.safe_driver._speed_bin(speed)
+    def get_route_label(self): return 0
+    def update_agents(self, step, world=None): pass
+
+
+@pytest.fixture
+def sumo(monkeypatch):
+    fake = FakeSumo()
+    t = sr.traci
+
+    def step():
+        fake.step += 1
+
+    def getter(var):
+        return lambda vid: fake.frame(vid)[var]
+
+    monkeypatch.setattr(t, "start", lambda cmd: None)
+    monkeypatch.setattr(t, "close", lambda: None)
+    monkeypatch.setattr(t, "simulationStep", step)
+
+    # polling api
+    monkeypatch.setattr(t.vehicle, "getIDList", fake.active)
+    monkeypatch.setattr(t.vehicle, "getSpeed", getter(tc.VAR_SPEED))
+    monkeypatch.setattr(t.vehicle, "getRoadID", getter(tc.VAR_ROAD_ID))
+    monkeypatch.setattr(t.vehicle, "getDistance", getter(tc.VAR_DISTANCE))
+    monkeypatch.setattr(t.vehicle, "getLaneID", getter(tc.VAR_LANE_ID))
+    monkeypatch.setattr(t.vehicle, "getNextTLS", getter(tc.VAR_NEXT_TLS))
+    monkeypatch.setattr(t.vehicle, "getAccumulatedWaitingTime", lambda vid: 3.0)
+    monkeypatch.setattr(t.trafficlight, "getRedYellowGreenState",
+                        lambda tls_id: TLS[fake.step])
+    monkeypatch.setattr(t.simulation, "getCollidingVehiclesIDList",
+                        lambda: ["risky_1"] if fake.step == 1 else [])
+
+    # subscription api
+    monkeypatch.setattr(t.simulation, "subscribe", lambda varIDs: None)
+    monkeypatch.setattr(t.simulation, "getSubscriptionResults", lambda: {
+        tc.VAR_DEPARTED_VEHICLES_IDS: fake.departed(),
+        tc.VAR_ARRIVED_VEHICLES_IDS: fake.arrived(),
+        tc.VAR_COLLIDING_VEHICLES_IDS: ["risky_1"] if fake.step == 1 else [],
+        tc.VAR_TIME: float(fake.step),
+    })
+    monkeypatch.setattr(t.vehicle, "subscribe",
+                        lambda vid, varIDs: fake.vehicle_subs.add(vid))
+    monkeypatch.setattr(t.vehicle, "getSubscriptionResults",
+                        fake.subscription)
+    monkeypatch.setattr(t.trafficlight, "subscribe",
+                        lambda tls_id, varIDs: fake.tls_subs.add(tls_id))
+    monkeypatch.setattr(t.trafficlight, "getSubscriptionResults",
+                        lambda tls_id: {tc.TL_RED_YELLOW_GREEN_STATE: TLS[fake.step]})
+    return fake
+
+
+def run(monkeypatch, use_subscriptions):
+    runner = SimulationRunner("sumo", "dummy.sumocfg", max_steps=len(TLS),
+                              use_subscriptions=use_subscriptions)
+    return runner.run(DummyManager())
+
+
+def test_subscriptions_match_polling(sumo, monkeypatch):
+    polled, route_a = run(monkeypatch, use_subscriptions=False)
+    sumo.step = -1
+    subscribed, route_b = run(monkeypatch, use_subscriptions=True)
+
+    assert route_a == route_b
+    assert subscribed == polled
+    assert sumo.vehicle_subs == {"safe_1", "risky_1"}
+    assert sumo.tls_subs == {"tls1"}
+
+
+def test_teleporting_agents_match_polling(sumo, monkeypatch):
+    sumo.teleporting = {("safe_1", 2), ("risky_1", 1)}
+    polled, _ = run(monkeypatch, use_subscriptions=False)
+    sumo.step = -1
+    subscribed, _ = run(monkeypatch, use_subscriptions=True)
+
+    assert subscribed == polled
+    risky = subscribed["risky_1"]
+    assert risky["max_decel"] == 0.0 and risky["sudden_brake_count"] == 0
+    assert len(subscribed["safe_1"]["edges_visited"]) == 2
+
+
+def test_polled_record_contents(sumo, monkeypatch):
+    data, _ = run(monkeypatch, use_subscriptions=False)
+    safe = data["safe_1"]
+    assert safe["reached"] and safe["end_step"] == 3
+    assert safe["red_encountered"] == 0 and safe["amber_encountered"] == 1
+    assert safe["amber_run_count"] == 1
+    assert safe["lane_change_count"] == 3
+    assert safe["sudden_brake_count"] == 1
+    assert data["risky_1"]["collision_count"] == 1
@@ -0,0 +1,116 @@
+# surrogate backend: the TraCI subset the runner and agents use, no SUMO needed
+
+import random
+
+import pytest
+from traci import constants as tc
+
+import src.simulation.backend as backend
+from src.agents.agent_manager import AgentManager
+from src.simulation import surrogate
+from src.simulation.simulation_runner import SimulationRunner
+
+
+@pytest.fixture(autouse=True)
+def surrogate_backend():
+    options = dict(surrogate.OPTIONS)
+    backend.select_backend("surrogate")
+    yield backend.traci
+    surrogate.close()
+    surrogate.OPTIONS.update(options)
+    backend.select_backend("traci")
+
+
+def run_episodes(subscriptions: bool, n: int = 2) -> list:
+    random.seed(3)
+    runner = SimulationRunner("sumo", "unused.sumocfg", max_steps=400,
+                              use_subscriptions=subscriptions)
+    mgr = AgentManager(dense_q=True)
+    out = []
+    for _ in range(n):
+        data, _ = runner.run(mgr)
+        mgr.decay_exploration()
+        out.append(data)
+    return out
+
+
+def test_runner_episode_without_sumo():
+    assert backend.active_backend() == "surrogate"
+    episodes = run_episodes(subscriptions=False)
+    for episode in episodes:
+        assert set(episode) == {"safe_1", "risky_1"}
+        assert all(rec["total_distance"] > 0 for rec in episode.values())
+    # subscriptions read the same values as polling
+    assert run_episodes(subscriptions=True) == episodes
+
+
+def test_vehicles_stop_at_red(surrogate_backend):
+    traci = surrogate_backend
+    surrogate.configure(rows=1, cols=2, background=0, tls_share=1.0)
+    traci.start(["sumo", "--seed", "1"])
+    traci.route.add("r", ["J0_0-J0_1", "J0_1-J0_0"])
+    traci.vehicle.add("car", "r", departSpeed="max")
+
+    crossed_on = None
+    for _ in range(300):
+        traci.simulationStep()
+        # the step moved vehicles under the light's state at its end
+        state = traci.trafficlight.getRedYellowGreenState("J0_1")
+        if "car" in traci.vehicle.getIDList() and traci.vehicle.getRoadID("car") == "J0_1-J0_0":
+            crossed_on = state
+            break
+        if "car" in traci.vehicle.getIDList():
+            (tls, _, dist, state), = traci.vehicle.getNextTLS("car")
+            assert tls == "J0_1" and dist > 0 and state in "Gyr"
+    assert crossed_on is not None and "r" not in crossed_on
+
+
+def test_traci_errors_and_state_roundtrip(surrogate_backend, tmp_path):
+    traci = surrogate_backend
+    traci.start(["sumo"])
+    with pytest.raises(traci.TraCIException):
+        traci.vehicle.getSpeed("nobody")
+
+    edges = traci.edge.getIDList()
+    stage = traci.simulation.findRoute(edges[0], edges[-1])
+    assert stage.edges[0] == edges[0] and stage.edges[-1] == edges[-1]
+    traci.simulation.subscribe([tc.VAR_TIME])
+    for _ in range(20):
+        traci.simulationStep()
+    assert traci.simulation.getSubscriptionResults()[tc.VAR_TIME] == 20.0
+
+    path = str(tmp_path / "state.xml.gz")
+    traci.simulation.saveState(path)
+    running = traci.vehicle.getIDList()
+    speeds = [traci.vehicle.getSpeed(v) for v in running]
+    traci.simulationStep()
+    traci.simulation.loadState(path)
+    assert traci.simulation.getTime() == 20.0
+    assert [traci.vehicle.getSpeed(v) for v in running] == speeds
+
+
+def test_allowed_speed_includes_the_speed_factor(surrogate_backend):
+    traci = surrogate_backend
+    traci.start(["sumo", "--seed", "2"])
+    traci.simulationStep()
+    scaled = 0
+    for v in traci.vehicle.getIDList():
+        limit = traci.lane.getMaxSpeed(traci.vehicle.getLaneID(v))
+        allowed = traci.vehicle.getAllowedSpeed(v)
+        assert 0.8 * limit <= allowed <= 1.2 * limit
+        scaled += allowed != limit
+    # background vehicles draw their own factor
+    assert scaled > 0
+
+
+def test_fleet_episodes_repeat_under_the_same_seed():
+    def fleet_run():
+        random.seed(11)
+        runner = SimulationRunner("sumo", "unused.sumocfg", max_steps=300)
+        mgr = AgentManager(n_agents=6)
+        data, _ = runner.run(mgr)
+        return data, mgr.safe_driver.qtable.q.copy()
+
+    (data_a, q_a), (data_b, q_b) = fleet_run(), fleet_run()
+    assert data_a == data_b
+    assert (q_a == q_b).all()
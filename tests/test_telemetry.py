@@ -0,0 +1,85 @@
+# telemetry: sampled per-step events through a ring flushed in the background
+
+import json
+import logging
+
+import numpy as np
+
+from src.agents.safe_driver import SafeDriver
+from src.simulation import telemetry
+from src.simulation.telemetry import TelemetryBuffer, read_telemetry
+
+
+def test_ring_halves_reach_disk_in_order(tmp_path):
+    buf = TelemetryBuffer(str(tmp_path), capacity=8)
+    for episode in range(3):
+        for step in range(11):
+            buf.record(step, f"safe_{step % 2 + 1}", float(step), 13.9, 1, 0, np.nan)
+        buf.end_episode()
+    buf.close()
+
+    rows, names = read_telemetry(str(tmp_path))
+    assert len(rows) == 33 and names == ["safe_1", "safe_2"]
+    assert rows['step'].tolist() == list(range(11)) * 3
+    assert rows['episode'].tolist() == [0] * 11 + [1] * 11 + [2] * 11
+
+
+def test_meta_counts_completed_episodes(tmp_path):
+    def meta_episodes():
+        buf.flush()
+        with open(tmp_path / "meta.json") as f:
+            return json.load(f)["episodes"]
+
+    buf = TelemetryBuffer(str(tmp_path), capacity=8)
+    for step in range(5):
+        buf.record(step, "safe_1", 5.0, 13.9, 1, 0, np.nan)
+    # a full half went out mid-episode
+    assert meta_episodes() == 0
+    buf.end_episode()
+    assert meta_episodes() == 1
+    for step in range(6):
+        buf.record(step, "safe_1", 5.0, 13.9, 1, 0, np.nan)
+    assert meta_episodes() == 1
+    buf.end_episode()
+    buf.close()
+    assert meta_episodes() == 2
+
+
+def test_new_buffer_continues_a_recording(tmp_path):
+    buf = TelemetryBuffer(str(tmp_path), capacity=8)
+    for step in range(3):
+        buf.record(step, "safe_1", 5.0, 13.9, 1, 0, np.nan)
+    buf.end_episode()
+    buf.close()
+    # rows of a crashed episode, never counted in meta.json
+    with open(tmp_path / "telemetry.bin", "ab") as f:
+        f.write(b"\0" * 2 * telemetry.TELEMETRY_DTYPE.itemsize)
+
+    resumed = TelemetryBuffer(str(tmp_path), capacity=8)
+    resumed.record(0, "risky_1", 7.0, 13.9, 2, 0, np.nan)
+    resumed.end_episode()
+    resumed.close()
+
+    rows, names = read_telemetry(str(tmp_path))
+    assert names == ["safe_1", "risky_1"]
+    assert rows['episode'].tolist() == [0, 0, 0, 1]
+    assert rows['vehicle'].tolist() == [0, 0, 0, 1]
+
+
+def test_sampling_every_and_near_tls(tmp_path):
+    every = TelemetryBuffer(str(tmp_path / "a"), every=5)
+    assert [s for s in range(12) if every.wants(s, np.nan)] == [0, 5, 10]
+    near = TelemetryBuffer(str(tmp_path / "b"), near_tls=30.0)
+    assert near.wants(3, 12.0) and not near.wants(3, 45.0) and not near.wants(3, np.nan)
+
+
+def test_speed_bin_debug_only_when_tracing(caplog, monkeypatch):
+    driver = SafeDriver("safe_1", None)
+    driver.world = type("World", (), {"allowed_speed": lambda self, vid: 10.0})()
+    with caplog.at_level(logging.DEBUG):
+        monkeypatch.setattr(telemetry, "TRACE", False)
+        driver._speed_bin(12.0)
+        assert not caplog.records
+        monkeypatch.setattr(telemetry, "TRACE", True)
+        driver._speed_bin(12.0)
+        assert "speed_bin=2" in caplog.text
@@ -0,0 +1,79 @@
+# trajectory recorder: chunked column files, memmap reader, appending after a crash
+
+import numpy as np
+import pytest
+from traci import constants as tc
+
+from src.simulation.trajectory import TrajectoryReader, TrajectoryRecorder
+from src.simulation.world_snapshot import WorldSnapshot
+
+
+def world_at(step):
+    world = WorldSnapshot()
+    world.seed("tls_a", {tc.TL_RED_YELLOW_GREEN_STATE: "yyrr"})
+    for k, vid in enumerate(("safe_1", "risky_1")):
+        world.seed(vid, {
+            tc.VAR_SPEED: step + k / 2,
+            tc.VAR_ROAD_ID: f"edge_{step % 3}",
+            tc.VAR_LANE_ID: f"edge_{step % 3}_0",
+            tc.VAR_DISTANCE: 10.0 * step,
+            tc.VAR_NEXT_TLS: [("tls_a", 0, 25.0 - step, "r")] if k == 0 else [],
+        })
+    return world
+
+
+def record_episode(rec, steps, route):
+    rec.begin_episode(route)
+    for step in range(steps):
+        world = world_at(step)
+        rec.record(step, "safe_1", world, "GO_COMPLIANT", 0.5 if step else None)
+        rec.record(step, "risky_1", world)
+    rec.end_episode()
+
+
+def test_roundtrip_with_chunked_flushes(tmp_path):
+    rec = TrajectoryRecorder(str(tmp_path), chunk_rows=4)
+    record_episode(rec, 5, route=3)
+    record_episode(rec, 2, route=None)
+
+    reader = TrajectoryReader(str(tmp_path))
+    assert len(reader) == 14 and isinstance(reader["speed"], np.memmap)
+    assert reader.episodes == [
+        {"start": 0, "stop": 10, "route": 3},
+        {"start": 10, "stop": 14, "route": None},
+    ]
+
+    safe = reader.episode(0, agent="safe_1")
+    assert safe["step"].tolist() == [0, 1, 2, 3, 4]
+    assert safe["tls_dist"].tolist() == [25.0, 24.0, 23.0, 22.0, 21.0]
+    assert reader.decode(safe["tls"][:1]) == ["tls_a"]
+    assert safe["tls_state"][0] == 1  # amber
+    assert np.isnan(safe["reward"][0]) and safe["reward"][1] == 0.5
+
+    risky = reader.to_frame(1, agent="risky_1")
+    assert risky["lane"].tolist() == ["edge_0_0", "edge_1_0"]
+    assert risky["tls"].tolist() == [None, None]
+    assert risky["action"].tolist() == [None, None]
+    assert risky["episode"].tolist() == [1, 1]
+
+
+def test_reopen_drops_unpublished_rows(tmp_path):
+    rec = TrajectoryRecorder(str(tmp_path), chunk_rows=2)
+    record_episode(rec, 3, route=0)
+    # crash mid-episode: rows flushed, meta.json never updated
+    rec.begin_episode(1)
+    for step in range(3):
+        rec.record(step, "safe_1", world_at(step))
+
+    rec = TrajectoryRecorder(str(tmp_path))
+    assert rec.rows == 6 and (tmp_path / "speed.bin").stat().st_size == 6 * 4
+    record_episode(rec, 1, route=2)
+
+    reader = TrajectoryReader(str(tmp_path))
+    assert [ep["route"] for ep in reader.episodes] == [0, 2]
+    assert reader["episode"].tolist() == [0] * 6 + [1] * 2
+
+
+def test_reader_needs_meta(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        TrajectoryReader(str(tmp_path))
@@ -17,6 +17,8 @@ class DummyManager:
         self.agents = [DummyAgent("safe_1"), DummyAgent("risky_1")]
     def inject_agents(self): pass
     def get_destination_edge(self): return "EDGE_0"
+    def agent_destinations(self):
+        return {a.vehicle_id: "EDGE_0" for a in self.agents}
     def get_route_label(self):      return 0
     def update_agents(self, step):  pass
 
@@ -0,0 +1,59 @@
+# warm-start pool: states simulated once, restored per episode
+
+import pytest
+
+import src.simulation.warm_start as ws
+import src.simulation.simulation_runner as sr
+from src.simulation.simulation_runner import SimulationRunner
+from src.simulation.warm_start import WarmStartPool
+
+
+class DummyManager:
+    def inject_agents(self): pass
+    def get_destination_edge(self): return "EDGE_0"
+    def agent_destinations(self): return {}
+    def get_route_label(self): return 0
+    def update_agents(self, step, world=None): pass
+
+
+@pytest.fixture
+def sumo(monkeypatch):
+    calls = []
+    t = ws.traci
+
+    def save_state(path):
+        calls.append("saveState")
+        with open(path, "w") as f:
+            f.write("<snapshot/>")
+
+    monkeypatch.setattr(t, "start", lambda cmd, **kw: calls.append(("start", tuple(cmd[-2:]))))
+    monkeypatch.setattr(t, "close", lambda: calls.append("close"))
+    monkeypatch.setattr(t, "simulationStep", lambda: calls.append("step"))
+    monkeypatch.setattr(t.simulation, "saveState", save_state)
+    monkeypatch.setattr(t.simulation, "loadState", lambda path: calls.append(("loadState", path)))
+    monkeypatch.setattr(t.vehicle, "getAccumulatedWaitingTime", lambda vid: 0.0)
+    return calls
+
+
+def test_states_built_once_per_seed(sumo, tmp_path):
+    pool = WarmStartPool(warmup_steps=3, pool_size=2, state_dir=str(tmp_path))
+    cmd = ["sumo", "-c", "osm.sumocfg"]
+    pool.ensure(cmd)
+    pool.ensure(cmd)
+
+    assert sumo.count("step") == 6
+    assert sumo.count("saveState") == 2
+    assert ("start", ("--seed", "1")) in sumo
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "osm_3s_seed0.xml.gz", "osm_3s_seed1.xml.gz"
+    ]
+
+
+def test_runner_restores_a_pooled_state(sumo, tmp_path):
+    pool = WarmStartPool(warmup_steps=2, pool_size=3, state_dir=str(tmp_path))
+    runner = SimulationRunner("sumo", "osm.sumocfg", max_steps=0, warm_start=pool)
+    runner.run(DummyManager())
+
+    loads = [c for c in sumo if isinstance(c, tuple) and c[0] == "loadState"]
+    assert len(loads) == 1
+    assert loads[0][1] in pool.paths("osm.sumocfg")